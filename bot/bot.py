@@ -5,7 +5,9 @@ import requests
 import logging
 
 from faker import Faker
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from bot.load_generator import run_load_test
 
 
 BOT_DIRECTORY = "bot"
@@ -100,16 +102,19 @@ def create_post(token: str) -> Dict[str, Any]:
     return post_response
 
 
-def like_post(token: str, post_id: int) -> None:
+def like_posts(token: str, post_ids: List[int]) -> Dict[str, Any]:
     headers = get_headers(token)
 
-    logger.info(f"Liking post ID: {post_id}")
+    logger.info(f"Liking post IDs: {post_ids}")
     response = requests.post(
-        get_url("posts", post_id) + "like/",
+        get_url("posts/likes/batch"),
+        json={"like": post_ids},
         headers=headers,
     )
-    handle_request(response)
-    logger.info(f"Post ID {post_id} liked successfully")
+    batch_response = handle_request(response)
+    logger.info(f"Post IDs liked: {batch_response['like']}")
+
+    return batch_response
 
 
 def simulate_user_activity() -> None:
@@ -130,12 +135,11 @@ def simulate_user_activity() -> None:
         post_response = handle_request(response)
         post_ids = [post["id"] for post in post_response["results"]]
 
-        for _ in range(
-                random.randint(1, CONFIGURATIONS["max_likes_per_user"])
-        ):
-            post_id = random.choice(post_ids)
-            like_post(access_token, post_id)
-            post_ids.remove(post_id)
+        likes_number = min(
+            random.randint(1, CONFIGURATIONS["max_likes_per_user"]),
+            len(post_ids),
+        )
+        like_posts(access_token, random.sample(post_ids, likes_number))
 
         users_counter += 1
         logger.info(f"___Process completed for user №:{users_counter} ___\n")
@@ -144,4 +148,7 @@ def simulate_user_activity() -> None:
 
 
 if __name__ == "__main__":
-    simulate_user_activity()
+    if CONFIGURATIONS.get("mode") == "load":
+        run_load_test(BASE_URL, CONFIGURATIONS.get("load", {}))
+    else:
+        simulate_user_activity()
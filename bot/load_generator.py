@@ -0,0 +1,442 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import aiohttp
+from faker import Faker
+
+from bot.stats import percentile
+
+
+fake = Faker()
+logger = logging.getLogger("BotLogger")
+
+DEFAULT_LOAD_CONFIGURATIONS = {
+    "virtual_users": 20,
+    "duration_seconds": 60,
+    "scheduling": "closed",
+    "arrival_rate": 50,
+    "think_time_seconds": 0,
+    "max_connections": 100,
+    "request_timeout_seconds": 30,
+    "report_path": "bot/load_report.json",
+    "weights": {
+        "list_posts": 50,
+        "get_post": 25,
+        "like_post": 12,
+        "unlike_post": 5,
+        "create_post": 8,
+    },
+}
+KNOWN_POSTS_LIMIT = 1000
+
+
+class LoadRecorder:
+    """Collects latencies and response statuses per endpoint"""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+
+    def record(self, endpoint: str, latency: float, outcome: str) -> None:
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][outcome] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        endpoints = {}
+
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies_ms = sorted(latency * 1000 for latency in latencies)
+            statuses = dict(self.statuses[endpoint])
+            errors = sum(
+                count for outcome, count in statuses.items()
+                if not outcome.isdigit() or int(outcome) >= 500
+            )
+            endpoints[endpoint] = {
+                "requests": len(latencies_ms),
+                "errors": errors,
+                "throughput_rps": round(len(latencies_ms) / elapsed, 2),
+                "statuses": statuses,
+                "latency_ms": {
+                    "mean": round(sum(latencies_ms) / len(latencies_ms), 2),
+                    "p50": round(percentile(latencies_ms, 50), 2),
+                    "p95": round(percentile(latencies_ms, 95), 2),
+                    "p99": round(percentile(latencies_ms, 99), 2),
+                    "max": round(latencies_ms[-1], 2),
+                },
+            }
+
+        return endpoints
+
+
+class VirtualUser:
+
+    def __init__(self, token: str) -> None:
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.liked_post_ids: Set[int] = set()
+
+
+class LoadGenerator:
+    """
+    Drives the API with many concurrent virtual users sharing one pool of
+    keep-alive connections.
+
+    In the closed-loop scheduling every virtual user sends its next request
+    only after the previous one is answered. In the open-loop scheduling
+    requests arrive at a fixed rate no matter how fast the API answers,
+    and latency is measured from the planned arrival time, so queueing
+    inside an overloaded server is not hidden.
+    """
+
+    def __init__(self, base_url: str, configurations: Dict[str, Any]) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.configurations = {
+            **DEFAULT_LOAD_CONFIGURATIONS,
+            **configurations,
+        }
+        self.recorder = LoadRecorder()
+        self.known_post_ids: Deque[int] = deque(maxlen=KNOWN_POSTS_LIMIT)
+        self.actions = {
+            "list_posts": self.list_posts,
+            "get_post": self.get_post,
+            "like_post": self.like_post,
+            "unlike_post": self.unlike_post,
+            "create_post": self.create_post,
+        }
+        weights = self.configurations["weights"]
+        self.action_names = [name for name in weights if weights[name] > 0]
+        self.action_weights = [weights[name] for name in self.action_names]
+
+    def get_url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{endpoint}/"
+
+    async def request(
+            self,
+            session: aiohttp.ClientSession,
+            endpoint: str,
+            method: str,
+            url: str,
+            started_at: Optional[float] = None,
+            **kwargs: Any,
+    ) -> Optional[Any]:
+        """Send one request, record its outcome and return the JSON body"""
+
+        started_at = started_at or time.perf_counter()
+
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                outcome = str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            self.recorder.record(
+                endpoint,
+                time.perf_counter() - started_at,
+                type(error).__name__,
+            )
+            return None
+
+        self.recorder.record(
+            endpoint,
+            time.perf_counter() - started_at,
+            outcome,
+        )
+
+        if response.status >= 400 or not body:
+            return None
+
+        return json.loads(body)
+
+    async def create_virtual_user(
+            self,
+            session: aiohttp.ClientSession,
+    ) -> Optional[VirtualUser]:
+        user_data = {
+            "email": f"{fake.uuid4()}@{fake.domain_name()}",
+            "password": fake.password(),
+            "first_name": fake.first_name(),
+            "last_name": fake.last_name(),
+            "pseudonym": fake.user_name(),
+        }
+        signed_up = await self.request(
+            session,
+            "POST /users/signup/",
+            "POST",
+            self.get_url("users/signup"),
+            json=user_data,
+        )
+
+        if signed_up is None:
+            return None
+
+        login_response = await self.request(
+            session,
+            "POST /users/login/",
+            "POST",
+            self.get_url("users/login"),
+            json={
+                "email": user_data["email"],
+                "password": user_data["password"],
+            },
+        )
+
+        if login_response is None:
+            return None
+
+        return VirtualUser(login_response["access"])
+
+    async def list_posts(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        posts_page = await self.request(
+            session,
+            "GET /posts/",
+            "GET",
+            self.get_url("posts"),
+            started_at,
+            headers=user.headers,
+        )
+
+        if posts_page:
+            self.known_post_ids.extend(
+                post["id"] for post in posts_page["results"]
+            )
+
+    async def get_post(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        if not self.known_post_ids:
+            return await self.list_posts(session, user, started_at)
+
+        await self.request(
+            session,
+            "GET /posts/{id}/",
+            "GET",
+            self.get_url(f"posts/{random.choice(self.known_post_ids)}"),
+            started_at,
+            headers=user.headers,
+        )
+
+    async def like_post(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        if not self.known_post_ids:
+            return await self.list_posts(session, user, started_at)
+
+        post_id = random.choice(self.known_post_ids)
+        liked = await self.request(
+            session,
+            "POST /posts/{id}/like/",
+            "POST",
+            self.get_url(f"posts/{post_id}/like"),
+            started_at,
+            headers=user.headers,
+        )
+
+        if liked is not None:
+            user.liked_post_ids.add(post_id)
+
+    async def unlike_post(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        if not user.liked_post_ids:
+            return await self.like_post(session, user, started_at)
+
+        post_id = user.liked_post_ids.pop()
+        await self.request(
+            session,
+            "DELETE /posts/{id}/unlike/",
+            "DELETE",
+            self.get_url(f"posts/{post_id}/unlike"),
+            started_at,
+            headers=user.headers,
+        )
+
+    async def create_post(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        post = await self.request(
+            session,
+            "POST /posts/",
+            "POST",
+            self.get_url("posts"),
+            started_at,
+            json={"title": fake.sentence(), "text": fake.text()},
+            headers=user.headers,
+        )
+
+        if post:
+            self.known_post_ids.append(post["id"])
+
+    async def run_action(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            started_at: Optional[float] = None,
+    ) -> None:
+        action_name = random.choices(
+            self.action_names,
+            weights=self.action_weights,
+        )[0]
+        await self.actions[action_name](session, user, started_at)
+
+    async def closed_loop(
+            self,
+            session: aiohttp.ClientSession,
+            user: VirtualUser,
+            deadline: float,
+    ) -> None:
+        think_time = self.configurations["think_time_seconds"]
+
+        while time.perf_counter() < deadline:
+            await self.run_action(session, user)
+
+            if think_time:
+                await asyncio.sleep(random.expovariate(1 / think_time))
+
+    async def open_loop(
+            self,
+            session: aiohttp.ClientSession,
+            users: List[VirtualUser],
+            deadline: float,
+    ) -> None:
+        interval = 1 / self.configurations["arrival_rate"]
+        arrival_at = time.perf_counter()
+        in_flight = set()
+
+        while arrival_at < deadline:
+            delay = arrival_at - time.perf_counter()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            task = asyncio.create_task(
+                self.run_action(session, random.choice(users), arrival_at)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            arrival_at += interval
+
+        await asyncio.gather(*in_flight)
+
+    async def run(self) -> Dict[str, Any]:
+        configurations = self.configurations
+        connector = aiohttp.TCPConnector(
+            limit=configurations["max_connections"]
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=configurations["request_timeout_seconds"]
+        )
+
+        async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+        ) as session:
+            logger.info(
+                f"Creating {configurations['virtual_users']} virtual users"
+            )
+            setup_started = time.perf_counter()
+            users = await asyncio.gather(
+                *[
+                    self.create_virtual_user(session)
+                    for _ in range(configurations["virtual_users"])
+                ]
+            )
+            users = [user for user in users if user is not None]
+
+            if not users:
+                raise RuntimeError("No virtual user could sign up and login")
+
+            await self.list_posts(session, users[0])
+
+            # Sign-ups and logins are reported apart from the measured load.
+            setup_recorder, self.recorder = self.recorder, LoadRecorder()
+            setup_elapsed = time.perf_counter() - setup_started
+
+            logger.info(
+                f"Running {configurations['scheduling']}-loop load "
+                f"for {configurations['duration_seconds']} seconds"
+            )
+            started_at = datetime.now(timezone.utc)
+            started = time.perf_counter()
+            deadline = started + configurations["duration_seconds"]
+
+            if configurations["scheduling"] == "open":
+                await self.open_loop(session, users, deadline)
+            else:
+                await asyncio.gather(
+                    *[
+                        self.closed_loop(session, user, deadline)
+                        for user in users
+                    ]
+                )
+
+            elapsed = time.perf_counter() - started
+
+        return {
+            "started_at": started_at.isoformat(),
+            "elapsed_seconds": round(elapsed, 3),
+            "base_url": self.base_url,
+            "configurations": configurations,
+            "endpoints": self.recorder.summary(elapsed),
+            "setup": {
+                "elapsed_seconds": round(setup_elapsed, 3),
+                "endpoints": setup_recorder.summary(setup_elapsed),
+            },
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{'endpoint':<30}{'requests':>10}{'errors':>8}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(
+            f"{endpoint:<30}{stats['requests']:>10}{stats['errors']:>8}"
+            f"{stats['throughput_rps']:>10}{latency['p50']:>10}"
+            f"{latency['p95']:>10}{latency['p99']:>10}"
+        )
+
+
+def run_load_test(
+        base_url: str,
+        configurations: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Run the load test, print the report and save it as JSON"""
+
+    generator = LoadGenerator(base_url, configurations)
+    report = asyncio.run(generator.run())
+    print_report(report)
+
+    report_path = generator.configurations["report_path"]
+
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=4)
+
+    logger.info(f"Load report saved to {report_path}")
+
+    return report
@@ -0,0 +1,13 @@
+import math
+from typing import List
+
+
+def percentile(sorted_values: List[float], rank: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+
+    if not sorted_values:
+        return 0.0
+
+    index = max(0, math.ceil(rank / 100 * len(sorted_values)) - 1)
+
+    return sorted_values[index]
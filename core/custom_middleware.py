@@ -1,19 +1,370 @@
-from typing import Callable
+import logging
+import time
+from typing import Callable, Optional
 
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
 from django.http import HttpRequest, HttpResponse
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from core import db_router, instrumentation, load_shedding, metrics
+from core.last_request import get_config, last_request_buffer
+
+
+logger = logging.getLogger(__name__)
 
 
 class LastUserRequestMiddleware:
+    """
+    Track the time of the last authenticated request of every user.
+
+    With LAST_REQUEST_AT["WRITE_BEHIND"] enabled, the times are coalesced
+    in memory and written in periodic bulk UPDATEs instead of one UPDATE
+    per request.
+
+    Under ASGI the middleware stays async. The buffer is recorded to
+    inline, while the UPDATE and the lazy session user are run in a
+    thread.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response: Callable) -> Callable:
         self.get_response = get_response
+        self.write_behind = get_config()["WRITE_BEHIND"]
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         response = self.get_response(request)
+        self.track(request)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        response = await self.get_response(request)
+
+        # Async views replace the lazy user with a resolved one.
+        if self.write_behind and not isinstance(
+            request.user,
+            SimpleLazyObject,
+        ):
+            self.track(request)
+        else:
+            await sync_to_async(self.track)(request)
 
+        return response
+
+    def track(self, request: HttpRequest) -> None:
         if request.user.is_authenticated:
-            request.user.last_request_at = timezone.now()
-            request.user.save(update_fields=["last_request_at"])
+            requested_at = timezone.now()
+
+            if self.write_behind:
+                last_request_buffer.record(
+                    request.user.pk,
+                    requested_at,
+                    request.user.last_request_at,
+                )
+            else:
+                request.user.last_request_at = requested_at
+                request.user.save(update_fields=["last_request_at"])
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Measure the SQL work of every request with an execute wrapper instead
+    of the unbounded DEBUG `connection.queries`. The number of queries
+    and the DB time are exposed in the Server-Timing header, requests
+    over the query count or latency budget are logged with their
+    slowest statements. When REQUEST_INSTRUMENTATION is disabled the
+    middleware removes itself from the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        config = instrumentation.get_config()
+
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.query_count_budget = config["QUERY_COUNT_BUDGET"]
+        self.latency_budget = config["LATENCY_BUDGET_MS"] / 1000
+        self.slowest_limit = config["SLOWEST_QUERIES"]
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            connection_created.connect(
+                instrumentation.install_query_dispatcher
+            )
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = instrumentation.QueryRecorder(self.slowest_limit)
+        started = time.perf_counter()
+
+        with recorder.record():
+            response = self.get_response(request)
+
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        recorder = instrumentation.QueryRecorder(self.slowest_limit)
+        started = time.perf_counter()
+
+        with recorder.arecord():
+            response = await self.get_response(request)
+
+        return self.report(request, response, recorder, started)
+
+    def report(
+            self,
+            request: HttpRequest,
+            response: HttpResponse,
+            recorder: instrumentation.QueryRecorder,
+            started: float,
+    ) -> HttpResponse:
+        duration = time.perf_counter() - started
+        request.query_recorder = recorder
+        response["Server-Timing"] = (
+            f'db;desc="{recorder.count} queries";'
+            f"dur={recorder.duration * 1000:.2f}, "
+            f"total;dur={duration * 1000:.2f}"
+        )
+
+        if (
+            recorder.count > self.query_count_budget
+            or duration > self.latency_budget
+        ):
+            slowest = "".join(
+                f"\n  [{query_duration * 1000:.2f}ms] {sql}"
+                for query_duration, sql in recorder.get_slowest()
+            )
+            logger.warning(
+                f"Request over budget: {request.method} {request.path} "
+                f"{response.status_code} in {duration * 1000:.2f}ms, "
+                f"{recorder.count} queries in "
+                f"{recorder.duration * 1000:.2f}ms{slowest}"
+            )
+
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe requests to the replicas of DATABASE_ROUTING,
+    while every other request reads from the primary. A user whose
+    request wrote keeps reading from the primary for the sticky window,
+    so the own writes show up despite the replication lag. Without
+    replicas the middleware removes itself from the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not db_router.get_config()["REPLICAS"]:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with db_router.route_request(request):
+            response = self.get_response(request)
+
+        db_router.pin_writer(request, response)
 
         return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with db_router.route_request(request):
+            response = await self.get_response(request)
+
+        db_router.pin_writer(request, response)
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count every request with its latency and SQL work into the metrics
+    registry served by MetricsView, labeled by the resolved URL name.
+    Recording is a few dict updates of a thread-own shard, so the
+    middleware is meant to stay enabled. When METRICS is disabled the
+    middleware removes itself from the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not metrics.get_config()["ENABLED"]:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            connection_created.connect(
+                instrumentation.install_query_dispatcher
+            )
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = instrumentation.QueryRecorder(slowest_limit=0)
+        started = time.perf_counter()
+        metrics.registry.add("http_requests_in_flight", (), 1)
+
+        try:
+            with recorder.record():
+                response = self.get_response(request)
+        finally:
+            metrics.registry.add("http_requests_in_flight", (), -1)
+
+        self.observe(request, response, recorder, started)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        recorder = instrumentation.QueryRecorder(slowest_limit=0)
+        started = time.perf_counter()
+        metrics.registry.add("http_requests_in_flight", (), 1)
+
+        try:
+            with recorder.arecord():
+                response = await self.get_response(request)
+        finally:
+            metrics.registry.add("http_requests_in_flight", (), -1)
+
+        self.observe(request, response, recorder, started)
+
+        return response
+
+    @staticmethod
+    def observe(
+            request: HttpRequest,
+            response: HttpResponse,
+            recorder: instrumentation.QueryRecorder,
+            started: float,
+    ) -> None:
+        resolver_match = getattr(request, "resolver_match", None)
+        metrics.registry.observe_request(
+            resolver_match.view_name if resolver_match else "unmatched",
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            recorder.count,
+            recorder.duration,
+        )
+
+
+class LoadSheddingMiddleware:
+    """
+    Shed requests of the overloaded priority classes of LOAD_SHEDDING
+    with a 503 and a Retry-After header before their view runs, so the
+    work admitted still finishes in time. Low priority routes are shed
+    first, health checks and authenticated reads last. Shed requests
+    are counted into the metrics registry. When LOAD_SHEDDING is
+    disabled the middleware removes itself from the chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not load_shedding.get_config()["ENABLED"]:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.shedder = load_shedding.LoadShedder()
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # The async handler awaits a coroutine process_view inline
+            # instead of running it in a thread.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = self.shedder.get_request_start(request)
+
+        try:
+            return self.get_response(request)
+        finally:
+            self.release(request, started)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        started = self.shedder.get_request_start(request)
+
+        try:
+            return await self.get_response(request)
+        finally:
+            self.release(request, started)
+
+    def process_view(
+            self,
+            request: HttpRequest,
+            view_func: Callable,
+            view_args: tuple,
+            view_kwargs: dict,
+    ) -> Optional[HttpResponse]:
+        priority = self.shedder.get_priority(request, request.resolver_match)
+
+        if self.shedder.admit(priority):
+            request.load_shedding_priority = priority
+
+            return None
+
+        metrics.registry.add(
+            "http_requests_shed_total",
+            (request.resolver_match.view_name, priority),
+            1,
+        )
+
+        return self.shedder.get_shed_response()
+
+    async def aprocess_view(
+            self,
+            request: HttpRequest,
+            view_func: Callable,
+            view_args: tuple,
+            view_kwargs: dict,
+    ) -> Optional[HttpResponse]:
+        return type(self).process_view(
+            self,
+            request,
+            view_func,
+            view_args,
+            view_kwargs,
+        )
+
+    def release(self, request: HttpRequest, started: float) -> None:
+        priority = getattr(request, "load_shedding_priority", None)
+
+        if priority is not None:
+            self.shedder.release(priority, time.time() - started)
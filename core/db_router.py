@@ -0,0 +1,180 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import SimpleLazyObject
+from rest_framework.permissions import SAFE_METHODS
+
+
+DEFAULTS = {
+    "REPLICAS": [],
+    "STICKY_WINDOW": timedelta(seconds=10),
+}
+
+PINNED_KEY_PREFIX = "db-routing:pinned"
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "DATABASE_ROUTING", {})}
+
+
+def get_pinned_key(user_id: Any) -> str:
+    return f"{PINNED_KEY_PREFIX}:{user_id}"
+
+
+class RoutingState:
+    """Where the reads made while handling one request go"""
+
+    def __init__(self, request: HttpRequest) -> None:
+        self.request = request
+        self.use_primary = request.method not in SAFE_METHODS
+        self.wrote = False
+        self.user_pinned: Optional[bool] = None
+
+    def reads_from_primary(self) -> bool:
+        return (
+            self.use_primary
+            or self.wrote
+            or self.is_user_pinned()
+            # Reads within a transaction must see its own writes.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        )
+
+    def is_user_pinned(self) -> bool:
+        """
+        Whether the user wrote within the sticky window. Unknown until
+        the view has authenticated the request, so the user lookup
+        itself reads from a replica.
+        """
+
+        if self.user_pinned is None:
+            user = get_resolved_user(self.request)
+
+            if user is None:
+                return False
+
+            self.user_pinned = user.is_authenticated and (
+                cache.get(get_pinned_key(user.pk)) is not None
+            )
+
+        return self.user_pinned
+
+
+current_state: ContextVar[Optional[RoutingState]] = ContextVar(
+    "db_routing_state",
+    default=None,
+)
+
+
+def get_resolved_user(request: HttpRequest) -> Any:
+    """
+    User of the request once a view has authenticated it, None while it
+    is still the lazy session user of AuthenticationMiddleware.
+    """
+
+    user = request.__dict__.get("user")
+
+    return None if isinstance(user, SimpleLazyObject) else user
+
+
+@contextmanager
+def route_request(request: HttpRequest) -> Iterator[RoutingState]:
+    """Let the reads of a safe request go to the replicas"""
+
+    state = RoutingState(request)
+    token = current_state.set(state)
+
+    try:
+        yield state
+    finally:
+        current_state.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Send the reads of the current request within the block to the primary"""
+
+    state = current_state.get()
+
+    if state is None:
+        yield
+        return
+
+    use_primary, state.use_primary = state.use_primary, True
+
+    try:
+        yield
+    finally:
+        state.use_primary = use_primary
+
+
+def pin_writer(request: HttpRequest, response: HttpResponse) -> None:
+    """
+    Keep the reads of a user whose request succeeded in writing on the
+    primary for the sticky window, until the replicas caught up.
+    """
+
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return
+
+    user = get_resolved_user(request)
+
+    if user is not None and user.is_authenticated:
+        cache.set(
+            get_pinned_key(user.pk),
+            True,
+            get_config()["STICKY_WINDOW"].total_seconds(),
+        )
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends the reads of safe requests to a random replica of
+    DATABASE_ROUTING["REPLICAS"] and everything else to the primary.
+
+    Reads outside of requests, such as management commands, reads of
+    unsafe requests, reads after a write of the same request and reads
+    of users pinned by pin_writer() stay on the primary.
+    """
+
+    def __init__(self) -> None:
+        self.replicas = list(get_config()["REPLICAS"])
+        self.databases = {DEFAULT_DB_ALIAS, *self.replicas}
+
+    def db_for_read(self, model: type, **hints: Any) -> Optional[str]:
+        if not self.replicas:
+            return None
+
+        state = current_state.get()
+
+        if state is None or state.reads_from_primary():
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model: type, **hints: Any) -> Optional[str]:
+        state = current_state.get()
+
+        if state is not None:
+            state.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(
+            self,
+            obj1: Model,
+            obj2: Model,
+            **hints: Any,
+    ) -> Optional[bool]:
+        # Replicas hold the same rows, so objects may be related freely.
+        if {obj1._state.db, obj2._state.db} <= self.databases:
+            return True
+
+        return None
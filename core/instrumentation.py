@@ -0,0 +1,134 @@
+import heapq
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+
+DEFAULTS = {
+    "ENABLED": False,
+    "QUERY_COUNT_BUDGET": 20,
+    "LATENCY_BUDGET_MS": 500,
+    "SLOWEST_QUERIES": 3,
+}
+
+IN_LIST_PATTERN = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+STRING_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Recorders of the async request the current context belongs to
+current_recorders: ContextVar[Tuple["QueryRecorder", ...]] = ContextVar(
+    "current_recorders",
+    default=(),
+)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "REQUEST_INSTRUMENTATION", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Reduce a statement to its shape, so the same query with different
+    parameters or IN list lengths is logged identically.
+    """
+
+    sql = STRING_LITERAL_PATTERN.sub("?", sql)
+    sql = NUMBER_LITERAL_PATTERN.sub("?", sql).replace("%s", "?")
+    sql = IN_LIST_PATTERN.sub("IN (...)", sql)
+
+    return WHITESPACE_PATTERN.sub(" ", sql).strip()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper collecting the number of statements, their
+    total duration and the slowest ones of a single request. Only the
+    top N statements are kept, so memory does not grow with the load.
+    """
+
+    def __init__(self, slowest_limit: int) -> None:
+        self.slowest_limit = slowest_limit
+        self.count = 0
+        self.duration = 0.0
+        self.slowest: List[Tuple[float, int, str]] = []
+
+    def __call__(
+            self,
+            execute: Callable,
+            sql: str,
+            params: Any,
+            many: bool,
+            context: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            entry = (duration, self.count, sql)
+
+            if len(self.slowest) < self.slowest_limit:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def record(self) -> ExitStack:
+        """Install the recorder on every configured database connection"""
+
+        stack = ExitStack()
+
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+
+        return stack
+
+    @contextmanager
+    def arecord(self) -> Iterator[None]:
+        """
+        record() for async requests. The async ORM runs their queries on
+        connections shared by the concurrent requests, which dispatch
+        every query to the recorder of its request instead.
+        """
+
+        token = current_recorders.set((*current_recorders.get(), self))
+
+        try:
+            yield
+        finally:
+            current_recorders.reset(token)
+
+    def get_slowest(self) -> List[Tuple[float, str]]:
+        return [
+            (duration, normalize_sql(sql))
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+def record_current_query(
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: Dict[str, Any],
+) -> Any:
+    for recorder in current_recorders.get():
+        execute = partial(recorder, execute)
+
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender: Any, connection: Any, **kwargs) -> None:
+    """connection_created receiver adding record_current_query()"""
+
+    if record_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_current_query)
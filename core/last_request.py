@@ -0,0 +1,142 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Greatest
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "WRITE_BEHIND": False,
+    "STALENESS_WINDOW": timedelta(minutes=1),
+    "FLUSH_INTERVAL": timedelta(seconds=30),
+    "BATCH_SIZE": 500,
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "LAST_REQUEST_AT", {})}
+
+
+class LastRequestBuffer:
+    """
+    In-process write-behind buffer for User.last_request_at.
+
+    Keeps only the latest request time per user and writes all of them
+    with periodic bulk UPDATEs from a background thread, plus a final
+    flush when the process exits.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+
+    def record(
+            self,
+            user_id: int,
+            requested_at: datetime,
+            persisted_at: Optional[datetime],
+    ) -> None:
+        """
+        Remember the request time unless the persisted value is still
+        fresh enough for the configured staleness window.
+        """
+
+        config = get_config()
+
+        if (
+            persisted_at is not None
+            and requested_at - persisted_at < config["STALENESS_WINDOW"]
+            and user_id not in self._pending
+        ):
+            return
+
+        with self._lock:
+            pending_at = self._pending.get(user_id)
+
+            if pending_at is None or pending_at < requested_at:
+                self._pending[user_id] = requested_at
+
+        self._ensure_flusher(config["FLUSH_INTERVAL"])
+
+    def get(self, user_id: int) -> Optional[datetime]:
+        """Return the not yet flushed request time of the user, if any"""
+
+        return self._pending.get(user_id)
+
+    def flush(self) -> int:
+        """Write all pending request times and return the number of users"""
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        user_model = get_user_model()
+        # Another process may have written a later request time already.
+        users = [
+            user_model(
+                pk=user_id,
+                last_request_at=Greatest(
+                    F("last_request_at"),
+                    Value(requested_at, output_field=DateTimeField()),
+                ),
+            )
+            for user_id, requested_at in pending.items()
+        ]
+
+        try:
+            user_model.objects.bulk_update(
+                users,
+                ["last_request_at"],
+                batch_size=get_config()["BATCH_SIZE"],
+            )
+        except DatabaseError:
+            logger.exception("Failed to flush last request times")
+
+            # Requests recorded after the swap are newer, keep them.
+            with self._lock:
+                for user_id, requested_at in pending.items():
+                    self._pending.setdefault(user_id, requested_at)
+
+            return 0
+
+        return len(users)
+
+    def _ensure_flusher(self, interval: timedelta) -> None:
+        # The pid check restarts the thread in workers forked after start.
+        if self._flusher_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+
+            self._flusher_pid = os.getpid()
+            threading.Thread(
+                target=self._run_flusher,
+                args=(interval.total_seconds(),),
+                name="last-request-flusher",
+                daemon=True,
+            ).start()
+
+    def _run_flusher(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.flush()
+            connection.close()
+
+
+last_request_buffer = LastRequestBuffer()
+atexit.register(last_request_buffer.flush)
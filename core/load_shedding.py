@@ -0,0 +1,209 @@
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.http import HttpRequest, JsonResponse
+from django.urls import ResolverMatch
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+
+# Priority classes from the first shed to the never shed one
+PRIORITIES = ("low", "default", "read", "critical")
+
+DEFAULTS = {
+    "ENABLED": True,
+    "ROUTE_PRIORITIES": {},
+    "LIMITS": {},
+    "LATENCY_WINDOW": timedelta(seconds=5),
+    "RETRY_AFTER": timedelta(seconds=5),
+    "TRUST_REQUEST_START": False,
+    "MAX_QUEUE_TIME": timedelta(seconds=30),
+}
+
+# Weight of the latest response in the recent latency of its class
+LATENCY_SMOOTHING = 0.2
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "LOAD_SHEDDING", {})}
+
+
+def parse_request_start(request: HttpRequest) -> Optional[float]:
+    """
+    Epoch time the proxy received the request at, from an X-Request-Start
+    header of seconds, milliseconds or microseconds, optionally prefixed
+    with 't=' the way nginx configurations usually set it.
+    """
+
+    header = request.META.get("HTTP_X_REQUEST_START")
+
+    if not header:
+        return None
+
+    try:
+        started = float(header.removeprefix("t="))
+    except ValueError:
+        return None
+
+    while started > 1e11:
+        started /= 1000
+
+    return started
+
+
+def has_valid_token(request: HttpRequest) -> bool:
+    """
+    Whether the request carries an unexpired access token signed by this
+    service. Only the signature and claims are checked, without a query,
+    as the view authenticates the request after the admission anyway.
+    """
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+
+    if header is None:
+        return False
+
+    try:
+        raw_token = authentication.get_raw_token(header)
+
+        return (
+            raw_token is not None
+            and authentication.get_validated_token(raw_token) is not None
+        )
+    except AuthenticationFailed:
+        return False
+
+
+class PriorityState:
+    """Requests of one priority class handled by this process"""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.latency = 0.0
+        self.updated_at = -math.inf
+
+
+class LoadShedder:
+    """
+    Admission control of one process by priority class.
+
+    A request is shed when its class has LIMITS["MAX_IN_FLIGHT"]
+    requests in flight already, or when the recent latency of the class
+    is over LIMITS["MAX_LATENCY"]. The latency is a moving average of
+    the responses of the class. With TRUST_REQUEST_START it is counted
+    from the X-Request-Start header of the proxy, so the time queued in
+    front of the workers is included, up to MAX_QUEUE_TIME. It is
+    forgotten once no response of the class finished within
+    LATENCY_WINDOW, so a class shed entirely is probed again.
+    Classes without LIMITS and "critical" are never shed.
+    """
+
+    def __init__(self) -> None:
+        config = get_config()
+        self.route_priorities = config["ROUTE_PRIORITIES"]
+        self.latency_window = config["LATENCY_WINDOW"].total_seconds()
+        self.retry_after = math.ceil(config["RETRY_AFTER"].total_seconds())
+        self.trust_request_start = config["TRUST_REQUEST_START"]
+        self.max_queue_time = config["MAX_QUEUE_TIME"].total_seconds()
+        self.limits = {
+            priority: (
+                limits.get("MAX_IN_FLIGHT", math.inf),
+                limits["MAX_LATENCY"].total_seconds()
+                if "MAX_LATENCY" in limits else math.inf,
+            )
+            for priority, limits in config["LIMITS"].items()
+            if priority != "critical"
+        }
+        self.states: Dict[str, PriorityState] = {
+            priority: PriorityState() for priority in PRIORITIES
+        }
+        self.lock = threading.Lock()
+
+    def get_request_start(self, request: HttpRequest) -> float:
+        """
+        Epoch time the latency of the request is counted from. The header
+        is only read when a proxy is trusted to set it, and the queueing
+        time it gives is bounded, so a client can not make up latencies.
+        """
+
+        now = time.time()
+        started = (
+            parse_request_start(request) if self.trust_request_start
+            else None
+        )
+
+        if started is None:
+            return now
+
+        return now - min(max(now - started, 0.0), self.max_queue_time)
+
+    def get_priority(
+            self,
+            request: HttpRequest,
+            resolver_match: ResolverMatch,
+    ) -> str:
+        """
+        Priority of the URL name in ROUTE_PRIORITIES, otherwise "read"
+        for reads with a valid access token and "default" for the rest,
+        so a made up Authorization header gains no priority.
+        """
+
+        priority = self.route_priorities.get(resolver_match.view_name)
+
+        if priority is not None:
+            return priority
+
+        if request.method in SAFE_METHODS and has_valid_token(request):
+            return "read"
+
+        return "default"
+
+    def admit(self, priority: str) -> bool:
+        """Count the request in flight unless its class is over a limit"""
+
+        max_in_flight, max_latency = self.limits.get(
+            priority,
+            (math.inf, math.inf),
+        )
+        state = self.states[priority]
+
+        with self.lock:
+            if state.in_flight >= max_in_flight or (
+                state.latency > max_latency
+                and time.monotonic() - state.updated_at < self.latency_window
+            ):
+                return False
+
+            state.in_flight += 1
+
+        return True
+
+    def release(self, priority: str, latency: float) -> None:
+        state = self.states[priority]
+        now = time.monotonic()
+
+        with self.lock:
+            state.in_flight -= 1
+
+            if now - state.updated_at >= self.latency_window:
+                state.latency = latency
+            else:
+                state.latency += LATENCY_SMOOTHING * (latency - state.latency)
+
+            state.updated_at = now
+
+    def get_shed_response(self) -> JsonResponse:
+        response = JsonResponse(
+            {"error": "The service is overloaded, retry later."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response["Retry-After"] = str(self.retry_after)
+
+        return response
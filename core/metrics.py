@@ -0,0 +1,381 @@
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import DefaultDict, Dict, Iterable, List, Sequence, Tuple
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TOKEN": None,
+    "DIRECTORY": None,
+    "FLUSH_INTERVAL": timedelta(seconds=10),
+    "LATENCY_BUCKETS": (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    ),
+    "QUERY_COUNT_BUCKETS": (0, 1, 2, 3, 5, 10, 20, 50, 100),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Name, type, help text and label names of every family
+FAMILIES = (
+    (
+        "http_requests_total",
+        "counter",
+        "Requests handled, by URL name, method and status.",
+        ("view", "method", "status"),
+    ),
+    (
+        "http_request_duration_seconds",
+        "histogram",
+        "Request latency, by URL name and status.",
+        ("view", "status"),
+    ),
+    (
+        "http_requests_in_flight",
+        "gauge",
+        "Requests being handled.",
+        (),
+    ),
+    (
+        "db_queries_per_request",
+        "histogram",
+        "SQL queries executed per request, by URL name.",
+        ("view",),
+    ),
+    (
+        "db_duration_seconds",
+        "histogram",
+        "Time spent in SQL queries per request, by URL name.",
+        ("view",),
+    ),
+    (
+        "http_requests_shed_total",
+        "counter",
+        "Requests shed by the load shedding, by URL name and priority.",
+        ("view", "priority"),
+    ),
+)
+# Gauges of finished processes are dropped instead of summed
+GAUGES = {name for name, kind, _, _ in FAMILIES if kind == "gauge"}
+
+Sample = Tuple[str, Tuple[str, ...]]
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "METRICS", {})}
+
+
+class ThreadToken:
+    """Kept in the thread local of a thread, dropped when it finishes"""
+
+    __slots__ = ("__weakref__",)
+
+
+class MetricsRegistry:
+    """
+    Per-process metric samples, taken without locks.
+
+    Every thread adds to its own shard, which only that thread writes,
+    and the shards are summed when the samples are read. The shard of a
+    finished thread is folded into a base one, so threads started per
+    request do not grow the shards read by every scrape. With a
+    DIRECTORY, every process periodically writes its samples to a file
+    named by its pid there, so any worker can report all of them.
+    """
+
+    def __init__(self) -> None:
+        config = get_config()
+        self.directory = config["DIRECTORY"]
+        self.flush_interval = config["FLUSH_INTERVAL"].total_seconds()
+        # Bucket bounds of every histogram with their le label values
+        self.buckets = {
+            name: (
+                (*bounds, math.inf),
+                (*map(format_value, bounds), "+Inf"),
+            )
+            for name, bounds in (
+                ("http_request_duration_seconds", config["LATENCY_BUCKETS"]),
+                ("db_queries_per_request", config["QUERY_COUNT_BUCKETS"]),
+                ("db_duration_seconds", config["LATENCY_BUCKETS"]),
+            )
+        }
+        self._local = threading.local()
+        # Shards of live threads by id, and the samples of finished ones
+        self._shards: Dict[int, DefaultDict[Sample, float]] = {}
+        self._base: DefaultDict[Sample, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + self.flush_interval
+
+        if self.directory:
+            Path(self.directory).mkdir(parents=True, exist_ok=True)
+            atexit.register(self.flush)
+
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._local = threading.local()
+        self._shards = {}
+        self._base = defaultdict(float)
+        self._lock = threading.Lock()
+        self._next_flush = time.monotonic() + self.flush_interval
+
+    def get_shard(self) -> DefaultDict[Sample, float]:
+        shard = getattr(self._local, "shard", None)
+
+        if shard is None:
+            shard = self._local.shard = defaultdict(float)
+            # The thread local drops the token when the thread finishes.
+            token = self._local.token = ThreadToken()
+            weakref.finalize(token, self._retire, shard).atexit = False
+
+            with self._lock:
+                self._shards[id(shard)] = shard
+
+        return shard
+
+    def _retire(self, shard: DefaultDict[Sample, float]) -> None:
+        """Fold the shard of a finished thread into the base one"""
+
+        with self._lock:
+            # A shard of the parent process is not registered after a fork.
+            if self._shards.pop(id(shard), None) is not shard:
+                return
+
+            for key, value in shard.items():
+                self._base[key] += value
+
+    def add(self, name: str, labels: Tuple[str, ...], value: float) -> None:
+        self.get_shard()[name, labels] += value
+
+    def observe(
+            self,
+            name: str,
+            labels: Tuple[str, ...],
+            value: float,
+    ) -> None:
+        """
+        Count the value in its bucket of the histogram only, collect()
+        makes the buckets cumulative.
+        """
+
+        shard = self.get_shard()
+        bounds, les = self.buckets[name]
+        le = les[bisect_left(bounds, value)]
+        shard[f"{name}_bucket", (*labels, le)] += 1
+        shard[f"{name}_sum", labels] += value
+        shard[f"{name}_count", labels] += 1
+
+    def observe_request(
+            self,
+            view: str,
+            method: str,
+            status: int,
+            duration: float,
+            query_count: int,
+            query_duration: float,
+    ) -> None:
+        status = str(status)
+        self.add("http_requests_total", (view, method, status), 1)
+        self.observe(
+            "http_request_duration_seconds",
+            (view, status),
+            duration,
+        )
+        self.observe(
+            "db_queries_per_request",
+            (view,),
+            query_count,
+        )
+        self.observe(
+            "db_duration_seconds",
+            (view,),
+            query_duration,
+        )
+
+        if self.directory and time.monotonic() >= self._next_flush:
+            self._next_flush = time.monotonic() + self.flush_interval
+            self.flush()
+
+    def snapshot(self) -> Dict[Sample, float]:
+        """Samples of this process, summed over the shards"""
+
+        with self._lock:
+            samples = self._base.copy()
+            shards = list(self._shards.values())
+
+        # dict.copy() does not let a writing thread in, iteration would.
+        for shard in shards:
+            for key, value in shard.copy().items():
+                samples[key] += value
+
+        return samples
+
+    def flush(self) -> None:
+        """Write the samples of this process to its file in DIRECTORY"""
+
+        path = Path(self.directory, f"{os.getpid()}.json")
+        temporary_path = path.with_suffix(".tmp")
+
+        try:
+            with open(temporary_path, "w") as file:
+                json.dump(
+                    [
+                        [name, labels, value]
+                        for (name, labels), value in self.snapshot().items()
+                    ],
+                    file,
+                )
+
+            os.replace(temporary_path, path)
+        except OSError:
+            logger.exception(f"Failed to write the metrics to {path}")
+
+    def collect(self) -> Dict[Sample, float]:
+        """Samples of this process merged with the ones of DIRECTORY"""
+
+        samples = self.snapshot()
+
+        if not self.directory:
+            return self.cumulate(samples)
+
+        for path in Path(self.directory).glob("*.json"):
+            pid = int(path.stem)
+
+            if pid == os.getpid():
+                continue
+
+            try:
+                with open(path) as file:
+                    rows = json.load(file)
+            except (OSError, ValueError):
+                continue
+
+            alive = is_alive(pid)
+
+            for name, labels, value in rows:
+                if name in GAUGES and not alive:
+                    continue
+
+                samples[name, tuple(labels)] += value
+
+        return self.cumulate(samples)
+
+    def cumulate(self, samples: Dict[Sample, float]) -> Dict[Sample, float]:
+        """Samples with the histogram buckets counting every lower value"""
+
+        cumulated = {}
+        buckets: DefaultDict[Sample, Dict[str, float]] = defaultdict(dict)
+
+        for (name, labels), value in samples.items():
+            if name.endswith("_bucket") and name[:-7] in self.buckets:
+                buckets[name, labels[:-1]][labels[-1]] = value
+            else:
+                cumulated[name, labels] = value
+
+        for (name, labels), counts in buckets.items():
+            total = 0.0
+
+            for le in self.buckets[name[:-7]][1]:
+                total += counts.get(le, 0)
+                cumulated[name, (*labels, le)] = total
+
+        return cumulated
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def escape_label(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def render(
+        samples: Dict[Sample, float],
+        families: Iterable[Tuple[str, str, str, Sequence[str]]] = FAMILIES,
+) -> str:
+    """Prometheus text exposition of the samples of the given families"""
+
+    by_name: DefaultDict[str, List[Tuple[Tuple[str, ...], float]]] = (
+        defaultdict(list)
+    )
+
+    for (name, labels), value in samples.items():
+        by_name[name].append((labels, value))
+
+    lines = []
+
+    for name, kind, description, label_names in families:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if kind == "histogram":
+            series = (
+                (f"{name}_bucket", (*label_names, "le")),
+                (f"{name}_sum", label_names),
+                (f"{name}_count", label_names),
+            )
+        else:
+            series = ((name, label_names),)
+
+        for sample_name, names in series:
+            rows = by_name.get(sample_name, [])
+
+            if sample_name.endswith("_bucket"):
+                # The le bounds are ordered as numbers.
+                rows.sort(key=lambda row: (*row[0][:-1], float(row[0][-1])))
+            else:
+                rows.sort()
+
+            for labels, value in rows:
+                lines.append(
+                    f"{sample_name}{format_labels(names, labels)} "
+                    f"{format_value(value)}"
+                )
+
+    return "\n".join(lines) + "\n"
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(
+        f'{name}="{escape_label(str(value))}"'
+        for name, value in zip(names, values)
+    )
+
+    return f"{{{pairs}}}"
+
+
+registry = MetricsRegistry()
@@ -50,6 +50,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.custom_middleware.MetricsMiddleware",
+    "core.custom_middleware.LoadSheddingMiddleware",
+    "core.custom_middleware.QueryInstrumentationMiddleware",
+    "core.custom_middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -94,6 +98,27 @@ DATABASES = {
     }
 }
 
+# Comma separated hosts of streaming replicas of the default database,
+# tests use the default database in their place.
+for number, host in enumerate(
+    filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")),
+    start=1,
+):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+
+# Reads of safe requests are spread over the REPLICAS aliases, users
+# whose request wrote read from the primary for STICKY_WINDOW after it.
+DATABASE_ROUTING = {
+    "REPLICAS": [alias for alias in DATABASES if alias != "default"],
+    "STICKY_WINDOW": timedelta(seconds=10),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -148,7 +173,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination."
@@ -157,6 +182,38 @@ REST_FRAMEWORK = {
 }
 
 
+# Maximum number of post ids accepted by the batch like/unlike endpoint
+LIKES_BATCH_MAX_SIZE = 100
+
+# Seconds like analytics of ranges ending before today are cached for,
+# None keeps them until likes of past days are removed. Use a finite
+# timeout with a cache not shared by all the processes.
+LIKE_ANALYTICS_CACHE_TIMEOUT = None
+
+# Maximum number of zero-filled buckets one like analytics response has
+LIKE_ANALYTICS_MAX_BUCKETS = 3660
+
+# Likes of the last TRENDING_WINDOW_DAYS days count for trending Posts,
+# losing half of their weight every TRENDING_HALF_LIFE_DAYS days.
+TRENDING_WINDOW_DAYS = 7
+TRENDING_HALF_LIFE_DAYS = 1.0
+
+# Rows fetched per server-side cursor round trip by the data exports
+EXPORT_CHUNK_SIZE = 2000
+
+# New Posts are written into the home timelines of the author followers,
+# Posts written while their author has FANOUT_MAX_FOLLOWERS followers or
+# more are merged in at read time instead, whatever the count later. A new
+# follower gets the BACKFILL_LENGTH newest written Posts of the author,
+# trim_timelines keeps MAX_LENGTH entries per User.
+HOME_TIMELINE = {
+    "FANOUT_MAX_FOLLOWERS": 10000,
+    "FANOUT_BATCH_SIZE": 1000,
+    "BACKFILL_LENGTH": 50,
+    "MAX_LENGTH": 800,
+}
+
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "SocioLink API",
     "DESCRIPTION": "Mini social network where users "
@@ -177,3 +234,103 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
 }
+
+# Seconds an authenticated User is served from the cache without a query
+AUTH_USER_CACHE_TIMEOUT = 60
+
+
+# Write-behind tracking of User.last_request_at, requests within the
+# staleness window of the stored value are not written at all.
+LAST_REQUEST_AT = {
+    "WRITE_BEHIND": True,
+    "STALENESS_WINDOW": timedelta(minutes=1),
+    "FLUSH_INTERVAL": timedelta(seconds=30),
+    "BATCH_SIZE": 500,
+}
+
+
+# Per-request SQL instrumentation with Server-Timing headers and a log of
+# requests over the query count or latency budget.
+REQUEST_INSTRUMENTATION = {
+    "ENABLED": os.getenv("REQUEST_INSTRUMENTATION", "False") == "True",
+    "QUERY_COUNT_BUDGET": 20,
+    "LATENCY_BUDGET_MS": 500,
+    "SLOWEST_QUERIES": 3,
+}
+
+
+# Prometheus metrics served at /api/metrics/ to scrapers sending the
+# TOKEN as a bearer token, without a TOKEN the endpoint answers 403. With
+# a DIRECTORY shared by the worker processes, each of them writes its
+# samples there every FLUSH_INTERVAL and any worker reports the sum.
+# Empty the directory when deploying, files of finished workers keep
+# their counters.
+METRICS = {
+    "ENABLED": os.getenv("METRICS", "True") == "True",
+    "TOKEN": os.getenv("METRICS_TOKEN"),
+    "DIRECTORY": os.getenv("METRICS_DIRECTORY"),
+    "FLUSH_INTERVAL": timedelta(seconds=10),
+}
+
+
+# Per-process load shedding by priority class, from "low" shed first to
+# "critical" never shed. ROUTE_PRIORITIES sets the class of a URL name,
+# other routes are "read" for safe requests with a valid access token
+# and "default" otherwise. A class is shed with MAX_IN_FLIGHT requests in
+# flight or a recent latency over MAX_LATENCY. Latencies older than
+# LATENCY_WINDOW are forgotten. Set TRUST_REQUEST_START only behind a
+# proxy setting X-Request-Start, the queueing time it adds is capped at
+# MAX_QUEUE_TIME.
+LOAD_SHEDDING = {
+    "ENABLED": os.getenv("LOAD_SHEDDING", "True") == "True",
+    "ROUTE_PRIORITIES": {
+        "posts:api-health-check": "critical",
+        "posts:async-api-health-check": "critical",
+        "metrics": "critical",
+        "posts:like-post": "low",
+        "posts:unlike-post": "low",
+        "posts:async-like-post": "low",
+        "posts:async-unlike-post": "low",
+        "posts:like-batch": "low",
+        "posts:data-export": "low",
+        "users:signup": "low",
+    },
+    "LIMITS": {
+        "low": {
+            "MAX_IN_FLIGHT": 4,
+            "MAX_LATENCY": timedelta(seconds=1),
+        },
+        "default": {
+            "MAX_IN_FLIGHT": 16,
+            "MAX_LATENCY": timedelta(seconds=2),
+        },
+        "read": {
+            "MAX_IN_FLIGHT": 32,
+            "MAX_LATENCY": timedelta(seconds=5),
+        },
+    },
+    "LATENCY_WINDOW": timedelta(seconds=5),
+    "RETRY_AFTER": timedelta(seconds=5),
+    "TRUST_REQUEST_START": (
+        os.getenv("LOAD_SHEDDING_TRUST_REQUEST_START", "False") == "True"
+    ),
+    "MAX_QUEUE_TIME": timedelta(seconds=30),
+}
+
+
+# Versioned cache of anonymous post list and detail responses, entries
+# older than TIMEOUT are still served for STALE_TIMEOUT while rebuilding.
+# Requests missing an entry being built wait for it up to REBUILD_WAIT,
+# hit and miss counts are written to the cache every STATS_FLUSH_INTERVAL.
+POSTS_RESPONSE_CACHE = {
+    "ENABLED": True,
+    "TIMEOUT": 60,
+    "STALE_TIMEOUT": 300,
+    "REBUILD_LOCK_TIMEOUT": 10,
+    "REBUILD_WAIT": 1,
+    "STATS_FLUSH_INTERVAL": 10,
+}
+
+# Post list and detail rows read with values() and serialized without
+# building model instances, False serializes them with PostSerializer.
+POSTS_VALUES_SERIALIZATION = True
@@ -0,0 +1,15 @@
+from typing import Any, Dict
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+
+
+def create_user(email: str = "user@test.local", **kwargs: Any) -> User:
+    # No password, hashing one would dominate the test run time.
+    return get_user_model().objects.create_user(email, None, **kwargs)
+
+
+def get_auth(user: User) -> Dict[str, str]:
+    return {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}"}
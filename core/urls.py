@@ -21,13 +21,14 @@ from drf_spectacular.views import (
     SpectacularRedocView
 )
 
-from posts.views import LikeAnalyticsView
+from posts.views import LikeAnalyticsView, MetricsView
 
 
 urlpatterns = [
     path("api/users/", include("users.urls", namespace="users")),
     path("api/posts/", include("posts.urls", namespace="posts")),
     path("api/analytics/", LikeAnalyticsView.as_view(), name="like-analytics"),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
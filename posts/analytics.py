@@ -0,0 +1,140 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from posts.cache import bump_versions, get_versions
+from posts.models import DailyLikeStats, Like
+
+
+ANALYTICS_VERSION_KEY = "like-analytics:version"
+GRANULARITIES = ("day", "week", "month")
+# Shortest bucket length in days, for estimating the number of buckets
+BUCKET_MIN_DAYS = {"day": 1, "week": 7, "month": 28}
+
+
+def truncate_date(value: date, granularity: str) -> date:
+    """First day of the bucket the date belongs to, weeks start on Monday"""
+
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+
+    if granularity == "month":
+        return value.replace(day=1)
+
+    return value
+
+
+def count_buckets(date_from: date, date_to: date, granularity: str) -> int:
+    """Upper bound of the number of buckets in the range"""
+
+    days = (date_to - truncate_date(date_from, granularity)).days
+
+    return days // BUCKET_MIN_DAYS[granularity] + 1
+
+
+def iter_buckets(
+        date_from: date,
+        date_to: date,
+        granularity: str,
+) -> Iterator[date]:
+    bucket = truncate_date(date_from, granularity)
+
+    while bucket <= date_to:
+        yield bucket
+
+        if granularity == "month":
+            bucket = (bucket + timedelta(days=31)).replace(day=1)
+        else:
+            bucket += timedelta(days=7 if granularity == "week" else 1)
+
+
+def invalidate_like_analytics() -> None:
+    """
+    Outdate the cached analytics of closed ranges, needed whenever likes
+    of past days are removed.
+    """
+
+    transaction.on_commit(lambda: bump_versions([ANALYTICS_VERSION_KEY]))
+
+
+def get_like_analytics(
+        date_from: date,
+        date_to: date,
+        granularity: str = "day",
+        post_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Number of likes per day, week or month of the range, empty buckets
+    included. Without filters the DailyLikeStats rollup is aggregated,
+    otherwise the Like table. Closed ranges ending before today are
+    cached until likes of past days are removed.
+    """
+
+    closed = date_to < date.today()
+    cache_key = ":".join(
+        map(
+            str,
+            (
+                "like-analytics",
+                *get_versions([ANALYTICS_VERSION_KEY]),
+                date_from,
+                date_to,
+                granularity,
+                post_id,
+                author_id,
+            ),
+        )
+    )
+
+    if closed:
+        cached = cache.get(cache_key)
+
+        if cached is not None:
+            return cached
+
+    truncated_date = {
+        "day": F("liked_date"),
+        "week": TruncWeek("liked_date"),
+        "month": TruncMonth("liked_date"),
+    }[granularity]
+
+    if post_id is None and author_id is None:
+        queryset = DailyLikeStats.objects.filter(
+            liked_date__range=[date_from, date_to],
+        )
+        total = Sum("likes_count")
+    else:
+        queryset = Like.objects.filter(liked_date__range=[date_from, date_to])
+        total = Count("id")
+
+        if post_id is not None:
+            queryset = queryset.filter(post_id=post_id)
+
+        if author_id is not None:
+            queryset = queryset.filter(post__author_id=author_id)
+
+    counts = dict(
+        queryset.order_by()
+        .annotate(bucket=truncated_date)
+        .values_list("bucket")
+        .annotate(total=total)
+    )
+    aggregated_likes = [
+        {"liked_date": bucket, "likes_count": counts.get(bucket, 0)}
+        for bucket in iter_buckets(date_from, date_to, granularity)
+    ]
+
+    if closed:
+        cache.set(
+            cache_key,
+            aggregated_likes,
+            settings.LIKE_ANALYTICS_CACHE_TIMEOUT,
+        )
+
+    return aggregated_likes
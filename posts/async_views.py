@@ -0,0 +1,376 @@
+import asyncio
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from drf_spectacular.utils import extend_schema
+from rest_framework import exceptions, status
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from posts.conditional import (
+    get_not_modified_response,
+    get_post_etag,
+    get_post_list_etag,
+    get_timestamp,
+    set_validators,
+)
+from posts.models import Post
+from posts.pagination import PostCursorPagination
+from posts.serializers import (
+    LikeSerializer,
+    PostSerializer,
+    get_post_values,
+    serialize_post_values,
+)
+from posts.services import aget_liked_post_ids, like_post, unlike_post
+
+
+def run_in_worker(func: Callable) -> Callable:
+    """
+    Coroutine function running the sync function in a worker thread of
+    its own instead of the one thread shared by thread sensitive calls,
+    so concurrent writes do not queue behind each other. Connections of
+    the worker are closed the way a finished request closes them.
+    """
+
+    def run(*args: Any) -> Any:
+        close_old_connections()
+
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+class AsyncAPIView(GenericAPIView):
+    """
+    GenericAPIView with coroutine handlers, so under ASGI a request
+    waiting for the database holds no thread.
+
+    Authenticators providing aauthenticate() are awaited, any other is
+    run in a thread. Permissions and throttles are checked inline and
+    must not query. Responses are rendered by the view, the ASGI handler
+    would render a DRF Response in a thread.
+    """
+
+    renderer_classes = (JSONRenderer,)
+
+    @classmethod
+    def as_view(cls, **initkwargs: Any) -> Callable:
+        """
+        APIView.as_view() built on View.as_view() directly, as wrapping
+        it in csrf_exempt() hides the coroutine function behind a sync
+        one in Django 4.2. The flag is what CsrfViewMiddleware reads.
+        """
+
+        view = super(APIView, cls).as_view(**initkwargs)
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.csrf_exempt = True
+
+        return view
+
+    async def dispatch(
+            self,
+            request: HttpRequest,
+            *args: Any,
+            **kwargs: Any,
+    ) -> HttpResponseBase:
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self,
+                    request.method.lower(),
+                    self.http_method_not_allowed,
+                )
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs,
+        )
+
+        return self.render_response(self.response)
+
+    async def ainitial(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> None:
+        """initial() with the authentication awaited"""
+
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        renderer, media_type = self.perform_content_negotiation(request)
+        request.accepted_renderer = renderer
+        request.accepted_media_type = media_type
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request: Request) -> None:
+        """Resolve request.user the way Request._authenticate() does"""
+
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, "aauthenticate", None)
+
+            if authenticate is None:
+                authenticate = sync_to_async(authenticator.authenticate)
+
+            try:
+                user_auth_tuple: Optional[Tuple] = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+
+                return
+
+        request._not_authenticated()
+
+    async def aget_serializer_context(
+            self,
+            posts: Iterable[Post],
+    ) -> Dict[str, Any]:
+        """
+        Serializer context with the likes of the request User read
+        beforehand, the serializers can not query in the event loop.
+        """
+
+        return {
+            **self.get_serializer_context(),
+            "liked_post_ids": await aget_liked_post_ids(
+                self.request.user.pk,
+                [post.pk for post in posts],
+            ),
+        }
+
+    @staticmethod
+    def render_response(response: HttpResponseBase) -> HttpResponseBase:
+        if not isinstance(response, Response):
+            return response
+
+        rendered = HttpResponse(
+            response.rendered_content,
+            status=response.status_code,
+        )
+
+        for name, value in response.items():
+            rendered[name] = value
+
+        return rendered
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Async version of the Post list for ASGI servers. Paginated with "
+        "opaque 'cursor' links, legacy 'limit'/'offset' parameters "
+        "are still supported."
+    ),
+    responses=PostSerializer(many=True),
+)
+class AsyncPostListView(AsyncAPIView):
+    queryset = Post.objects.select_related("author")
+    serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+
+    async def get(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> HttpResponse:
+        values = settings.POSTS_VALUES_SERIALIZATION
+        queryset = self.get_queryset()
+        page = await self.paginator.apaginate_queryset(
+            get_post_values(queryset) if values else queryset,
+            request,
+            self,
+        )
+        etag = get_post_list_etag(
+            request.accepted_renderer.format,
+            self.paginator.get_page_links(),
+            page,
+            request.user.pk,
+        )
+        not_modified = get_not_modified_response(request, etag)
+
+        if not_modified is not None:
+            return not_modified
+
+        if values:
+            data = serialize_post_values(
+                page,
+                await aget_liked_post_ids(
+                    request.user.pk,
+                    [row["id"] for row in page],
+                ),
+            )
+        else:
+            data = self.get_serializer(
+                page,
+                many=True,
+                context=await self.aget_serializer_context(page),
+            ).data
+
+        return set_validators(self.get_paginated_response(data), etag)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description="Async version of the detailed Post page by id."
+)
+class AsyncPostDetailView(AsyncAPIView):
+    queryset = Post.objects.select_related("author")
+    serializer_class = PostSerializer
+
+    async def get(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> HttpResponse:
+        values = settings.POSTS_VALUES_SERIALIZATION
+        queryset = self.get_queryset()
+
+        try:
+            post = await (
+                get_post_values(queryset) if values else queryset
+            ).aget(pk=kwargs["pk"])
+        except Post.DoesNotExist:
+            raise Http404
+
+        etag = get_post_etag(
+            request.accepted_renderer.format,
+            post,
+            request.user.pk,
+        )
+        last_modified = get_timestamp(
+            post["updated_at"] if values else post.updated_at
+        )
+        not_modified = get_not_modified_response(
+            request,
+            etag,
+            last_modified,
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        if values:
+            data = serialize_post_values(
+                [post],
+                await aget_liked_post_ids(request.user.pk, [post["id"]]),
+            )[0]
+        else:
+            data = self.get_serializer(
+                post,
+                context=await self.aget_serializer_context([post]),
+            ).data
+
+        return set_validators(Response(data), etag, last_modified)
+
+
+class AsyncPostLikeView(AsyncAPIView):
+    """
+    Async view for liking Post by its id,
+    accessible only for authenticated users.
+    """
+
+    serializer_class = LikeSerializer
+    permission_classes = (IsAuthenticated,)
+
+    async def post(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> Response:
+        post_id = kwargs["post_id"]
+
+        # The like and its counters are written in one transaction, which
+        # Django runs only in sync code.
+        if await run_in_worker(like_post)(post_id, request.user.pk):
+            return Response(
+                {"message": "Liked successfully"},
+                status=status.HTTP_201_CREATED,
+            )
+
+        if not await Post.objects.filter(pk=post_id).aexists():
+            raise Http404
+
+        return Response(
+            {"message": "You've already liked this post before."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class AsyncPostUnlikeView(AsyncAPIView):
+    """
+    Async view for unliking a post by ID
+    if this Post has been liked by the user.
+    """
+
+    serializer_class = LikeSerializer
+    permission_classes = (IsAuthenticated,)
+
+    async def delete(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> Response:
+        if not await run_in_worker(unlike_post)(
+            kwargs["post_id"],
+            request.user.pk,
+        ):
+            raise Http404
+
+        return Response(
+            {"message": "Unliked successfully"},
+            status=status.HTTP_200_OK,
+        )
+
+
+async def async_health_check(request: HttpRequest) -> HttpResponse:
+    """
+    Async endpoint for health checking API.
+    Returns a 200 OK response if the service is up.
+    """
+
+    return HttpResponse("OK")
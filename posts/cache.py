@@ -0,0 +1,308 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.db_router import primary_reads
+from posts.conditional import get_not_modified_response
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TIMEOUT": 60,
+    "STALE_TIMEOUT": 300,
+    "REBUILD_LOCK_TIMEOUT": 10,
+    "REBUILD_WAIT": 1,
+    "STATS_FLUSH_INTERVAL": 10,
+}
+
+# Seconds between the checks for an entry built by another request
+REBUILD_POLL_INTERVAL = 0.05
+
+LIST_VERSION_KEY = "posts-cache:list-version"
+AUTHORS_VERSION_KEY = "posts-cache:authors-version"
+STATS_KEY_PREFIX = "posts-cache:stats"
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+# Families of the statistics in the Prometheus metrics
+METRIC_FAMILIES = (
+    (
+        "posts_response_cache_requests_total",
+        "counter",
+        "Anonymous post responses by cache outcome.",
+        ("outcome",),
+    ),
+    (
+        "posts_response_cache_hit_ratio",
+        "gauge",
+        "Share of fresh and stale hits among the cached responses.",
+        (),
+    ),
+)
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "POSTS_RESPONSE_CACHE", {})}
+
+
+def get_post_version_key(post_id: Any) -> str:
+    return f"posts-cache:post-version:{post_id}"
+
+
+def get_versions(keys: List[str]) -> Tuple[int, ...]:
+    """
+    Current values of the version keys. A missing version starts from
+    the current time in nanoseconds, so a version evicted from the
+    cache never repeats one that cached responses were stored under.
+    """
+
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, 0)
+
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(keys: Iterable[str]) -> None:
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def invalidate_posts(post_ids: Iterable[Any]) -> None:
+    """
+    Outdate the cached list pages and details of the given Posts once
+    the current transaction is committed, so no reader can cache the
+    old rows under the new version.
+    """
+
+    keys = [LIST_VERSION_KEY, *map(get_post_version_key, post_ids)]
+    transaction.on_commit(lambda: bump_versions(keys))
+
+
+def invalidate_authors() -> None:
+    """Outdate every cached response after an author has been renamed"""
+
+    transaction.on_commit(lambda: bump_versions([AUTHORS_VERSION_KEY]))
+
+
+class StatsBuffer:
+    """
+    Outcome counts of this process, added to the shared counters in the
+    cache at most once per STATS_FLUSH_INTERVAL instead of per request.
+    """
+
+    def __init__(self) -> None:
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+            due = (
+                time.monotonic() - self._flushed_at
+                >= get_config()["STATS_FLUSH_INTERVAL"]
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+
+        for outcome, count in counts.items():
+            key = f"{STATS_KEY_PREFIX}:{outcome}"
+
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                if not cache.add(key, count, None):
+                    cache.incr(key, count)
+
+
+stats_buffer = StatsBuffer()
+
+
+def record_stat(outcome: str) -> None:
+    stats_buffer.record(outcome)
+
+
+def get_metric_samples() -> Dict[Tuple[str, Tuple[str, ...]], float]:
+    """get_stats() as samples of METRIC_FAMILIES"""
+
+    stats = get_stats()
+    samples = {
+        ("posts_response_cache_requests_total", (name.lower(),)): (
+            stats[name.lower()]
+        )
+        for name in (HIT, STALE, MISS)
+    }
+    samples["posts_response_cache_hit_ratio", ()] = stats["hit_rate"]
+
+    return samples
+
+
+def get_stats() -> Dict[str, Any]:
+    """Counts of all the processes, the ones of this process up to date"""
+
+    stats_buffer.flush()
+
+    keys = {name: f"{STATS_KEY_PREFIX}:{name}" for name in (HIT, STALE, MISS)}
+    counts = cache.get_many(keys.values())
+    stats = {name.lower(): counts.get(key, 0) for name, key in keys.items()}
+    total = sum(stats.values())
+    stats["hit_rate"] = round(
+        (stats["hit"] + stats["stale"]) / total if total else 0.0,
+        4,
+    )
+
+    return stats
+
+
+class ResponseCacheMixin:
+    """
+    Caches successful anonymous GET responses keyed by the absolute URL,
+    the query parameters and the rendered format, and validated against
+    the versions returned by get_cache_version_keys().
+
+    An expired or outdated entry is rebuilt by the one request winning
+    the rebuild lock, while concurrent requests keep serving the stale
+    entry, so a hot page is never rebuilt by every worker at once. On a
+    cold miss they wait up to REBUILD_WAIT for the entry instead, and
+    build the response themselves once it is over.
+    Conditional requests are answered from the cached validators.
+    """
+
+    def get_cache_version_keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def get_response_cache_key(self, request: Request) -> str:
+        query = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+        fingerprint = repr(
+            (
+                request.build_absolute_uri(request.path),
+                query,
+                request.accepted_renderer.format,
+            )
+        )
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+
+        return f"posts-cache:response:{digest}"
+
+    def get_cached_response(
+            self,
+            request: Request,
+            build: Callable[[], HttpResponse],
+    ) -> HttpResponse:
+        config = get_config()
+
+        if not config["ENABLED"] or request.user.is_authenticated:
+            return build()
+
+        cache_key = self.get_response_cache_key(request)
+        lock_key = f"{cache_key}:lock"
+        versions = get_versions(self.get_cache_version_keys())
+        entry = cache.get(cache_key)
+        outcome = MISS
+        locked = False
+
+        if (
+            entry is not None
+            and entry[0] == versions
+            and entry[1] > time.time()
+        ):
+            outcome = HIT
+        else:
+            locked = cache.add(lock_key, True, config["REBUILD_LOCK_TIMEOUT"])
+
+        if not locked and outcome == MISS:
+            if entry is None:
+                entry = self.wait_for_entry(
+                    cache_key,
+                    lock_key,
+                    config["REBUILD_WAIT"],
+                )
+
+            if entry is not None:
+                outcome = HIT if entry[0] == versions else STALE
+
+        if outcome == MISS:
+            try:
+                # A lagging replica must not be cached under new versions.
+                with primary_reads():
+                    response = build()
+
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(
+                        cache_key,
+                        (
+                            versions,
+                            time.time() + config["TIMEOUT"],
+                            response.data,
+                            {
+                                name: response[name]
+                                for name in CACHED_HEADERS
+                                if response.has_header(name)
+                            },
+                        ),
+                        config["TIMEOUT"] + config["STALE_TIMEOUT"],
+                    )
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        else:
+            _, _, data, headers = entry
+            response = get_not_modified_response(
+                request,
+                headers.get("ETag"),
+                parse_http_date_safe(headers.get("Last-Modified")),
+            ) or Response(data, headers=headers)
+
+        record_stat(outcome)
+        response["X-Cache"] = outcome
+
+        return response
+
+    @staticmethod
+    def wait_for_entry(cache_key: str, lock_key: str, timeout: float) -> Any:
+        """
+        Entry built by the request holding the lock, None on timeout or
+        once the lock is released without an entry, e.g. after a 404.
+        """
+
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            time.sleep(REBUILD_POLL_INTERVAL)
+            values = cache.get_many([cache_key, lock_key])
+
+            if cache_key in values or lock_key not in values:
+                return values.get(cache_key)
+
+        return None
@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has been changed in the meantime."
+    default_code = "precondition_failed"
+
+
+def get_etag(*parts: Any) -> str:
+    """Strong ETag of the representation built from the given parts"""
+
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def get_post_version(post: Any) -> Tuple[Any, ...]:
+    """Values of a Post, or of its get_post_values() row, in its ETag"""
+
+    if isinstance(post, dict):
+        return (
+            post["id"],
+            post["updated_at"],
+            post["likes_count"],
+            post["author_name"],
+        )
+
+    return post.pk, post.updated_at, post.likes_count, str(post.author)
+
+
+# The viewer is part of the ETags, the liked_by_me flags of the Posts
+# depend on it.
+def get_post_etag(
+        renderer_format: str,
+        post: Any,
+        viewer_id: Optional[int] = None,
+) -> str:
+    return get_etag(renderer_format, viewer_id, *get_post_version(post))
+
+
+def get_post_list_etag(
+        renderer_format: str,
+        page_links: Any,
+        posts: Iterable[Any],
+        viewer_id: Optional[int] = None,
+) -> str:
+    return get_etag(
+        renderer_format,
+        viewer_id,
+        page_links,
+        [get_post_version(post) for post in posts],
+    )
+
+
+def get_timestamp(value: Optional[datetime]) -> Optional[int]:
+    return int(value.timestamp()) if value else None
+
+
+def get_not_modified_response(
+        request: Request,
+        etag: Optional[str],
+        last_modified: Optional[int] = None,
+) -> Optional[HttpResponse]:
+    """
+    304 response for a GET whose If-None-Match or If-Modified-Since
+    header matches the current representation, 412 response for any
+    failed precondition, None when the request has to be processed.
+    """
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+
+    if response is not None:
+        set_validators(response, etag, last_modified)
+
+    return response
+
+
+def check_preconditions(
+        request: Request,
+        etag: str,
+        last_modified: Optional[int] = None,
+) -> None:
+    """Raise PreconditionFailed when If-Match or similar does not hold"""
+
+    if get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    ) is not None:
+        raise PreconditionFailed
+
+
+def set_validators(
+        response: HttpResponse,
+        etag: Optional[str],
+        last_modified: Optional[int] = None,
+) -> HttpResponse:
+    if etag:
+        response["ETag"] = etag
+
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+
+    return response
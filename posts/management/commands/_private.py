@@ -0,0 +1,94 @@
+import random
+from datetime import date, timedelta
+from io import StringIO
+from typing import Dict, List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+
+from posts.models import Like, Post
+
+
+SEED_EMAIL_DOMAIN = "seed.sociolink.local"
+SEED_PASSWORD = "SeedPassword1."
+
+
+def seed_email(number: int) -> str:
+    return f"user{number}@{SEED_EMAIL_DOMAIN}"
+
+
+def seed_dataset(
+        users_number: int,
+        posts_number: int,
+        likes_number: int,
+        days_number: int = 30,
+        batch_size: int = 1000,
+) -> Dict[str, List[int]]:
+    """
+    Insert a synthetic dataset with bulk_create and bring the denormalized
+    like counters up to date. All users share one precomputed password
+    hash of SEED_PASSWORD, so the seeding does not hash per user.
+    """
+
+    user_model = get_user_model()
+    password_hash = make_password(SEED_PASSWORD)
+    first_number = user_model.objects.count()
+    users = user_model.objects.bulk_create(
+        (
+            user_model(
+                email=seed_email(first_number + number),
+                password=password_hash,
+                pseudonym=f"seed_user_{first_number + number}",
+            )
+            for number in range(users_number)
+        ),
+        batch_size=batch_size,
+    )
+    user_ids = [user.pk for user in users]
+    posts = Post.objects.bulk_create(
+        (
+            Post(
+                author_id=random.choice(user_ids),
+                title=f"Seeded post {number}",
+                text="Seeded post text. " * random.randint(1, 20),
+            )
+            for number in range(posts_number)
+        ),
+        batch_size=batch_size,
+    )
+    post_ids = [post.pk for post in posts]
+
+    like_pairs = set()
+    likes_number = min(likes_number, len(user_ids) * len(post_ids))
+
+    while len(like_pairs) < likes_number:
+        like_pairs.add((random.choice(post_ids), random.choice(user_ids)))
+
+    likes = Like.objects.bulk_create(
+        (
+            Like(post_id=post_id, liked_by_id=user_id)
+            for post_id, user_id in like_pairs
+        ),
+        batch_size=batch_size,
+    )
+
+    # liked_date is auto_now_add, so the dates are spread afterwards.
+    like_ids_per_day: Dict[date, List[int]] = {}
+
+    for like in likes:
+        liked_date = date.today() - timedelta(
+            days=random.randrange(days_number)
+        )
+        like_ids_per_day.setdefault(liked_date, []).append(like.pk)
+
+    for liked_date, like_ids in like_ids_per_day.items():
+        for start in range(0, len(like_ids), batch_size):
+            Like.objects.filter(
+                pk__in=like_ids[start:start + batch_size]
+            ).update(liked_date=liked_date)
+
+    call_command("repair_likes_count", stdout=StringIO())
+    call_command("rebuild_daily_like_stats", stdout=StringIO())
+
+    return {"users": user_ids, "posts": post_ids}
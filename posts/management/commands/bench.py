@@ -0,0 +1,561 @@
+import asyncio
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+)
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import instrumentation
+from core.last_request import last_request_buffer
+from posts.management.commands._private import SEED_PASSWORD, seed_dataset
+
+
+ENDPOINTS = (
+    "post-list",
+    "post-list-100",
+    "post-detail",
+    "like",
+    "unlike",
+    "analytics",
+    "signup",
+    "login",
+    "me",
+    "health",
+    "async-post-list",
+    "async-post-list-100",
+    "async-post-detail",
+    "async-like",
+    "async-unlike",
+    "async-health",
+)
+# Served by the async views through the ASGI handler
+ASYNC_ENDPOINTS = tuple(name for name in ENDPOINTS if name.startswith("async"))
+
+
+def percentile(sorted_values: List[float], rank: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+
+    if not sorted_values:
+        return 0.0
+
+    index = max(0, math.ceil(rank / 100 * len(sorted_values)) - 1)
+
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Database execute wrapper counting the executed statements"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(
+            self,
+            execute: Callable,
+            sql: str,
+            params: Any,
+            many: bool,
+            context: Dict[str, Any],
+    ) -> Any:
+        with self.lock:
+            self.count += 1
+
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self) -> Iterator[None]:
+        """
+        Count the statements of the current context. They are dispatched
+        by core.instrumentation, so the ones the async views run on the
+        worker threads of run_in_worker() are counted as well.
+        """
+
+        for alias in connections:
+            instrumentation.install_query_dispatcher(
+                None,
+                connections[alias],
+            )
+
+        token = instrumentation.current_recorders.set(
+            (*instrumentation.current_recorders.get(), self)
+        )
+
+        try:
+            yield
+        finally:
+            instrumentation.current_recorders.reset(token)
+
+
+class Command(BaseCommand):
+    """
+    Django command for benchmarking the API endpoints in-process.
+
+    Seeds a throwaway test database, drives the real views through the
+    Django test client and reports ops/sec, latency percentiles and SQL
+    queries per request. Results can be saved and compared against a
+    stored baseline.
+
+    The async endpoints are driven through the ASGI handler. With
+    --concurrency above 1, the WSGI endpoints are requested from as
+    many threads while the async ones run as concurrent tasks of one
+    event loop, comparing the throughput of both serving models and
+    the threads each of them needs.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--likes", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of requests in flight at once.",
+        )
+        parser.add_argument(
+            "--endpoints",
+            nargs="+",
+            choices=ENDPOINTS,
+            default=ENDPOINTS,
+            help="Endpoints to benchmark, all of them by default.",
+        )
+        parser.add_argument(
+            "--post-serialization",
+            choices=("values", "serializer"),
+            help=(
+                "Serialize the post list and detail from values() rows or "
+                "with PostSerializer, as POSTS_VALUES_SERIALIZATION sets "
+                "by default."
+            ),
+        )
+        parser.add_argument(
+            "--save",
+            metavar="PATH",
+            help="Save the results as JSON to the given file.",
+        )
+        parser.add_argument(
+            "--baseline",
+            metavar="PATH",
+            help="Compare the results with previously saved ones.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10.0,
+            help="Allowed ops/sec drop against the baseline, in percent.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["post_serialization"] is None:
+            options["post_serialization"] = (
+                "values" if settings.POSTS_VALUES_SERIALIZATION
+                else "serializer"
+            )
+
+        setup_test_environment()
+        # Connections of every thread dispatch to the QueryCounter.
+        connection_created.connect(instrumentation.install_query_dispatcher)
+        # Replica aliases are mirrors of the default test database.
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            serialized_aliases=set(),
+        )
+
+        try:
+            self.stdout.write("Seeding benchmark dataset...")
+            seeded = seed_dataset(
+                options["users"],
+                options["posts"],
+                options["likes"],
+                options["days"],
+            )
+            # Overload is what is measured, shedding would fail requests.
+            with override_settings(
+                POSTS_VALUES_SERIALIZATION=(
+                    options["post_serialization"] == "values"
+                ),
+                LOAD_SHEDDING={"ENABLED": False},
+            ):
+                results = self.run_benchmarks(seeded, options)
+            # Pending writes must land in the test database, not after it.
+            last_request_buffer.flush()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "vendor": connection.vendor,
+            "dataset": {
+                name: options[name]
+                for name in ("users", "posts", "likes", "days")
+            },
+            "iterations": options["iterations"],
+            "concurrency": options["concurrency"],
+            "post_serialization": options["post_serialization"],
+            "results": results,
+        }
+        self.print_results(results)
+
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(report, file, indent=4)
+
+            self.stdout.write(f"Results saved to {options['save']}")
+
+        if options["baseline"]:
+            self.compare_with_baseline(
+                results,
+                options["baseline"],
+                options["threshold"],
+            )
+
+    def get_scenarios(
+            self,
+            seeded: Dict[str, List[int]],
+            options: Dict[str, Any],
+    ) -> Dict[str, Callable[[int], Any]]:
+        """
+        Callables issuing the request number N of every endpoint, the
+        ones of ASYNC_ENDPOINTS return coroutines.
+        """
+
+        client = Client()
+        async_client = AsyncClient()
+        bench_user = get_user_model().objects.create_user(
+            email="bench@bench.local",
+            password=SEED_PASSWORD,
+        )
+        access_token = AccessToken.for_user(bench_user)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {access_token}"}
+        async_auth = {"headers": {"Authorization": f"Bearer {access_token}"}}
+        post_ids = seeded["posts"]
+        like_targets = random.sample(post_ids, len(post_ids))
+        date_to = date.today()
+        date_from = date_to - timedelta(days=options["days"])
+        signup_numbers = itertools.count()
+
+        def target(number: int) -> int:
+            return like_targets[number % len(like_targets)]
+
+        return {
+            "post-list": lambda number: client.get(
+                reverse("posts:post-list-create")
+            ),
+            # Authenticated, so served past the anonymous response cache
+            "post-list-100": lambda number: client.get(
+                reverse("posts:post-list-create"),
+                {"page_size": 100},
+                **auth,
+            ),
+            "post-detail": lambda number: client.get(
+                reverse(
+                    "posts:post-detail-update-delete",
+                    kwargs={"pk": random.choice(post_ids)},
+                )
+            ),
+            "like": lambda number: client.post(
+                reverse("posts:like-post", kwargs={"post_id": target(number)}),
+                **auth,
+            ),
+            "unlike": lambda number: client.delete(
+                reverse(
+                    "posts:unlike-post",
+                    kwargs={"post_id": target(number)},
+                ),
+                **auth,
+            ),
+            "analytics": lambda number: client.get(
+                reverse("like-analytics"),
+                {"date_from": date_from, "date_to": date_to},
+                **auth,
+            ),
+            "signup": lambda number: client.post(
+                reverse("users:signup"),
+                {
+                    "email": f"signup{next(signup_numbers)}@bench.local",
+                    "password": SEED_PASSWORD,
+                },
+            ),
+            "login": lambda number: client.post(
+                reverse("users:token_obtain_pair_and_login"),
+                {"email": bench_user.email, "password": SEED_PASSWORD},
+            ),
+            "me": lambda number: client.get(
+                reverse("users:manage_user_details"),
+                **auth,
+            ),
+            "health": lambda number: client.get(
+                reverse("posts:api-health-check")
+            ),
+            "async-post-list": lambda number: async_client.get(
+                reverse("posts:async-post-list")
+            ),
+            "async-post-list-100": lambda number: async_client.get(
+                reverse("posts:async-post-list"),
+                {"page_size": 100},
+                **async_auth,
+            ),
+            "async-post-detail": lambda number: async_client.get(
+                reverse(
+                    "posts:async-post-detail",
+                    kwargs={"pk": random.choice(post_ids)},
+                )
+            ),
+            "async-like": lambda number: async_client.post(
+                reverse(
+                    "posts:async-like-post",
+                    kwargs={"post_id": target(number)},
+                ),
+                **async_auth,
+            ),
+            "async-unlike": lambda number: async_client.delete(
+                reverse(
+                    "posts:async-unlike-post",
+                    kwargs={"post_id": target(number)},
+                ),
+                **async_auth,
+            ),
+            "async-health": lambda number: async_client.get(
+                reverse("posts:async-api-health-check")
+            ),
+        }
+
+    def run_benchmarks(
+            self,
+            seeded: Dict[str, List[int]],
+            options: Dict[str, Any],
+    ) -> Dict[str, Dict[str, Any]]:
+        scenarios = self.get_scenarios(seeded, options)
+        warmup, iterations = options["warmup"], options["iterations"]
+        concurrency = options["concurrency"]
+        results = {}
+
+        # Endpoints are run in ENDPOINTS order, so unlike follows like.
+        for name in ENDPOINTS:
+            if name not in options["endpoints"]:
+                continue
+
+            scenario = scenarios[name]
+            run = (
+                self.run_async if name in ASYNC_ENDPOINTS
+                else self.run_sync
+            )
+            run(scenario, range(warmup), 1)
+
+            counter = QueryCounter()
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+
+            with counter.record():
+                timings, threads = run(
+                    scenario,
+                    range(warmup, warmup + iterations),
+                    concurrency,
+                    counter,
+                )
+
+            elapsed = time.perf_counter() - started
+            cpu_time = time.process_time() - cpu_started
+            statuses = Counter(str(code) for _, code in timings)
+
+            if any(int(code) >= 500 for code in statuses):
+                raise CommandError(f"Endpoint '{name}' failed: {statuses}")
+
+            latencies_ms = sorted(latency * 1000 for latency, _ in timings)
+            results[name] = {
+                "ops_per_sec": round(iterations / elapsed, 2),
+                "queries_per_request": round(counter.count / iterations, 2),
+                # CPU of the whole process, the in-process database included
+                "cpu_ms_per_request": round(cpu_time / iterations * 1000, 3),
+                "threads": threads,
+                "statuses": dict(statuses),
+                "latency_ms": {
+                    "mean": round(sum(latencies_ms) / iterations, 3),
+                    "p50": round(percentile(latencies_ms, 50), 3),
+                    "p95": round(percentile(latencies_ms, 95), 3),
+                    "p99": round(percentile(latencies_ms, 99), 3),
+                },
+            }
+
+        return results
+
+    @staticmethod
+    def run_sync(
+            scenario: Callable[[int], HttpResponse],
+            numbers: Iterable[int],
+            concurrency: int,
+            counter: Any = None,
+    ) -> Tuple[List[Tuple[float, int]], int]:
+        """
+        Timings and status codes of the requests, made from the current
+        thread or from `concurrency` threads, and the peak thread count.
+        """
+
+        timings = []
+        pending = iter(numbers)
+        threads = threading.active_count()
+
+        def work() -> None:
+            nonlocal threads
+
+            for number in pending:
+                started = time.perf_counter()
+                response = scenario(number)
+                threads = max(threads, threading.active_count())
+                timings.append(
+                    (time.perf_counter() - started, response.status_code)
+                )
+
+        if concurrency == 1:
+            work()
+
+            return timings, threads
+
+        def work_in_thread() -> None:
+            try:
+                with counter.record():
+                    work()
+            finally:
+                connections.close_all()
+
+        workers = [
+            threading.Thread(target=work_in_thread)
+            for _ in range(concurrency)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        return timings, threads
+
+    @staticmethod
+    def run_async(
+            scenario: Callable[[int], Any],
+            numbers: Iterable[int],
+            concurrency: int,
+            counter: Any = None,
+    ) -> Tuple[List[Tuple[float, int]], int]:
+        """
+        Timings and status codes of the requests, made by tasks of one
+        event loop with at most `concurrency` in flight, and the peak
+        thread count.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency)
+        threads = threading.active_count()
+
+        async def timed(number: int) -> Tuple[float, int]:
+            nonlocal threads
+
+            async with semaphore:
+                started = time.perf_counter()
+                response = await scenario(number)
+                threads = max(threads, threading.active_count())
+
+                return time.perf_counter() - started, response.status_code
+
+        async def gather() -> List[Tuple[float, int]]:
+            return await asyncio.gather(*map(timed, numbers))
+
+        return async_to_sync(gather)(), threads
+
+    def print_results(self, results: Dict[str, Dict[str, Any]]) -> None:
+        self.stdout.write(
+            f"{'endpoint':<21}{'ops/sec':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'cpu ms':>9}{'queries':>9}{'threads':>9}"
+        )
+
+        for name, result in results.items():
+            latency = result["latency_ms"]
+            self.stdout.write(
+                f"{name:<21}{result['ops_per_sec']:>10}{latency['p50']:>10}"
+                f"{latency['p95']:>10}{latency['p99']:>10}"
+                f"{result['cpu_ms_per_request']:>9}"
+                f"{result['queries_per_request']:>9}{result['threads']:>9}"
+            )
+
+    def compare_with_baseline(
+            self,
+            results: Dict[str, Dict[str, Any]],
+            baseline_path: str,
+            threshold: float,
+    ) -> None:
+        with open(baseline_path) as file:
+            baseline = json.load(file)["results"]
+
+        regressions = []
+
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+
+            expected = baseline[name]
+            change = (
+                result["ops_per_sec"] / expected["ops_per_sec"] - 1
+            ) * 100
+            self.stdout.write(
+                f"{name:<21}{change:>+9.1f}% ops/sec, queries "
+                f"{expected['queries_per_request']} -> "
+                f"{result['queries_per_request']}"
+            )
+
+            if change < -threshold:
+                regressions.append(f"{name}: ops/sec dropped {-change:.1f}%")
+
+            if result["queries_per_request"] > (
+                expected["queries_per_request"]
+            ):
+                regressions.append(f"{name}: more queries per request")
+
+        if regressions:
+            raise CommandError(
+                "Performance regressions against the baseline:\n"
+                + "\n".join(regressions)
+            )
+
+        self.stdout.write(self.style.SUCCESS("No regressions found."))
@@ -0,0 +1,362 @@
+import json
+import re
+from datetime import date, timedelta
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from posts.management.commands._private import SEED_PASSWORD, seed_dataset
+from posts.models import Post
+
+
+# Statements with a plan worth checking, the rest insert or manage
+# transactions.
+EXPLAINED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+# Full table scan of a SQLite plan, index scans name the index used
+SQLITE_TABLE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+Statement = Tuple[str, str, Any]
+
+
+class StatementRecorder:
+    """Database execute wrapper keeping the first run of every statement"""
+
+    def __init__(self) -> None:
+        self.scenario = ""
+        self.statements: Dict[str, Statement] = {}
+
+    def __call__(
+            self,
+            execute: Callable,
+            sql: str,
+            params: Any,
+            many: bool,
+            context: Dict[str, Any],
+    ) -> Any:
+        keyword = sql.lstrip().split(" ", 1)[0].upper()
+
+        if not many and keyword in EXPLAINED_STATEMENTS:
+            self.statements.setdefault(sql, (self.scenario, sql, params))
+
+        return execute(sql, params, many, context)
+
+
+def iter_seq_scans(plan: Dict[str, Any]) -> Iterator[str]:
+    """Tables read by the Seq Scan nodes of a PostgreSQL plan"""
+
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+
+    for subplan in plan.get("Plans", []):
+        yield from iter_seq_scans(subplan)
+
+
+class Command(BaseCommand):
+    """
+    Django command for catching index regressions before deploy.
+
+    Seeds a throwaway test database, requests the posts and users
+    endpoints through the Django test client and runs EXPLAIN on every
+    statement they executed. Fails when a plan reads a table
+    sequentially or, on PostgreSQL, when its estimated cost exceeds
+    the budget.
+
+    PostgreSQL plans are made with sequential scans disabled, so one
+    remains only where no index can serve the statement, whatever the
+    size of the seeded tables. SQLite plans have no costs, there only
+    full table scans are caught.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--likes", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument(
+            "--max-cost",
+            type=float,
+            default=1000.0,
+            help="Highest estimated cost of a plan, in planner units.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(
+                "Query plans can be checked on PostgreSQL and SQLite only."
+            )
+
+        self.verbosity = options["verbosity"]
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            serialized_aliases=set(),
+        )
+
+        try:
+            self.stdout.write("Seeding query plan dataset...")
+            seeded = seed_dataset(
+                options["users"],
+                options["posts"],
+                options["likes"],
+                options["days"],
+            )
+            call_command("compute_trending_scores", stdout=StringIO())
+
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            # Cached responses would hide the statements of their views.
+            cache.clear()
+
+            # Every scenario has to reach its view.
+            with override_settings(LOAD_SHEDDING={"ENABLED": False}):
+                statements = self.record_statements(seeded, options)
+            failures = self.check_plans(statements, options["max_cost"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} of {len(statements)} query plans failed:\n"
+                + "\n".join(failures)
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"All {len(statements)} query plans passed.")
+        )
+
+    def get_scenarios(
+            self,
+            seeded: Dict[str, List[int]],
+            options: Dict[str, Any],
+    ) -> Dict[str, Callable[[], HttpResponse]]:
+        client = Client()
+        plan_user = get_user_model().objects.create_user(
+            email="plans@plans.local",
+            password=SEED_PASSWORD,
+        )
+        access_token = AccessToken.for_user(plan_user)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {access_token}"}
+        post_ids = seeded["posts"]
+        post_id = post_ids[len(post_ids) // 2]
+        author_id = Post.objects.get(pk=post_id).author_id
+        post_list = reverse("posts:post-list-create")
+        analytics = reverse("like-analytics")
+        date_to = date.today()
+        date_from = date_to - timedelta(days=options["days"])
+
+        def next_page() -> HttpResponse:
+            return client.get(client.get(post_list).json()["next"])
+
+        return {
+            "post-list": lambda: client.get(post_list),
+            "post-list-next": next_page,
+            "post-list-legacy": lambda: client.get(
+                post_list,
+                {"limit": 20, "offset": len(post_ids) // 2},
+            ),
+            "post-detail": lambda: client.get(
+                reverse(
+                    "posts:post-detail-update-delete",
+                    kwargs={"pk": post_id},
+                )
+            ),
+            "post-trending": lambda: client.get(
+                reverse("posts:post-trending")
+            ),
+            "post-search": lambda: client.get(
+                reverse("posts:post-search"),
+                {"q": "seeded text"},
+            ),
+            "post-create": lambda: client.post(
+                post_list,
+                {"title": "Query plans", "text": "Query plans text."},
+                **auth,
+            ),
+            "like": lambda: client.post(
+                reverse("posts:like-post", kwargs={"post_id": post_id}),
+                **auth,
+            ),
+            "unlike": lambda: client.delete(
+                reverse("posts:unlike-post", kwargs={"post_id": post_id}),
+                **auth,
+            ),
+            "likers": lambda: client.get(
+                reverse("posts:post-likers", kwargs={"post_id": post_id}),
+            ),
+            "like-batch": lambda: client.post(
+                reverse("posts:like-batch"),
+                {"like": post_ids[:5], "unlike": post_ids[5:10]},
+                content_type="application/json",
+                **auth,
+            ),
+            "follow": lambda: client.post(
+                reverse(
+                    "posts:follow-author",
+                    kwargs={"author_id": author_id},
+                ),
+                **auth,
+            ),
+            "timeline": lambda: client.get(
+                reverse("posts:home-timeline"),
+                **auth,
+            ),
+            "unfollow": lambda: client.delete(
+                reverse(
+                    "posts:unfollow-author",
+                    kwargs={"author_id": author_id},
+                ),
+                **auth,
+            ),
+            "analytics": lambda: client.get(
+                analytics,
+                {"date_from": date_from, "date_to": date_to},
+                **auth,
+            ),
+            "analytics-post": lambda: client.get(
+                analytics,
+                {
+                    "date_from": date_from,
+                    "date_to": date_to,
+                    "post_id": post_id,
+                },
+                **auth,
+            ),
+            "analytics-author": lambda: client.get(
+                analytics,
+                {
+                    "date_from": date_from,
+                    "date_to": date_to,
+                    "author_id": author_id,
+                    "granularity": "week",
+                },
+                **auth,
+            ),
+            "signup": lambda: client.post(
+                reverse("users:signup"),
+                {"email": "signup@plans.local", "password": SEED_PASSWORD},
+            ),
+            "login": lambda: client.post(
+                reverse("users:token_obtain_pair_and_login"),
+                {"email": plan_user.email, "password": SEED_PASSWORD},
+            ),
+            "me": lambda: client.get(
+                reverse("users:manage_user_details"),
+                **auth,
+            ),
+            "user-activity": lambda: client.get(
+                reverse(
+                    "users:user_activity",
+                    kwargs={"user_id": plan_user.pk},
+                ),
+                **auth,
+            ),
+        }
+
+    def record_statements(
+            self,
+            seeded: Dict[str, List[int]],
+            options: Dict[str, Any],
+    ) -> List[Statement]:
+        recorder = StatementRecorder()
+
+        for name, scenario in self.get_scenarios(seeded, options).items():
+            recorder.scenario = name
+
+            with connection.execute_wrapper(recorder):
+                response = scenario()
+
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"Scenario '{name}' failed: {response.status_code}"
+                )
+
+        return list(recorder.statements.values())
+
+    def check_plans(
+            self,
+            statements: List[Statement],
+            max_cost: float,
+    ) -> List[str]:
+        failures = []
+
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            # A sequential scan stays in the plan only if no index can
+            # serve the statement.
+            for scenario, sql, params in statements:
+                seq_scans, cost = self.explain(sql, params)
+                problems = [
+                    f"sequential scan of {table}" for table in seq_scans
+                ]
+
+                if cost is not None and cost > max_cost:
+                    problems.append(f"cost {cost:.2f} over {max_cost:.2f}")
+
+                self.stdout.write(
+                    f"{scenario:<18}"
+                    f"{'-' if cost is None else f'{cost:.2f}':>12}  "
+                    f"{'FAIL' if problems else 'ok':<6}"
+                    f"{sql[:80]}"
+                )
+
+                if self.verbosity > 1:
+                    self.stdout.write(f"{sql}\n{params}\n")
+
+                if problems:
+                    failures.append(
+                        f"{scenario}: {', '.join(problems)}\n    {sql}"
+                    )
+
+        return failures
+
+    @staticmethod
+    def explain(sql: str, params: Any) -> Tuple[List[str], Optional[float]]:
+        """
+        Tables read sequentially by the plan of the statement and its
+        estimated total cost, which SQLite does not report.
+        """
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+
+                plan = plan[0]["Plan"]
+
+                return list(iter_seq_scans(plan)), plan["Total Cost"]
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            matches = (
+                SQLITE_TABLE_SCAN.match(detail)
+                for *_, detail in cursor.fetchall()
+            )
+
+            return [match[1] for match in matches if match], None
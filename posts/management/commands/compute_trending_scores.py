@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from posts.trending import (
+    get_changed_post_ids,
+    prune_post_scores,
+    update_post_scores,
+)
+
+
+class Command(BaseCommand):
+    """
+    Django command for refreshing the time-decayed trending scores.
+    Scores of Posts not liked within the window anymore are dropped,
+    then the Posts liked or updated since the last run and the ones
+    whose first counted like left the window are recomputed. Meant to
+    be run periodically, e.g. every few minutes from cron.
+    """
+
+    help = (  # noqa: VNE003
+        "Refresh the trending scores of the Posts liked or unliked since "
+        "the last run and of the ones whose oldest counted like left the "
+        "window. Scores are approximate between runs: a like keeps "
+        "counting until the first run after it left the "
+        "TRENDING_WINDOW_DAYS window, so run it at least daily."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute all the Posts liked within the window or scored.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of posts recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        chunk_size = options["chunk_size"]
+
+        if chunk_size < 1:
+            raise CommandError("The '--chunk-size' must be positive.")
+
+        today = date.today()
+        pruned_counter = prune_post_scores(today)
+        post_ids = get_changed_post_ids(today, full=options["full"])
+        scored_counter = 0
+
+        for start in range(0, len(post_ids), chunk_size):
+            scored_counter += update_post_scores(
+                post_ids[start:start + chunk_size],
+                today,
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed {len(post_ids)} posts, {scored_counter} "
+                f"scored, {pruned_counter} dropped out of the window."
+            )
+        )
@@ -0,0 +1,85 @@
+import sys
+import time
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from posts.exports import (
+    CONTENT_TYPES,
+    DATASETS,
+    export,
+    get_export_filename,
+)
+
+
+class Command(BaseCommand):
+    """
+    Django command for streaming posts, likes or daily like counts into
+    an NDJSON or CSV file, read with a server-side cursor in chunks.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("dataset", choices=DATASETS)
+        parser.add_argument(
+            "--output-format",
+            choices=CONTENT_TYPES,
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--since",
+            help="ISO date or datetime to export only the recent rows.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the export with gzip.",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to, '-' for stdout (defaults to "
+                 "'<dataset>.<format>' in the current directory).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        output_format = options["output_format"]
+        output = options["output"] or get_export_filename(
+            options["dataset"],
+            output_format,
+            options["gzip"],
+        )
+
+        try:
+            chunks = export(
+                options["dataset"],
+                output_format,
+                options["since"],
+                options["gzip"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if output == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+
+            sys.stdout.buffer.flush()
+            return
+
+        started = time.perf_counter()
+        written_bytes = 0
+
+        with open(output, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                written_bytes += len(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {options['dataset']} to {output} "
+                f"({written_bytes} bytes in "
+                f"{time.perf_counter() - started:.1f}s)."
+            )
+        )
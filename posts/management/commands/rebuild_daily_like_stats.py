@@ -0,0 +1,122 @@
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from posts.analytics import invalidate_like_analytics
+from posts.models import DailyLikeStats, Like
+
+
+def parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(
+            f"Date '{value}' is invalid. It supposed to be YYYY-MM-DD."
+        )
+
+
+class Command(BaseCommand):
+    """
+    Django command for backfilling or rebuilding the DailyLikeStats rollup
+    from the raw Like table, processing the history in date chunks.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--date-from",
+            type=parse_date,
+            help="First day to rebuild (defaults to the earliest like).",
+        )
+        parser.add_argument(
+            "--date-to",
+            type=parse_date,
+            help="Last day to rebuild (defaults to the latest like).",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=30,
+            help="Number of days aggregated per transaction.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["chunk_days"] < 1:
+            raise CommandError("The '--chunk-days' must be positive.")
+
+        bounds = Like.objects.aggregate(
+            first_day=Min("liked_date"),
+            last_day=Max("liked_date"),
+        )
+        date_from = options["date_from"] or bounds["first_day"]
+        date_to = options["date_to"] or bounds["last_day"]
+
+        if date_from is None or date_to is None:
+            self.stdout.write("There are no likes to aggregate.")
+            return
+
+        if date_to < date_from:
+            raise CommandError(
+                "The '--date-to' must to be greater than "
+                "'--date-from' or equal."
+            )
+
+        chunk_start = date_from
+        days_counter = 0
+
+        while chunk_start <= date_to:
+            chunk_end = min(
+                chunk_start + timedelta(days=options["chunk_days"] - 1),
+                date_to,
+            )
+            days_counter += self.rebuild_chunk(chunk_start, chunk_end)
+
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Rebuilt {chunk_start} - {chunk_end}")
+
+            chunk_start = chunk_end + timedelta(days=1)
+
+        invalidate_like_analytics()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Daily like stats rebuilt for {days_counter} days "
+                f"between {date_from} and {date_to}."
+            )
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_chunk(chunk_start: date, chunk_end: date) -> int:
+        """
+        Replace the rollup rows of the chunk with freshly aggregated ones.
+        Existing rows are locked first so concurrent like/unlike
+        increments wait for the rebuilt values instead of being lost.
+        """
+
+        day_range = [chunk_start, chunk_end]
+        list(
+            DailyLikeStats.objects.select_for_update()
+            .filter(liked_date__range=day_range)
+            .values_list("pk")
+        )
+        aggregated_likes = (
+            Like.objects.filter(liked_date__range=day_range)
+            .order_by()
+            .values("liked_date")
+            .annotate(total=Count("id"))
+        )
+        DailyLikeStats.objects.filter(liked_date__range=day_range).delete()
+        day_stats = DailyLikeStats.objects.bulk_create(
+            DailyLikeStats(
+                liked_date=row["liked_date"],
+                likes_count=row["total"],
+            )
+            for row in aggregated_likes
+        )
+
+        return len(day_stats)
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Post, Like
+
+
+class Command(BaseCommand):
+    """
+    Django command for recomputing Post.likes_count from the Like table
+    and repairing the counters that drifted.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of posts locked and recomputed per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drifted counters without saving them.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+        last_post_id = 0
+        checked_counter = 0
+        repaired_counter = 0
+
+        while True:
+            with transaction.atomic():
+                # Locking the chunk keeps concurrent like/unlike counter
+                # updates from interleaving with the recomputation.
+                stored_counts = list(
+                    Post.objects.select_for_update()
+                    .filter(pk__gt=last_post_id)
+                    .order_by("pk")
+                    .values_list("pk", "likes_count")[:chunk_size]
+                )
+
+                if not stored_counts:
+                    break
+
+                post_ids = [post_id for post_id, _ in stored_counts]
+                actual_counts = dict(
+                    Like.objects.filter(post_id__in=post_ids)
+                    .order_by()
+                    .values_list("post")
+                    .annotate(total=Count("id"))
+                )
+                drifted_posts = [
+                    Post(pk=post_id, likes_count=actual_counts.get(post_id, 0))
+                    for post_id, likes_count in stored_counts
+                    if likes_count != actual_counts.get(post_id, 0)
+                ]
+
+                if options["verbosity"] > 1:
+                    for post in drifted_posts:
+                        self.stdout.write(
+                            f"Post ID {post.pk}: likes_count -> "
+                            f"{post.likes_count}"
+                        )
+
+                if drifted_posts and not dry_run:
+                    Post.objects.bulk_update(
+                        drifted_posts,
+                        ["likes_count", "updated_at"],
+                    )
+
+            last_post_id = post_ids[-1]
+            checked_counter += len(stored_counts)
+            repaired_counter += len(drifted_posts)
+
+        action = "would be repaired" if dry_run else "repaired"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked_counter} posts, "
+                f"{repaired_counter} counters {action}."
+            )
+        )
@@ -0,0 +1,525 @@
+import csv
+import json
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from io import StringIO
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence, Tuple, Type
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from posts.management.commands._private import SEED_PASSWORD, seed_email
+from posts.models import Like, Post
+
+
+POST_TITLE_PREFIX = "Seeded post #"
+WORDS = (
+    "social network post like share friend photo travel music food "
+    "weekend morning coffee city story idea project news game movie"
+).split()
+
+
+def seed_password(number: int) -> str:
+    return f"{SEED_PASSWORD}{number}"
+
+
+def to_copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+
+    if isinstance(value, bool):
+        return "t" if value else "f"
+
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return str(value)
+
+
+class Command(BaseCommand):
+    """
+    Django command for generating a production-scale synthetic dataset.
+
+    Users, posts and likes are inserted in large batches with COPY on
+    PostgreSQL and executemany INSERTs elsewhere. Post popularity follows
+    a Zipf distribution and likes are dated across the configured months
+    after their post was created. Progress is checkpointed after every
+    committed batch, so an interrupted run continues where it stopped.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--likes", type=int, default=5_000_000)
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=6,
+            help="Length of the period posts and likes are spread over.",
+        )
+        parser.add_argument(
+            "--zipf-exponent",
+            type=float,
+            default=1.1,
+            help="Skew of the post popularity, higher is more skewed.",
+        )
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Random seed, the same seed generates the same dataset.",
+        )
+        parser.add_argument(
+            "--unique-passwords",
+            action="store_true",
+            help=(
+                "Hash an own password for every user in a process pool "
+                f"('{SEED_PASSWORD}<number>') instead of sharing one "
+                f"precomputed hash of '{SEED_PASSWORD}'."
+            ),
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes hashing unique passwords.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use executemany INSERTs even on PostgreSQL.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default="seed_checkpoint.json",
+            help="File the progress is saved to for resuming.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and seed from scratch.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["batch_size"] < 1:
+            raise CommandError("The '--batch-size' must be positive.")
+
+        self.options = options
+        self.use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        self.checkpoint_path = options["checkpoint"]
+        self.progress = self.load_progress()
+        self.period_end = datetime.fromisoformat(self.progress["period_end"])
+        self.period_start = self.period_end - timedelta(
+            days=30 * self.progress["months"]
+        )
+        self.rows_counter = 0
+        started = time.perf_counter()
+
+        self.seed_users()
+        self.seed_posts()
+        self.seed_likes()
+
+        self.stdout.write("Recomputing like counters and daily stats...")
+        call_command("repair_likes_count", stdout=StringIO())
+        call_command("rebuild_daily_like_stats", stdout=StringIO())
+        os.remove(self.checkpoint_path)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {self.rows_counter} rows in {elapsed:.1f}s "
+                f"({self.rows_counter / elapsed:.0f} rows/sec)."
+            )
+        )
+
+    def load_progress(self) -> Dict[str, Any]:
+        options = self.options
+
+        if os.path.exists(self.checkpoint_path) and not options["restart"]:
+            with open(self.checkpoint_path) as file:
+                progress = json.load(file)
+
+            self.stdout.write(
+                f"Resuming from {self.checkpoint_path}: "
+                f"{progress['users_done']} users, "
+                f"{progress['posts_done']} posts, likes of "
+                f"{progress['likers_done']} users done."
+            )
+
+            return progress
+
+        if get_user_model().objects.filter(email=seed_email(0)).exists():
+            raise CommandError(
+                "The database is already seeded, seed a fresh one or resume "
+                "an interrupted run with its checkpoint file."
+            )
+
+        last_post = Post.objects.order_by("-pk").first()
+        last_like = Like.objects.order_by("-pk").first()
+
+        return {
+            "users": options["users"],
+            "posts": options["posts"],
+            "likes": options["likes"],
+            "months": options["months"],
+            "zipf_exponent": options["zipf_exponent"],
+            "seed": options["seed"],
+            "period_end": timezone.now().isoformat(),
+            "first_user_id": None,
+            "users_done": 0,
+            "last_post_id": last_post.pk if last_post else 0,
+            "posts_done": 0,
+            "last_like_id": last_like.pk if last_like else 0,
+            "likers_done": 0,
+            "likes_done": 0,
+        }
+
+    def save_progress(self) -> None:
+        temporary_path = f"{self.checkpoint_path}.tmp"
+
+        with open(temporary_path, "w") as file:
+            json.dump(self.progress, file, indent=4)
+
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def insert(
+            self,
+            model: Type[models.Model],
+            objects: List[models.Model],
+    ) -> None:
+        """Insert the objects keeping the explicitly set dates"""
+
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ", ".join(
+            connection.ops.quote_name(field.column) for field in fields
+        )
+
+        if self.use_copy:
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+
+            for instance in objects:
+                writer.writerow(
+                    to_copy_value(getattr(instance, field.attname))
+                    for field in fields
+                )
+
+            buffer.seek(0)
+
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table} ({columns}) FROM STDIN "
+                    "WITH (FORMAT csv, NULL '\\N')",
+                    buffer,
+                )
+        else:
+            # bulk_create would overwrite the auto_now_add dates.
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"VALUES ({', '.join(['%s'] * len(fields))})",
+                    [
+                        [
+                            field.get_db_prep_save(
+                                getattr(instance, field.attname),
+                                connection,
+                            )
+                            for field in fields
+                        ]
+                        for instance in objects
+                    ],
+                )
+
+        self.rows_counter += len(objects)
+
+    def report(
+            self,
+            table: str,
+            done: int,
+            total: int,
+            inserted: int,
+            started: float,
+    ) -> None:
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{table}: {done}/{total} "
+            f"({inserted / max(elapsed, 1e-9):.0f} rows/sec)"
+        )
+
+    def seed_users(self) -> None:
+        progress = self.progress
+        user_model = get_user_model()
+        total = progress["users"]
+        batch_size = self.options["batch_size"]
+
+        # A batch committed after the last checkpoint write is skipped.
+        while progress["users_done"] < total and user_model.objects.filter(
+            email=seed_email(progress["users_done"])
+        ).exists():
+            progress["users_done"] = min(
+                progress["users_done"] + batch_size,
+                total,
+            )
+
+        shared_hash = None
+        pool = None
+
+        if self.options["unique_passwords"]:
+            pool = ProcessPoolExecutor(self.options["processes"])
+        else:
+            shared_hash = make_password(SEED_PASSWORD)
+
+        started = time.perf_counter()
+        first_row = self.rows_counter
+
+        try:
+            while progress["users_done"] < total:
+                start = progress["users_done"]
+                numbers = range(start, min(start + batch_size, total))
+
+                if pool:
+                    hashes = list(
+                        pool.map(
+                            make_password,
+                            map(seed_password, numbers),
+                            chunksize=max(len(numbers) // 64, 1),
+                        )
+                    )
+                else:
+                    hashes = [shared_hash] * len(numbers)
+
+                rng = random.Random(f"{progress['seed']}-users-{start}")
+                users = [
+                    user_model(
+                        email=seed_email(number),
+                        password=password_hash,
+                        first_name=rng.choice(WORDS).title(),
+                        last_name=rng.choice(WORDS).title(),
+                        pseudonym=f"seed_user_{number}",
+                        date_joined=self.period_start,
+                        last_request_at=self.period_end,
+                    )
+                    for number, password_hash in zip(numbers, hashes)
+                ]
+
+                with transaction.atomic():
+                    self.insert(user_model, users)
+
+                progress["users_done"] = numbers.stop
+                self.save_progress()
+                self.report(
+                    "users",
+                    numbers.stop,
+                    total,
+                    self.rows_counter - first_row,
+                    started,
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if progress["first_user_id"] is None:
+            progress["first_user_id"] = user_model.objects.get(
+                email=seed_email(0)
+            ).pk
+            self.save_progress()
+
+    def get_user_ids(self) -> Sequence[int]:
+        return array(
+            "q",
+            get_user_model().objects.filter(
+                pk__gte=self.progress["first_user_id"],
+                email__endswith=seed_email(0).split("@")[1],
+            ).order_by("pk").values_list("pk", flat=True).iterator(
+                chunk_size=self.options["batch_size"]
+            ),
+        )
+
+    def get_post_created_at(self, number: int) -> datetime:
+        """Posts are spread evenly, so ids grow together with the dates"""
+
+        period = self.period_end - self.period_start
+        return self.period_start + period * (number / self.progress["posts"])
+
+    def seed_posts(self) -> None:
+        progress = self.progress
+        total = progress["posts"]
+        batch_size = self.options["batch_size"]
+        user_ids = self.get_user_ids()
+
+        if progress["posts_done"] < total and Post.objects.filter(
+            pk__gt=progress["last_post_id"],
+            title=f"{POST_TITLE_PREFIX}{progress['posts_done']}",
+        ).exists():
+            progress["posts_done"] = min(
+                progress["posts_done"] + batch_size,
+                total,
+            )
+            progress["last_post_id"] = Post.objects.latest("pk").pk
+
+        started = time.perf_counter()
+        first_row = self.rows_counter
+
+        while progress["posts_done"] < total:
+            start = progress["posts_done"]
+            numbers = range(start, min(start + batch_size, total))
+            rng = random.Random(f"{progress['seed']}-posts-{start}")
+            posts = [
+                Post(
+                    author_id=rng.choice(user_ids),
+                    title=f"{POST_TITLE_PREFIX}{number}",
+                    text=" ".join(rng.choices(WORDS, k=rng.randint(5, 60))),
+                    created_at=self.get_post_created_at(number),
+                    updated_at=self.get_post_created_at(number),
+                )
+                for number in numbers
+            ]
+
+            with transaction.atomic():
+                self.insert(Post, posts)
+                last_post_id = Post.objects.latest("pk").pk
+
+            progress["posts_done"] = numbers.stop
+            progress["last_post_id"] = last_post_id
+            self.save_progress()
+            self.report(
+                "posts",
+                numbers.stop,
+                total,
+                self.rows_counter - first_row,
+                started,
+            )
+
+    def get_post_ids(self) -> Sequence[int]:
+        return array(
+            "q",
+            Post.objects.filter(title__startswith=POST_TITLE_PREFIX)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=self.options["batch_size"]),
+        )
+
+    def generate_user_likes(
+            self,
+            liker_number: int,
+            popularity: Sequence[int],
+            cumulative_weights: Sequence[float],
+    ) -> List[Tuple[int, date]]:
+        """
+        Deterministic likes of one user as (post number, liked date)
+        pairs. Posts are drawn by their Zipf popularity without repeats,
+        and most of the likes come in the first days after publishing.
+        """
+
+        progress = self.progress
+        rng = random.Random(f"{progress['seed']}-likes-{liker_number}")
+        mean_likes = progress["likes"] / progress["users"]
+        likes_number = min(
+            int(rng.expovariate(1 / mean_likes)) if mean_likes else 0,
+            len(popularity) // 2,
+        )
+        total_weight = cumulative_weights[-1]
+        post_numbers = set()
+
+        while len(post_numbers) < likes_number:
+            rank = bisect_left(cumulative_weights, rng.random() * total_weight)
+            post_numbers.add(popularity[min(rank, len(popularity) - 1)])
+
+        likes = []
+
+        for post_number in sorted(post_numbers):
+            liked_at = min(
+                self.get_post_created_at(post_number)
+                + timedelta(days=rng.expovariate(1 / 7)),
+                self.period_end,
+            )
+            likes.append((post_number, timezone.localdate(liked_at)))
+
+        return likes
+
+    def seed_likes(self) -> None:
+        progress = self.progress
+        user_ids = self.get_user_ids()
+        post_ids = self.get_post_ids()
+
+        if not post_ids:
+            return
+
+        # Popularity rank is shuffled against post age.
+        popularity = array("q", range(len(post_ids)))
+        random.Random(f"{progress['seed']}-popularity").shuffle(popularity)
+        cumulative_weights = list(
+            accumulate(
+                1 / rank ** progress["zipf_exponent"]
+                for rank in range(1, len(post_ids) + 1)
+            )
+        )
+
+        if progress["likers_done"] < len(user_ids) and Like.objects.filter(
+            pk__gt=progress["last_like_id"],
+        ).exists():
+            self.stdout.write(
+                "Likes committed after the last checkpoint are removed."
+            )
+            Like.objects.filter(pk__gt=progress["last_like_id"]).delete()
+
+        started = time.perf_counter()
+        first_row = self.rows_counter
+        likes = []
+
+        for liker_number in range(progress["likers_done"], len(user_ids)):
+            likes.extend(
+                Like(
+                    post_id=post_ids[post_number],
+                    liked_by_id=user_ids[liker_number],
+                    liked_date=liked_date,
+                )
+                for post_number, liked_date in self.generate_user_likes(
+                    liker_number,
+                    popularity,
+                    cumulative_weights,
+                )
+            )
+
+            if len(likes) >= self.options["batch_size"] or (
+                liker_number == len(user_ids) - 1
+            ):
+                with transaction.atomic():
+                    if likes:
+                        self.insert(Like, likes)
+
+                    last_like = Like.objects.order_by("-pk").first()
+
+                progress["likers_done"] = liker_number + 1
+                progress["likes_done"] += len(likes)
+                progress["last_like_id"] = last_like.pk if last_like else 0
+                self.save_progress()
+                self.report(
+                    "likes",
+                    progress["likes_done"],
+                    progress["likes"],
+                    self.rows_counter - first_row,
+                    started,
+                )
+                likes = []
@@ -0,0 +1,41 @@
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from posts.timeline import get_config, get_overfull_owner_ids, trim_timeline
+
+
+class Command(BaseCommand):
+    """
+    Django command for keeping the home timeline table bounded. Drops
+    the entries of every timeline past its newest HOME_TIMELINE
+    MAX_LENGTH ones. Meant to be run periodically, e.g. hourly from cron.
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--max-length",
+            type=int,
+            default=get_config()["MAX_LENGTH"],
+            help="Number of newest entries kept per timeline.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        max_length = options["max_length"]
+
+        if max_length < 1:
+            raise CommandError("The '--max-length' must be positive.")
+
+        owner_ids = get_overfull_owner_ids(max_length)
+        trimmed_counter = sum(
+            trim_timeline(owner_id, max_length) for owner_id in owner_ids
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Trimmed {trimmed_counter} entries "
+                f"of {len(owner_ids)} timelines."
+            )
+        )
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_likes_count(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Like = apps.get_model("posts", "Like")
+
+    likes_per_post = (
+        Like.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Post.objects.update(likes_count=Coalesce(Subquery(likes_per_post), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            populate_likes_count,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0003_post_likes_count"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["created_at", "id"]},
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["created_at", "id"], name="post_created_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.6 on 2026-10-18 11:43
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_daily_like_stats(apps, schema_editor):
+    DailyLikeStats = apps.get_model("posts", "DailyLikeStats")
+    Like = apps.get_model("posts", "Like")
+
+    aggregated_likes = (
+        Like.objects.order_by()
+        .values("liked_date")
+        .annotate(total=Count("id"))
+    )
+    DailyLikeStats.objects.bulk_create(
+        DailyLikeStats(liked_date=row["liked_date"], likes_count=row["total"])
+        for row in aggregated_likes
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0004_post_created_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyLikeStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("liked_date", models.DateField(unique=True)),
+                ("likes_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "daily like stats",
+                "ordering": ["liked_date"],
+            },
+        ),
+        migrations.RunPython(
+            populate_daily_like_stats,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:10
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def populate_updated_at(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Post.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0005_dailylikestats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RunPython(
+            populate_updated_at,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
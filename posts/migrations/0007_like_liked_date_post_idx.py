@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0006_post_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["liked_date", "post"], name="like_liked_date_post_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0007_like_liked_date_post_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostScore",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending_score",
+                        serialize=False,
+                        to="posts.post",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("last_liked_date", models.DateField()),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-score"],
+                "indexes": [
+                    models.Index(
+                        fields=["-score"], name="post_score_score_idx"
+                    ),
+                    models.Index(
+                        fields=["last_liked_date"],
+                        name="post_score_last_liked_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
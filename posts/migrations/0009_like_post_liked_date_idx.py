@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0008_postscore"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["post", "liked_date"], name="like_post_liked_date_idx"
+            ),
+        ),
+    ]
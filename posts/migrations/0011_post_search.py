@@ -0,0 +1,93 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:40
+
+from django.db import migrations
+
+
+# The search index is maintained by the database, so it is not part of
+# the Post model. On SQLite, a later migration remaking the post table
+# drops the triggers and has to create them again.
+CREATE_POSTGRESQL_SEARCH = (
+    """
+    ALTER TABLE posts_post ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(
+            to_tsvector('english'::regconfig, coalesce(title, '')), 'A'
+        )
+        || setweight(
+            to_tsvector('english'::regconfig, coalesce(text, '')), 'B'
+        )
+    ) STORED
+    """,
+    "CREATE INDEX post_search_vector_idx ON posts_post "
+    "USING gin (search_vector)",
+)
+DROP_POSTGRESQL_SEARCH = (
+    "ALTER TABLE posts_post DROP COLUMN search_vector",
+)
+CREATE_SQLITE_SEARCH = (
+    """
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        title, text,
+        content='posts_post', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts (rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF title, text
+    ON posts_post BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO posts_post_fts (rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')",
+)
+DROP_SQLITE_SEARCH = (
+    "DROP TRIGGER posts_post_fts_update",
+    "DROP TRIGGER posts_post_fts_delete",
+    "DROP TRIGGER posts_post_fts_insert",
+    "DROP TABLE posts_post_fts",
+)
+
+
+def create_search(apps, schema_editor):
+    statements = {
+        "postgresql": CREATE_POSTGRESQL_SEARCH,
+        "sqlite": CREATE_SQLITE_SEARCH,
+    }.get(schema_editor.connection.vendor, ())
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search(apps, schema_editor):
+    statements = {
+        "postgresql": DROP_POSTGRESQL_SEARCH,
+        "sqlite": DROP_SQLITE_SEARCH,
+    }.get(schema_editor.connection.vendor, ())
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0010_follow_timelineentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, reverse_code=drop_search),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.6 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0011_post_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(fields=["post", "id"], name="like_post_id_idx"),
+        ),
+    ]
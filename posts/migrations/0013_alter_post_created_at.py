@@ -0,0 +1,27 @@
+# Generated by Django 4.2.6 on 2026-10-18 17:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0012_like_post_id_idx"),
+    ]
+
+    # Both defaults are set by Django, the column itself is unchanged.
+    # Altering it would remake the post table on SQLite and drop the
+    # search triggers with it.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="post",
+                    name="created_at",
+                    field=models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+from posts.timeline import get_config
+
+
+# Adding the column remakes the post table on SQLite, which drops the
+# search triggers of 0011_post_search with the old table.
+CREATE_SQLITE_SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts (rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF title, text ON posts_post BEGIN
+        INSERT INTO posts_post_fts (posts_post_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO posts_post_fts (rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+
+def create_sqlite_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    for statement in CREATE_SQLITE_SEARCH_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+def mark_merged_posts(apps, schema_editor):
+    """
+    Posts of the authors merged at read so far were never fanned out,
+    they stay merged once their authors lose followers.
+    """
+
+    Post = apps.get_model("posts", "Post")
+    Post.objects.filter(
+        author__followers_count__gte=get_config()["FANOUT_MAX_FOLLOWERS"],
+    ).update(merged_at_read=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0013_alter_post_created_at"),
+        ("users", "0002_user_followers_count"),
+    ]
+
+    operations = [
+        # Run last when unapplying, after RemoveField remade the table.
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            reverse_code=create_sqlite_search_triggers,
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="merged_at_read",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("merged_at_read", True)),
+                fields=["author", "created_at", "id"],
+                name="post_merged_author_idx",
+            ),
+        ),
+        migrations.RunPython(
+            create_sqlite_search_triggers,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            mark_merged_posts,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
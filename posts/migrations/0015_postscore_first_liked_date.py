@@ -0,0 +1,29 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:18
+
+import datetime
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0014_post_merged_at_read"),
+    ]
+
+    # Existing scores get a first like before any window, so the next run
+    # of compute_trending_scores recomputes them.
+    operations = [
+        migrations.AddField(
+            model_name="postscore",
+            name="first_liked_date",
+            field=models.DateField(default=datetime.date(2020, 1, 1)),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="postscore",
+            index=models.Index(
+                fields=["first_liked_date"],
+                name="post_score_first_liked_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from typing import Any
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 
 class Post(models.Model):
@@ -10,14 +13,50 @@ class Post(models.Model):
     )
     title = models.CharField(max_length=255, blank=True)
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Last change of the Post representation, the like counter included,
+    # so it can serve as the Last-Modified date of the Post.
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    likes_count = models.PositiveIntegerField(default=0)
+    # Not fanned out, as the author had too many followers when writing
+    # it, so the Post is merged into the home timelines at read.
+    merged_at_read = models.BooleanField(default=False, editable=False)
 
     class Meta:
-        ordering = ["created_at"]
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="post_created_at_id_idx",
+            ),
+            # Newest Posts of an author, for backfilling home timelines
+            models.Index(
+                fields=["author", "created_at", "id"],
+                name="post_author_created_at_id_idx",
+            ),
+            # Newest Posts of followed authors merged into home timelines
+            models.Index(
+                fields=["author", "created_at", "id"],
+                name="post_merged_author_idx",
+                condition=models.Q(merged_at_read=True),
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title}, {self.created_at}"
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        self.updated_at = timezone.now()
+
+        # A new Post has not been modified since it was created.
+        if self._state.adding:
+            self.created_at = self.updated_at
+
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
+
+        super().save(*args, **kwargs)
+
 
 class Like(models.Model):
     post = models.ForeignKey(
@@ -34,3 +73,135 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ["post", "liked_by"]
+        indexes = [
+            models.Index(
+                fields=["liked_date", "post"],
+                name="like_liked_date_post_idx",
+            ),
+            # Likes of one Post within a date range, for its analytics
+            models.Index(
+                fields=["post", "liked_date"],
+                name="like_post_liked_date_idx",
+            ),
+            # Likers of one Post paged newest first
+            models.Index(
+                fields=["post", "id"],
+                name="like_post_id_idx",
+            ),
+        ]
+
+
+class DailyLikeStats(models.Model):
+    """Rollup of the Like table with the number of likes per day"""
+
+    liked_date = models.DateField(unique=True)
+    likes_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["liked_date"]
+        verbose_name_plural = "daily like stats"
+
+    def __str__(self) -> str:
+        return f"{self.liked_date}: {self.likes_count}"
+
+
+class PostScore(models.Model):
+    """
+    Time-decayed like score of a Post over the trending window, stored
+    as log2 of the likes weighted by 2 ** (days since an epoch divided
+    by the half-life). The order of such scores does not change as time
+    passes, so only newly liked Posts and the ones whose first counted
+    like left the window have to be recomputed.
+    """
+
+    post = models.OneToOneField(
+        to=Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending_score",
+    )
+    score = models.FloatField()
+    first_liked_date = models.DateField()
+    last_liked_date = models.DateField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-score"]
+        indexes = [
+            models.Index(fields=["-score"], name="post_score_score_idx"),
+            models.Index(
+                fields=["first_liked_date"],
+                name="post_score_first_liked_idx",
+            ),
+            models.Index(
+                fields=["last_liked_date"],
+                name="post_score_last_liked_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.post_id}: {self.score}"
+
+
+class Follow(models.Model):
+    follower = models.ForeignKey(
+        to=get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="following",
+    )
+    # Covered by the index of followers per followee
+    followee = models.ForeignKey(
+        to=get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="followers",
+        db_index=False,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["follower", "followee"]
+        indexes = [
+            models.Index(
+                fields=["followee", "follower"],
+                name="follow_followee_follower_idx",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=~models.Q(follower=models.F("followee")),
+                name="follow_not_self",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.follower_id} -> {self.followee_id}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Post materialized in the home timeline of a User. The creation date
+    of the Post is copied, so a timeline page is one range scan of the
+    (owner, created_at, post) index.
+    """
+
+    # Covered by the (owner, created_at, post) index
+    owner = models.ForeignKey(
+        to=get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        db_index=False,
+    )
+    post = models.ForeignKey(
+        to=Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at", "-post"]
+        unique_together = ["owner", "created_at", "post"]
+        verbose_name_plural = "timeline entries"
+
+    def __str__(self) -> str:
+        return f"{self.owner_id}: {self.post_id}"
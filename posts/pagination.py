@@ -0,0 +1,411 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib import parse
+
+from django.db.models import F, FloatField, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from posts.models import TimelineEntry
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique, composite ordering.
+
+    Every page is fetched with a `WHERE (a, b) > (x, y) ORDER BY a, b LIMIT n`
+    style query, so the latency stays flat regardless of the page depth
+    and no COUNT(*) is issued. Cursors are opaque base64 strings that
+    encode the ordering values of the page boundary and the direction.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    # The last field must be unique to make the ordering total.
+    ordering: Sequence[str] = ("created_at", "id")
+
+    def paginate_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+            view: Optional[APIView] = None,
+    ) -> List[Model]:
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+            view: Optional[APIView] = None,
+    ) -> List[Model]:
+        """paginate_queryset() fetching the page with the async ORM"""
+
+        return self.set_page(
+            [item async for item in self.get_page_queryset(queryset, request)]
+        )
+
+    def get_page_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+    ) -> QuerySet:
+        """Page rows plus one more telling whether the page is the last"""
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if self.position is not None:
+            queryset = queryset.filter(self._seek(self.position, self.reverse))
+
+        ordering = self.ordering
+
+        if self.reverse:
+            ordering = [self._invert(field) for field in ordering]
+
+        return queryset.order_by(*ordering)[:self.size + 1]
+
+    def set_page(self, results: List[Model]) -> List[Model]:
+        has_more = len(results) > self.size
+        results = results[:self.size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = results
+
+        return results
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if size <= 0:
+            return self.page_size
+
+        return min(size, self.max_page_size)
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_page_links(self) -> Tuple[Any, ...]:
+        """Parts of the paginated response besides the page rows"""
+
+        return self.get_next_link(), self.get_previous_link()
+
+    def get_paginated_response_schema(
+            self,
+            schema: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "previous": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(
+            self,
+            view: APIView,
+    ) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(
+            self,
+            request: Request,
+    ) -> Tuple[Optional[List[Any]], bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if encoded is None:
+            return None, False
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+            raw_values = tokens["p"]
+
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+
+            position = [
+                self._get_field(name).to_python(value)
+                for name, value in zip(self.ordering, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, item: Any, reverse: bool) -> str:
+        tokens = [("r", "1" if reverse else "0")]
+        tokens += [
+            ("p", self._get_value(item, field)) for field in self.ordering
+        ]
+        querystring = parse.urlencode(tokens)
+        encoded = b64encode(querystring.encode("ascii")).decode("ascii")
+
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def _seek(self, position: List[Any], reverse: bool) -> Q:
+        """
+        Expand the row comparison `(a, b) > (x, y)` into
+        `a >= x AND (a > x OR (a = x AND b > y))`, which lets the
+        database start a range scan on the composite index.
+        """
+
+        fields = [field.lstrip("-") for field in self.ordering]
+        lookups = [
+            self._lookup(field, reverse) for field in self.ordering
+        ]
+        condition = Q(**{f"{fields[-1]}__{lookups[-1]}": position[-1]})
+
+        for index in reversed(range(len(fields) - 1)):
+            condition = Q(
+                **{f"{fields[index]}__{lookups[index]}": position[index]}
+            ) | (Q(**{fields[index]: position[index]}) & condition)
+
+        return Q(**{f"{fields[0]}__{lookups[0]}e": position[0]}) & condition
+
+    @staticmethod
+    def _lookup(field: str, reverse: bool) -> str:
+        descending = field.startswith("-")
+        return "lt" if descending != reverse else "gt"
+
+    @staticmethod
+    def _invert(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    def _get_field(self, name: str) -> Any:
+        return self.model._meta.get_field(name.lstrip("-"))
+
+    @staticmethod
+    def _get_value(item: Any, field: str) -> str:
+        name = field.lstrip("-")
+        value = item[name] if isinstance(item, dict) else getattr(item, name)
+
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+
+        return str(value)
+
+
+class PostCursorPagination(KeysetPagination):
+    """
+    Keyset pagination for the Post list ordered by `(created_at, id)`.
+
+    Requests with the legacy `limit`/`offset` query parameters and no
+    cursor are still served by LimitOffsetPagination for existing clients.
+    """
+
+    legacy_query_params = (
+        LimitOffsetPagination.limit_query_param,
+        LimitOffsetPagination.offset_query_param,
+    )
+
+    def __init__(self) -> None:
+        self.legacy_paginator = None
+
+    def paginate_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+            view: Optional[APIView] = None,
+    ) -> List[Model]:
+        if self.is_legacy_request(request):
+            self.legacy_paginator = LimitOffsetPagination()
+            return self.legacy_paginator.paginate_queryset(
+                queryset,
+                request,
+                view,
+            )
+
+        self.legacy_paginator = None
+
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(
+            self,
+            queryset: QuerySet,
+            request: Request,
+            view: Optional[APIView] = None,
+    ) -> Optional[List[Model]]:
+        if not self.is_legacy_request(request):
+            self.legacy_paginator = None
+
+            return await super().apaginate_queryset(queryset, request, view)
+
+        # Mirrors LimitOffsetPagination.paginate_queryset().
+        paginator = self.legacy_paginator = LimitOffsetPagination()
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+
+        if paginator.limit is None:
+            return None
+
+        paginator.count = await queryset.acount()
+        paginator.offset = paginator.get_offset(request)
+
+        if paginator.count == 0 or paginator.offset > paginator.count:
+            return []
+
+        return [
+            item async for item in queryset[
+                paginator.offset:paginator.offset + paginator.limit
+            ]
+        ]
+
+    def is_legacy_request(self, request: Request) -> bool:
+        return self.cursor_query_param not in request.query_params and any(
+            param in request.query_params
+            for param in self.legacy_query_params
+        )
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        if self.legacy_paginator:
+            return self.legacy_paginator.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+    def get_page_links(self) -> Tuple[Any, ...]:
+        if self.legacy_paginator:
+            return (
+                self.legacy_paginator.count,
+                self.legacy_paginator.get_next_link(),
+                self.legacy_paginator.get_previous_link(),
+            )
+
+        return super().get_page_links()
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Keyset pagination for home timelines, newest entries first.
+
+    Posts of the authors merged into the timeline at read time are paged
+    with the same cursor through their `(author, created_at, id)` index
+    and merged into the page of timeline entries.
+    """
+
+    ordering = ("-created_at", "-post_id")
+
+    def paginate_timeline(
+            self,
+            entries: QuerySet,
+            merged_posts: Optional[QuerySet],
+            request: Request,
+    ) -> List[TimelineEntry]:
+        page = list(self.get_page_queryset(entries, request))
+
+        if merged_posts is not None:
+            post_ids = {entry.post_id for entry in page}
+            page += [
+                TimelineEntry(post=post, created_at=post.created_at)
+                for post in self.get_page_queryset(
+                    merged_posts.alias(post_id=F("pk")),
+                    request,
+                )
+                # Fanned out Posts marked by 0014_post_merged_at_read
+                if post.pk not in post_ids
+            ]
+            page.sort(
+                key=lambda entry: (entry.created_at, entry.post_id),
+                reverse=not self.reverse,
+            )
+
+        return self.set_page(page[:self.size + 1])
+
+    def _get_field(self, name: str) -> Any:
+        # Cursors of merged Posts hold the values of a timeline entry.
+        return TimelineEntry._meta.get_field(name.lstrip("-"))
+
+
+class SearchPagination(KeysetPagination):
+    """Keyset pagination for search results, best ranked Posts first"""
+
+    ordering = ("-rank", "-id")
+
+    def _get_field(self, name: str) -> Any:
+        # The rank is an annotation of the search queryset.
+        if name.lstrip("-") == "rank":
+            return FloatField()
+
+        return super()._get_field(name)
+
+
+class LikerPagination(KeysetPagination):
+    """Keyset pagination for the likers of a Post, newest Likes first"""
+
+    ordering = ("-id",)
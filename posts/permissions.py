@@ -1,7 +1,10 @@
+import hmac
+
 from rest_framework import permissions
 from rest_framework.request import Request
 from rest_framework.views import View
 
+from core import metrics
 from posts.models import Post
 
 
@@ -23,3 +26,21 @@ class IsPostAuthorOrReadOnly(permissions.BasePermission):
             return obj.author == request.user
 
         return False
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """
+    Permission to allow only scrapers sending METRICS["TOKEN"] as a bearer
+    token. Nobody is allowed while no token is configured.
+    """
+
+    def has_permission(self, request: Request, view: View) -> bool:
+        token = metrics.get_config()["TOKEN"]
+
+        if not token:
+            return False
+
+        return hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        )
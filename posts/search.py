@@ -0,0 +1,99 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+)
+from django.db import NotSupportedError, connection
+from django.db.models import F, FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from posts.models import Post
+
+
+# Text search configuration of the search_vector column
+SEARCH_CONFIG = "english"
+# FTS5 table indexing the title and text of the Posts on SQLite
+SQLITE_SEARCH_TABLE = "posts_post_fts"
+# bm25() weights of the title and text columns of the FTS5 table
+SQLITE_COLUMN_WEIGHTS = (2.5, 1.0)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def search_posts(query: str) -> QuerySet:
+    """
+    Posts matching the words of the query, annotated with their rank,
+    higher ranks match better. Titles weigh more than texts.
+
+    PostgreSQL filters through the GIN index of the generated
+    search_vector column, SQLite through the FTS5 table kept in sync by
+    triggers, both created by the 0011_post_search migration.
+    """
+
+    if connection.vendor == "postgresql":
+        return search_postgresql(query)
+
+    if connection.vendor == "sqlite":
+        return search_sqlite(query)
+
+    raise NotSupportedError(
+        f"Searching Posts is not supported on {connection.vendor}."
+    )
+
+
+def search_postgresql(query: str) -> QuerySet:
+    search_query = SearchQuery(
+        query,
+        config=SEARCH_CONFIG,
+        search_type="websearch",
+    )
+    search_vector = RawSQL(
+        f"{connection.ops.quote_name(Post._meta.db_table)}.search_vector",
+        [],
+        output_field=SearchVectorField(),
+    )
+
+    # ts_rank() is a real, as a double precision the rank survives the
+    # round trip through a pagination cursor unchanged.
+    return (
+        Post.objects.alias(search_vector=search_vector)
+        .filter(search_vector=search_query)
+        .annotate(
+            rank=Cast(
+                SearchRank(F("search_vector"), search_query),
+                FloatField(),
+            )
+        )
+    )
+
+
+def search_sqlite(query: str) -> QuerySet:
+    words = WORD_PATTERN.findall(query)
+
+    if not words:
+        return Post.objects.annotate(rank=Value(0.0)).none()
+
+    # Quoted words are matched as terms, never read as FTS5 operators.
+    match = " ".join(f'"{word}"' for word in words)
+    table = SQLITE_SEARCH_TABLE
+    post_id = (
+        f"{connection.ops.quote_name(Post._meta.db_table)}."
+        f"{connection.ops.quote_name('id')}"
+    )
+
+    # bm25() is lower for better matches.
+    return Post.objects.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s",
+            (match,),
+        )
+    ).annotate(
+        rank=RawSQL(
+            f"SELECT -bm25({table}, %s, %s) FROM {table} "
+            f"WHERE {table} MATCH %s AND rowid = {post_id}",
+            (*SQLITE_COLUMN_WEIGHTS, match),
+            output_field=FloatField(),
+        )
+    )
@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from typing import Any, Dict, Iterable, List, Set
+
+from django.conf import settings
+from django.db.models import Case, CharField, F, Manager, QuerySet, When
+from django.utils import timezone
 from rest_framework import serializers
-from posts.models import Post, Like
+from posts.models import Post, PostScore, Like
+from posts.services import get_liked_post_ids
+from posts.trending import get_current_score
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -11,14 +18,177 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = []
 
 
+class LikedByMeListSerializer(serializers.ListSerializer):
+    """
+    List of Posts, or of objects holding one, with the likes of the
+    request User read for the whole page by one IN query into the
+    "liked_post_ids" context, unless the view has put them there.
+    """
+
+    def to_representation(self, data: Iterable[Any]) -> List[Any]:
+        items = list(data.all() if isinstance(data, Manager) else data)
+
+        if "liked_post_ids" not in self.context:
+            request = self.context.get("request")
+            self.context["liked_post_ids"] = get_liked_post_ids(
+                request.user.pk if request else None,
+                [self.child.get_post_id(item) for item in items],
+            )
+
+        return super().to_representation(items)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField()
-    likes = serializers.SerializerMethodField()
+    likes = serializers.IntegerField(source="likes_count", read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ("id", "author", "title", "text", "created_at", "likes")
+        fields = (
+            "id",
+            "author",
+            "title",
+            "text",
+            "created_at",
+            "updated_at",
+            "likes",
+            "liked_by_me",
+        )
+        list_serializer_class = LikedByMeListSerializer
+
+    @staticmethod
+    def get_post_id(post: Post) -> int:
+        return post.pk
+
+    def get_liked_by_me(self, post: Post) -> bool:
+        liked_post_ids = self.context.get("liked_post_ids")
+
+        if liked_post_ids is None:
+            request = self.context.get("request")
+            liked_post_ids = get_liked_post_ids(
+                request.user.pk if request else None,
+                [post.pk],
+            )
+
+        return post.pk in liked_post_ids
+
+    def update(self, instance: Post, validated_data: Dict[str, Any]) -> Post:
+        """
+        Update only the provided fields, so the like counter changed
+        concurrently by other requests is never overwritten.
+        """
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        instance.save(update_fields=list(validated_data))
+
+        return instance
+
+
+def get_post_values(queryset: QuerySet) -> QuerySet:
+    """
+    Post rows as dicts of the columns PostSerializer reads, with the
+    author display name computed by the database the way User.__str__()
+    does, so neither Posts nor authors are instantiated.
+    """
+
+    return queryset.values(
+        "id",
+        "title",
+        "text",
+        "created_at",
+        "updated_at",
+        "likes_count",
+        author_name=Case(
+            When(author__pseudonym="", then=F("author__email")),
+            default=F("author__pseudonym"),
+            output_field=CharField(),
+        ),
+    )
+
+
+def serialize_post_values(
+        rows: Iterable[Dict[str, Any]],
+        liked_post_ids: Set[int],
+) -> List[Dict[str, Any]]:
+    """
+    PostSerializer(many=True).data of get_post_values() rows, built
+    without the serializer field machinery.
+    """
+
+    # Formats the dates the way PostSerializer does, but looks the current
+    # time zone up once instead of for every date.
+    to_datetime = serializers.DateTimeField(
+        default_timezone=(
+            timezone.get_current_timezone() if settings.USE_TZ else None
+        ),
+    ).to_representation
+
+    return [
+        {
+            "id": row["id"],
+            "author": row["author_name"],
+            "title": row["title"],
+            "text": row["text"],
+            "created_at": to_datetime(row["created_at"]),
+            "updated_at": to_datetime(row["updated_at"]),
+            "likes": row["likes_count"],
+            "liked_by_me": row["id"] in liked_post_ids,
+        }
+        for row in rows
+    ]
+
+
+class TrendingPostSerializer(serializers.ModelSerializer):
+    post = PostSerializer(read_only=True)
+    score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PostScore
+        fields = ("score", "post")
+        list_serializer_class = LikedByMeListSerializer
 
     @staticmethod
-    def get_likes(instance: Post) -> int:
-        return instance.likes.count()
+    def get_post_id(post_score: PostScore) -> int:
+        return post_score.post_id
+
+    def get_score(self, post_score: PostScore) -> float:
+        return round(get_current_score(post_score.score), 3)
+
+
+class LikerSerializer(serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source="liked_by_id", read_only=True)
+    user = serializers.StringRelatedField(source="liked_by")
+
+    class Meta:
+        model = Like
+        fields = ("user_id", "user", "liked_date")
+
+
+class LikeBatchSerializer(serializers.Serializer):
+    like = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        default=list,
+    )
+    unlike = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        default=list,
+    )
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        like_ids, unlike_ids = set(attrs["like"]), set(attrs["unlike"])
+        max_size = settings.LIKES_BATCH_MAX_SIZE
+
+        if len(like_ids) + len(unlike_ids) > max_size:
+            raise serializers.ValidationError(
+                f"Batch can not contain more than {max_size} post ids."
+            )
+
+        if like_ids & unlike_ids:
+            raise serializers.ValidationError(
+                "The same post can not be liked and unliked in one batch."
+            )
+
+        return attrs
@@ -0,0 +1,450 @@
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.utils import timezone
+
+from posts.analytics import invalidate_like_analytics
+from posts.cache import invalidate_posts
+from posts.models import DailyLikeStats, Follow, Like, Post
+from posts.timeline import backfill_timeline, remove_author_posts
+
+
+def like_post(post_id: int, user_id: int) -> bool:
+    """
+    Like the Post in one conflict-tolerant INSERT together with the
+    counter updates. Returns False when the Post is already liked by
+    the user or does not exist.
+    """
+
+    liked_date = date.today()
+
+    with transaction.atomic():
+        if not _insert_like(post_id, user_id, liked_date):
+            return False
+
+        increment_likes_count(post_id)
+        increment_daily_likes(liked_date)
+        invalidate_posts([post_id])
+
+    return True
+
+
+def unlike_post(post_id: int, user_id: int) -> bool:
+    """
+    Remove the Like in one DELETE together with the counter updates.
+    Returns False when there was nothing to unlike.
+    """
+
+    with transaction.atomic():
+        liked_date = _delete_like(post_id, user_id)
+
+        if liked_date is None:
+            return False
+
+        decrement_likes_count(post_id)
+        decrement_daily_likes(liked_date)
+        invalidate_posts([post_id])
+
+        if liked_date < date.today():
+            invalidate_like_analytics()
+
+    return True
+
+
+def batch_like_posts(
+        user_id: int,
+        like_ids: Iterable[int],
+        unlike_ids: Iterable[int],
+) -> Tuple[Dict[int, str], Dict[int, str]]:
+    """
+    Like and unlike many Posts at once and return the status of every
+    requested id. All ids are validated with one query, then the Likes
+    are written with one bulk INSERT and one bulk DELETE, and only the
+    rows they have written are counted.
+    """
+
+    like_ids, unlike_ids = set(like_ids), set(unlike_ids)
+    user_likes = Like.objects.filter(post=OuterRef("pk"), liked_by_id=user_id)
+
+    with transaction.atomic():
+        liked_dates = dict(
+            Post.objects.filter(pk__in=like_ids | unlike_ids)
+            .order_by()
+            .annotate(liked_date=Subquery(user_likes.values("liked_date")))
+            .values_list("pk", "liked_date")
+        )
+        like_statuses = {
+            post_id: (
+                "not_found" if post_id not in liked_dates
+                else "already_liked" if liked_dates[post_id]
+                else "liked"
+            )
+            for post_id in like_ids
+        }
+        unlike_statuses = {
+            post_id: (
+                "not_found" if post_id not in liked_dates
+                else "not_liked" if not liked_dates[post_id]
+                else "unliked"
+            )
+            for post_id in unlike_ids
+        }
+        to_like = [
+            post_id for post_id, like_status in like_statuses.items()
+            if like_status == "liked"
+        ]
+        to_unlike = [
+            post_id for post_id, like_status in unlike_statuses.items()
+            if like_status == "unliked"
+        ]
+
+        if to_like:
+            today = date.today()
+            liked = _insert_likes(to_like, user_id, today)
+
+            # The rest has been liked concurrently by the same user.
+            for post_id in set(to_like) - set(liked):
+                like_statuses[post_id] = "already_liked"
+
+            to_like = liked
+
+        if to_like:
+            Post.objects.filter(pk__in=to_like).update(
+                likes_count=F("likes_count") + 1,
+                updated_at=timezone.now(),
+            )
+            increment_daily_likes(today, amount=len(to_like))
+
+        if to_unlike:
+            unliked_dates = _delete_likes(to_unlike, user_id)
+
+            for post_id in set(to_unlike) - set(unliked_dates):
+                unlike_statuses[post_id] = "not_liked"
+
+            to_unlike = list(unliked_dates)
+
+        if to_unlike:
+            Post.objects.filter(pk__in=to_unlike, likes_count__gt=0).update(
+                likes_count=F("likes_count") - 1,
+                updated_at=timezone.now(),
+            )
+            unliked_per_day = Counter(unliked_dates.values())
+
+            for liked_date, amount in unliked_per_day.items():
+                decrement_daily_likes(liked_date, amount=amount)
+
+            if min(unliked_per_day) < date.today():
+                invalidate_like_analytics()
+
+        if to_like or to_unlike:
+            invalidate_posts(to_like + to_unlike)
+
+    return like_statuses, unlike_statuses
+
+
+def get_liked_post_ids(
+        user_id: Optional[int],
+        post_ids: Iterable[int],
+) -> Set[int]:
+    """
+    Ids of the given Posts liked by the user, read with one IN query.
+    Anonymous users, with no id, have liked nothing.
+    """
+
+    post_ids = list(post_ids)
+
+    if user_id is None or not post_ids:
+        return set()
+
+    return set(_get_likes(user_id, post_ids).values_list("post_id", flat=True))
+
+
+async def aget_liked_post_ids(
+        user_id: Optional[int],
+        post_ids: Iterable[int],
+) -> Set[int]:
+    """get_liked_post_ids() with the async ORM"""
+
+    post_ids = list(post_ids)
+
+    if user_id is None or not post_ids:
+        return set()
+
+    return {
+        post_id async for post_id in _get_likes(user_id, post_ids)
+        .values_list("post_id", flat=True)
+    }
+
+
+def follow_author(author_id: int, user_id: int) -> bool:
+    """
+    Follow the author and write the newest Posts of the author into the
+    home timeline of the user. Returns False when the author is already
+    followed by the user, is the user or does not exist.
+    """
+
+    authors = get_user_model().objects.filter(pk=author_id)
+
+    with transaction.atomic():
+        if not authors.exists():
+            return False
+
+        try:
+            with transaction.atomic():
+                Follow.objects.create(
+                    follower_id=user_id,
+                    followee_id=author_id,
+                )
+        except IntegrityError:
+            return False
+
+        authors.update(followers_count=F("followers_count") + 1)
+        backfill_timeline(user_id, author_id)
+
+    return True
+
+
+def unfollow_author(author_id: int, user_id: int) -> bool:
+    """
+    Stop following the author and drop the Posts of the author from the
+    home timeline of the user. Returns False when there was nothing to
+    unfollow.
+    """
+
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower_id=user_id,
+            followee_id=author_id,
+        ).delete()
+
+        if not deleted:
+            return False
+
+        get_user_model().objects.filter(
+            pk=author_id,
+            followers_count__gt=0,
+        ).update(followers_count=F("followers_count") - 1)
+        remove_author_posts(user_id, author_id)
+
+    return True
+
+
+def increment_likes_count(post_id: int) -> None:
+    """Atomically bump the denormalized like counter of the given Post"""
+
+    Post.objects.filter(pk=post_id).update(
+        likes_count=F("likes_count") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def decrement_likes_count(post_id: int) -> None:
+    """
+    Atomically lower the denormalized like counter of the given Post,
+    never letting it drop below zero.
+    """
+
+    Post.objects.filter(pk=post_id, likes_count__gt=0).update(
+        likes_count=F("likes_count") - 1,
+        updated_at=timezone.now(),
+    )
+
+
+def increment_daily_likes(liked_date: date, amount: int = 1) -> None:
+    """Add likes to the daily rollup, creating the day row if needed"""
+
+    day_stats = DailyLikeStats.objects.filter(liked_date=liked_date)
+
+    if day_stats.update(likes_count=F("likes_count") + amount):
+        return
+
+    try:
+        with transaction.atomic():
+            DailyLikeStats.objects.create(
+                liked_date=liked_date,
+                likes_count=amount,
+            )
+    except IntegrityError:
+        # Another request has created the day row in the meantime.
+        day_stats.update(likes_count=F("likes_count") + amount)
+
+
+def decrement_daily_likes(liked_date: date, amount: int = 1) -> None:
+    """Remove likes from the daily rollup of the given day"""
+
+    DailyLikeStats.objects.filter(
+        liked_date=liked_date,
+        likes_count__gte=amount,
+    ).update(likes_count=F("likes_count") - amount)
+
+
+def remove_liked_by(user_id: int) -> None:
+    """
+    Uncount the likes of a User about to be deleted from the Posts of
+    other authors, its own Posts are deleted with it.
+    """
+
+    post_ids = list(
+        Like.objects.filter(liked_by_id=user_id)
+        .exclude(post__author_id=user_id)
+        .values_list("post_id", flat=True)
+    )
+
+    if not post_ids:
+        return
+
+    Post.objects.filter(pk__in=post_ids, likes_count__gt=0).update(
+        likes_count=F("likes_count") - 1,
+        updated_at=timezone.now(),
+    )
+    invalidate_posts(post_ids)
+
+
+def remove_daily_likes(likes: QuerySet) -> None:
+    """Remove likes about to be deleted from the daily rollup"""
+
+    days = likes.values("liked_date").annotate(amount=Count("pk")).order_by()
+
+    for day in days:
+        decrement_daily_likes(day["liked_date"], day["amount"])
+
+
+def _get_likes(user_id: int, post_ids: List[int]) -> QuerySet:
+    return Like.objects.filter(
+        liked_by_id=user_id,
+        post_id__in=post_ids,
+    )
+
+
+def _supports_conflict_sql() -> bool:
+    """ON CONFLICT and RETURNING clauses shared by PostgreSQL and SQLite"""
+
+    return connection.vendor == "postgresql" or (
+        connection.vendor == "sqlite"
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def _insert_like(post_id: int, user_id: int, liked_date: date) -> bool:
+    if not _supports_conflict_sql():
+        if not Post.objects.filter(pk=post_id).exists():
+            return False
+
+        try:
+            with transaction.atomic():
+                Like.objects.create(post_id=post_id, liked_by_id=user_id)
+        except IntegrityError:
+            return False
+
+        return True
+
+    # Selecting from the post table makes a missing Post insert nothing
+    # instead of failing on the deferred foreign key check.
+    quote_name = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote_name(Like._meta.db_table)} "
+            "(post_id, liked_by_id, liked_date) "
+            f"SELECT id, %s, %s FROM {quote_name(Post._meta.db_table)} "
+            "WHERE id = %s "
+            "ON CONFLICT (post_id, liked_by_id) DO NOTHING",
+            [user_id, liked_date, post_id],
+        )
+
+        return cursor.rowcount > 0
+
+
+def _delete_like(post_id: int, user_id: int) -> Optional[date]:
+    """Delete the Like and return the day it has been made on"""
+
+    if not _supports_conflict_sql():
+        like = Like.objects.select_for_update().filter(
+            post_id=post_id,
+            liked_by_id=user_id,
+        ).first()
+
+        if like is None:
+            return None
+
+        like.delete()
+
+        return like.liked_date
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(Like._meta.db_table)} "
+            "WHERE post_id = %s AND liked_by_id = %s "
+            "RETURNING liked_date",
+            [post_id, user_id],
+        )
+        row = cursor.fetchone()
+
+    if row is None:
+        return None
+
+    return Like._meta.get_field("liked_date").to_python(row[0])
+
+
+def _insert_likes(
+        post_ids: List[int],
+        user_id: int,
+        liked_date: date,
+) -> List[int]:
+    """Like the existing Posts not liked yet and return their ids"""
+
+    if not _supports_conflict_sql():
+        return [
+            post_id for post_id in post_ids
+            if _insert_like(post_id, user_id, liked_date)
+        ]
+
+    quote_name = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(post_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote_name(Like._meta.db_table)} "
+            "(post_id, liked_by_id, liked_date) "
+            f"SELECT id, %s, %s FROM {quote_name(Post._meta.db_table)} "
+            f"WHERE id IN ({placeholders}) "
+            "ON CONFLICT (post_id, liked_by_id) DO NOTHING "
+            "RETURNING post_id",
+            [user_id, liked_date, *post_ids],
+        )
+
+        return [post_id for post_id, in cursor.fetchall()]
+
+
+def _delete_likes(post_ids: List[int], user_id: int) -> Dict[int, date]:
+    """Delete the Likes and return the day each has been made on"""
+
+    if not _supports_conflict_sql():
+        liked_dates = {
+            post_id: _delete_like(post_id, user_id) for post_id in post_ids
+        }
+
+        return {
+            post_id: liked_date
+            for post_id, liked_date in liked_dates.items()
+            if liked_date is not None
+        }
+
+    placeholders = ", ".join(["%s"] * len(post_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(Like._meta.db_table)} "
+            f"WHERE liked_by_id = %s AND post_id IN ({placeholders}) "
+            "RETURNING post_id, liked_date",
+            [user_id, *post_ids],
+        )
+        rows = cursor.fetchall()
+
+    to_python = Like._meta.get_field("liked_date").to_python
+
+    return {post_id: to_python(liked_date) for post_id, liked_date in rows}
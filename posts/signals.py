@@ -0,0 +1,86 @@
+from typing import Any, Optional
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from posts.analytics import invalidate_like_analytics
+from posts.cache import invalidate_authors, invalidate_posts
+from posts.models import Like, Post
+from posts.services import remove_daily_likes, remove_liked_by
+from users.models import User
+
+
+# User fields the author of a Post is displayed with
+AUTHOR_FIELDS = frozenset({"email", "pseudonym"})
+
+
+@receiver(post_save, sender=Post)
+def invalidate_cached_post_on_save(
+        sender: type,
+        instance: Post,
+        **kwargs: Any,
+) -> None:
+    invalidate_posts([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remove_post_likes_from_rollup(
+        sender: type,
+        instance: Post,
+        **kwargs: Any,
+) -> None:
+    remove_daily_likes(Like.objects.filter(post=instance))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post_on_delete(
+        sender: type,
+        instance: Post,
+        **kwargs: Any,
+) -> None:
+    invalidate_posts([instance.pk])
+    invalidate_like_analytics()
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_posts_on_author_save(
+        sender: type,
+        instance: User,
+        created: bool,
+        update_fields: Optional[frozenset] = None,
+        **kwargs: Any,
+) -> None:
+    if created or (update_fields and not update_fields & AUTHOR_FIELDS):
+        return
+
+    invalidate_authors()
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_likes_from_rollup(
+        sender: type,
+        instance: User,
+        **kwargs: Any,
+) -> None:
+    # Likes of own Posts are removed with the Posts deleted in cascade.
+    remove_daily_likes(
+        Like.objects.filter(liked_by=instance).exclude(post__author=instance)
+    )
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_likes_from_counts(
+        sender: type,
+        instance: User,
+        **kwargs: Any,
+) -> None:
+    remove_liked_by(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_like_analytics_on_user_delete(
+        sender: type,
+        instance: User,
+        **kwargs: Any,
+) -> None:
+    invalidate_like_analytics()
@@ -1,3 +1,1308 @@
-from django.test import TestCase
+import csv
+import json
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from typing import Any, Dict, List, Tuple
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import db_router, metrics
+from core.custom_middleware import QueryInstrumentationMiddleware
+from core.load_shedding import LoadShedder
+from core.testing import create_user, get_auth
+from posts.cache import (
+    STATS_KEY_PREFIX,
+    ResponseCacheMixin,
+    get_stats,
+    stats_buffer,
+)
+from posts.exports import export
+from posts.management.commands._private import seed_dataset
+from posts.management.commands.check_query_plans import (
+    Command as QueryPlanCommand,
+)
+from posts.models import (
+    DailyLikeStats,
+    Like,
+    Post,
+    PostScore,
+    TimelineEntry,
+)
+from posts.services import (
+    _delete_likes,
+    _insert_likes,
+    follow_author,
+    like_post,
+    unfollow_author,
+    unlike_post,
+)
+from posts.trending import (
+    compute_score,
+    get_changed_post_ids,
+    update_post_scores,
+)
+from users.models import User
+
+
+class LoadSheddingTests(TestCase):
+    limits = {
+        "ROUTE_PRIORITIES": {
+            "posts:api-health-check": "critical",
+            "posts:like-post": "low",
+        },
+        "LIMITS": {
+            "low": {"MAX_IN_FLIGHT": 1},
+            "default": {"MAX_IN_FLIGHT": 1},
+            "read": {"MAX_IN_FLIGHT": 1},
+        },
+    }
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+        self.factory = RequestFactory()
+
+    def get_priority(self, shedder: LoadShedder, path: str, **extra) -> str:
+        request = self.factory.get(path, **extra)
+
+        return shedder.get_priority(request, resolve(path))
+
+    def test_priority_of_routes(self) -> None:
+        with override_settings(LOAD_SHEDDING=self.limits):
+            shedder = LoadShedder()
+
+        post_list = reverse("posts:post-list-create")
+
+        self.assertEqual(
+            self.get_priority(shedder, reverse("posts:api-health-check")),
+            "critical",
+        )
+        self.assertEqual(
+            self.get_priority(
+                shedder,
+                reverse("posts:like-post", kwargs={"post_id": 1}),
+            ),
+            "low",
+        )
+        self.assertEqual(
+            self.get_priority(shedder, post_list, **get_auth(self.user)),
+            "read",
+        )
+        self.assertEqual(self.get_priority(shedder, post_list), "default")
+
+    def test_made_up_token_gains_no_priority(self) -> None:
+        with override_settings(LOAD_SHEDDING=self.limits):
+            shedder = LoadShedder()
+
+        self.assertEqual(
+            self.get_priority(
+                shedder,
+                reverse("posts:post-list-create"),
+                HTTP_AUTHORIZATION="Bearer not.a.token",
+            ),
+            "default",
+        )
+
+    def test_full_class_is_shed_and_others_admitted(self) -> None:
+        with override_settings(LOAD_SHEDDING=self.limits):
+            shedder = LoadShedder()
+
+        self.assertTrue(shedder.admit("low"))
+        self.assertFalse(shedder.admit("low"))
+        self.assertTrue(shedder.admit("read"))
+        self.assertTrue(shedder.admit("critical"))
+
+        shedder.release("low", 0.01)
+
+        self.assertTrue(shedder.admit("low"))
+
+    def test_slow_class_is_shed_until_the_window_passes(self) -> None:
+        config = {
+            **self.limits,
+            "LIMITS": {"low": {"MAX_LATENCY": timedelta(seconds=1)}},
+            "LATENCY_WINDOW": timedelta(seconds=5),
+        }
+
+        with override_settings(LOAD_SHEDDING=config):
+            shedder = LoadShedder()
+
+        shedder.admit("low")
+        shedder.release("low", 2.0)
+
+        self.assertFalse(shedder.admit("low"))
+        self.assertTrue(shedder.admit("default"))
+
+        shedder.states["low"].updated_at -= 5
+
+        self.assertTrue(shedder.admit("low"))
+
+    def test_low_priority_is_shed_before_reads_and_health_checks(self) -> None:
+        config = {
+            **self.limits,
+            "LIMITS": {"low": {"MAX_IN_FLIGHT": 0}},
+        }
+
+        with override_settings(LOAD_SHEDDING=config):
+            shed = self.client.post(
+                reverse("posts:like-post", kwargs={"post_id": self.post.pk}),
+                **get_auth(self.user),
+            )
+            read = self.client.get(
+                reverse("posts:post-list-create"),
+                **get_auth(self.user),
+            )
+            health = self.client.get(reverse("posts:api-health-check"))
+
+        self.assertEqual(shed.status_code, 503)
+        self.assertIn("Retry-After", shed)
+        self.assertEqual(read.status_code, 200)
+        self.assertEqual(health.status_code, 200)
+        self.assertGreaterEqual(
+            metrics.registry.snapshot()[
+                "http_requests_shed_total",
+                ("posts:like-post", "low"),
+            ],
+            1,
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_made_up_request_start_sheds_nothing(self) -> None:
+        config = {
+            **self.limits,
+            "LIMITS": {"default": {"MAX_LATENCY": timedelta(seconds=2)}},
+        }
+        url = reverse("posts:post-list-create")
+
+        with override_settings(LOAD_SHEDDING=config):
+            hostile = self.client.get(url, HTTP_X_REQUEST_START="t=1")
+            response = self.client.get(url)
+
+        self.assertEqual(hostile.status_code, 200)
+        self.assertEqual(response.status_code, 200)
+
+    def test_trusted_request_start_is_bounded(self) -> None:
+        config = {
+            **self.limits,
+            "TRUST_REQUEST_START": True,
+            "MAX_QUEUE_TIME": timedelta(seconds=30),
+        }
+
+        with override_settings(LOAD_SHEDDING=config):
+            shedder = LoadShedder()
+
+        def get_queue_time(header: str) -> float:
+            request = self.factory.get("/", HTTP_X_REQUEST_START=header)
+
+            return time.time() - shedder.get_request_start(request)
+
+        self.assertAlmostEqual(get_queue_time("t=1"), 30, delta=1)
+        self.assertAlmostEqual(
+            get_queue_time(f"t={time.time() + 3600}"),
+            0,
+            delta=1,
+        )
+        self.assertAlmostEqual(
+            get_queue_time(f"t={int((time.time() - 2) * 1000)}"),
+            2,
+            delta=1,
+        )
+
+    def test_critical_routes_are_never_shed(self) -> None:
+        config = {
+            **self.limits,
+            "LIMITS": {
+                priority: {"MAX_IN_FLIGHT": 0}
+                for priority in ("low", "default", "read", "critical")
+            },
+        }
+
+        with override_settings(LOAD_SHEDDING=config):
+            response = self.client.get(reverse("posts:api-health-check"))
+
+        self.assertEqual(response.status_code, 200)
+
+
+def get_rollup_count() -> int:
+    return sum(DailyLikeStats.objects.values_list("likes_count", flat=True))
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pagination of the post list"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        user = create_user()
+        self.post_ids = [
+            Post.objects.create(author=user, title="Title", text="Text").pk
+            for _ in range(5)
+        ]
+        self.url = reverse("posts:post-list-create")
+
+    def test_pages_follow_the_cursors(self) -> None:
+        url, post_ids, pages = f"{self.url}?page_size=2", [], []
+
+        while url:
+            page = self.client.get(url).json()
+            post_ids += [post["id"] for post in page["results"]]
+            pages.append(page)
+            url = page["next"]
+
+        self.assertEqual(post_ids, self.post_ids)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]["previous"])
+        self.assertEqual(
+            self.client.get(pages[1]["previous"]).json()["results"],
+            pages[0]["results"],
+        )
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(self.url, {"cursor": "invalid"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_limit_and_offset(self) -> None:
+        response = self.client.get(self.url, {"limit": 2, "offset": 1})
+
+        self.assertEqual(response.json()["count"], 5)
+        self.assertEqual(
+            [post["id"] for post in response.json()["results"]],
+            self.post_ids[1:3],
+        )
+
+
+class LikeRollupTests(TestCase):
+    """The daily rollup follows likes deleted in cascade"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = create_user("author@test.local")
+        self.liker = create_user("liker@test.local")
+        self.posts = [
+            Post.objects.create(author=author, title="Title", text="Text")
+            for author in (self.author, self.author, self.liker)
+        ]
+
+        for post in self.posts:
+            like_post(post.pk, self.author.pk)
+            like_post(post.pk, self.liker.pk)
+
+    def test_post_delete_removes_its_likes(self) -> None:
+        self.posts[0].delete()
+
+        self.assertEqual(get_rollup_count(), 4)
+
+    def test_user_delete_removes_likes_once(self) -> None:
+        # Both likes of its own Post and its likes of the author Posts.
+        self.liker.delete()
+
+        self.assertEqual(get_rollup_count(), 2)
+
+
+class LikeAnalyticsTests(TestCase):
+    """Likes per day, week or month and the cache of closed ranges"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = create_user("author@test.local")
+        self.other_author = create_user("other@test.local")
+        self.likers = [
+            create_user(f"liker{number}@test.local") for number in range(2)
+        ]
+        self.posts = [
+            Post.objects.create(author=author, title="Title", text="Text")
+            for author in (self.author, self.other_author)
+        ]
+        # Mondays 29 January and 12 February 2024, a closed range
+        self.like_on(self.posts[0], self.likers[0], date(2024, 1, 29))
+        self.like_on(self.posts[0], self.likers[1], date(2024, 1, 30))
+        self.like_on(self.posts[1], self.likers[0], date(2024, 2, 12))
+        call_command("rebuild_daily_like_stats", stdout=StringIO())
+        cache.clear()
+
+    @staticmethod
+    def like_on(post: Post, user: User, day: date) -> None:
+        like_post(post.pk, user.pk)
+        Like.objects.filter(post=post, liked_by=user).update(liked_date=day)
+
+    def get_counts(
+            self,
+            date_from: str,
+            date_to: str,
+            **params: Any,
+    ) -> List[List[Any]]:
+        response = self.client.get(
+            reverse("like-analytics"),
+            {"date_from": date_from, "date_to": date_to, **params},
+            **get_auth(self.author),
+        )
+        self.assertEqual(response.status_code, 200)
+
+        return [
+            [bucket["liked_date"], bucket["likes_count"]]
+            for bucket in response.json()
+        ]
+
+    def test_empty_days_are_zero_filled(self) -> None:
+        self.assertEqual(
+            self.get_counts("2024-01-29", "2024-02-01"),
+            [
+                ["2024-01-29", 1],
+                ["2024-01-30", 1],
+                ["2024-01-31", 0],
+                ["2024-02-01", 0],
+            ],
+        )
+
+    def test_week_and_month_buckets(self) -> None:
+        self.assertEqual(
+            self.get_counts("2024-01-30", "2024-02-18", granularity="week"),
+            [["2024-01-29", 1], ["2024-02-05", 0], ["2024-02-12", 1]],
+        )
+        self.assertEqual(
+            self.get_counts("2024-01-15", "2024-03-31", granularity="month"),
+            [["2024-01-01", 2], ["2024-02-01", 1], ["2024-03-01", 0]],
+        )
+
+    def test_post_and_author_filters(self) -> None:
+        self.assertEqual(
+            self.get_counts(
+                "2024-01-29",
+                "2024-02-18",
+                granularity="week",
+                post_id=self.posts[0].pk,
+            ),
+            [["2024-01-29", 2], ["2024-02-05", 0], ["2024-02-12", 0]],
+        )
+        self.assertEqual(
+            self.get_counts(
+                "2024-01-29",
+                "2024-02-18",
+                granularity="week",
+                author_id=self.other_author.pk,
+            ),
+            [["2024-01-29", 0], ["2024-02-05", 0], ["2024-02-12", 1]],
+        )
+
+    @override_settings(LIKE_ANALYTICS_MAX_BUCKETS=10)
+    def test_too_many_buckets(self) -> None:
+        params = {"date_from": "2024-01-01", "date_to": "2024-01-31"}
+        url = reverse("like-analytics")
+        auth = get_auth(self.author)
+
+        response = self.client.get(url, params, **auth)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+        self.assertEqual(
+            self.client.get(
+                url,
+                {**params, "granularity": "week"},
+                **auth,
+            ).status_code,
+            200,
+        )
+
+    def test_unlike_of_a_past_day_outdates_the_cache(self) -> None:
+        counts = [["2024-01-29", 2], ["2024-02-05", 0], ["2024-02-12", 1]]
+        self.assertEqual(
+            self.get_counts("2024-01-29", "2024-02-18", granularity="week"),
+            counts,
+        )
+
+        # Not through the services, so the cached range stays as it was
+        DailyLikeStats.objects.filter(liked_date=date(2024, 2, 12)).update(
+            likes_count=5
+        )
+        self.assertEqual(
+            self.get_counts("2024-01-29", "2024-02-18", granularity="week"),
+            counts,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unlike_post(self.posts[0].pk, self.likers[0].pk)
+
+        self.assertEqual(
+            self.get_counts("2024-01-29", "2024-02-18", granularity="week"),
+            [["2024-01-29", 1], ["2024-02-05", 0], ["2024-02-12", 5]],
+        )
+
+    def test_post_delete_outdates_the_cache(self) -> None:
+        self.get_counts("2024-01-29", "2024-02-18", granularity="week")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[1].delete()
+
+        self.assertEqual(
+            self.get_counts("2024-01-29", "2024-02-18", granularity="week"),
+            [["2024-01-29", 2], ["2024-02-05", 0], ["2024-02-12", 0]],
+        )
+
+
+class LikesCountTests(TestCase):
+    """The likes_count of a Post counts its likes"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = create_user("author@test.local")
+        self.liker = create_user("liker@test.local")
+        self.post = Post.objects.create(
+            author=self.author,
+            title="Title",
+            text="Text",
+        )
+
+    def test_like_and_unlike(self) -> None:
+        self.assertTrue(like_post(self.post.pk, self.liker.pk))
+        self.assertFalse(like_post(self.post.pk, self.liker.pk))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(get_rollup_count(), 1)
+
+        self.assertTrue(unlike_post(self.post.pk, self.liker.pk))
+        self.assertFalse(unlike_post(self.post.pk, self.liker.pk))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(get_rollup_count(), 0)
+
+    def test_liker_delete_uncounts_its_likes(self) -> None:
+        like_post(self.post.pk, self.liker.pk)
+        like_post(self.post.pk, self.author.pk)
+        updated_at = Post.objects.get(pk=self.post.pk).updated_at
+
+        self.liker.delete()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.likes_count, self.post.likes.count())
+        self.assertGreater(self.post.updated_at, updated_at)
+
+
+class LikeEndpointTests(TestCase):
+    """Like and unlike are idempotent single writes"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+        self.like_url = reverse(
+            "posts:like-post",
+            kwargs={"post_id": self.post.pk},
+        )
+        self.unlike_url = reverse(
+            "posts:unlike-post",
+            kwargs={"post_id": self.post.pk},
+        )
+
+    def test_repeated_like_and_unlike(self) -> None:
+        auth = get_auth(self.user)
+        liked = self.client.post(self.like_url, **auth)
+        liked_again = self.client.post(self.like_url, **auth)
+
+        self.assertEqual(liked.status_code, 201)
+        self.assertEqual(liked_again.status_code, 400)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(get_rollup_count(), 1)
+
+        self.assertEqual(
+            self.client.delete(self.unlike_url, **auth).status_code,
+            200,
+        )
+        self.assertEqual(
+            self.client.delete(self.unlike_url, **auth).status_code,
+            404,
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(get_rollup_count(), 0)
+
+    def test_missing_post(self) -> None:
+        url = reverse("posts:like-post", kwargs={"post_id": self.post.pk + 1})
+
+        self.assertEqual(
+            self.client.post(url, **get_auth(self.user)).status_code,
+            404,
+        )
+        self.assertEqual(get_rollup_count(), 0)
+
+
+class LikedByMeTests(TestCase):
+    """Viewer likes and likers read without N+1 queries"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.posts = [
+            Post.objects.create(author=self.user, title="Title", text="Text")
+            for _ in range(3)
+        ]
+        like_post(self.posts[1].pk, self.user.pk)
+
+    def test_liked_by_me_of_the_viewer(self) -> None:
+        url = reverse("posts:post-list-create")
+        liked = self.client.get(url, **get_auth(self.user)).json()
+        anonymous = self.client.get(url).json()
+
+        self.assertEqual(
+            [post["liked_by_me"] for post in liked["results"]],
+            [False, True, False],
+        )
+        self.assertFalse(
+            any(post["liked_by_me"] for post in anonymous["results"])
+        )
+
+    def test_likers_newest_first(self) -> None:
+        other = create_user("other@test.local", pseudonym="Other")
+        like_post(self.posts[1].pk, other.pk)
+        url = reverse(
+            "posts:post-likers",
+            kwargs={"post_id": self.posts[1].pk},
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            [liker["user_id"] for liker in response.json()["results"]],
+            [other.pk, self.user.pk],
+        )
+        self.assertEqual(response.json()["results"][0]["user"], "Other")
+        self.assertEqual(
+            self.client.get(
+                reverse("posts:post-likers", kwargs={"post_id": 0})
+            ).status_code,
+            404,
+        )
+
+
+class ValuesSerializationTests(TestCase):
+    """The values() rows render the same JSON as PostSerializer"""
+
+    def setUp(self) -> None:
+        self.viewer = create_user()
+        authors = [
+            create_user("blank@test.local"),
+            create_user("named@test.local", pseudonym="Named"),
+        ]
+        self.posts = [
+            Post.objects.create(author=author, title="Title", text="Text")
+            for author in authors
+        ]
+        like_post(self.posts[1].pk, self.viewer.pk)
+
+    def get_json(self, url: str, values: bool, **extra) -> Dict[str, Any]:
+        cache.clear()
+
+        with override_settings(POSTS_VALUES_SERIALIZATION=values):
+            response = self.client.get(url, **extra)
+
+        self.assertEqual(response.status_code, 200)
+
+        return response.json()
+
+    def assert_same_json(self, url: str) -> None:
+        for extra in ({}, get_auth(self.viewer)):
+            with self.subTest(url=url, authenticated=bool(extra)):
+                self.assertEqual(
+                    self.get_json(url, True, **extra),
+                    self.get_json(url, False, **extra),
+                )
+
+    def test_list(self) -> None:
+        self.assert_same_json(reverse("posts:post-list-create"))
+
+    def test_detail(self) -> None:
+        for post in self.posts:
+            self.assert_same_json(
+                reverse(
+                    "posts:post-detail-update-delete",
+                    kwargs={"pk": post.pk},
+                )
+            )
+
+
+class BatchLikeTests(TestCase):
+    """Batch likes count only the rows they have written"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.posts = [
+            Post.objects.create(author=self.user, title="Title", text="Text")
+            for _ in range(3)
+        ]
+        self.url = reverse("posts:like-batch")
+
+    def test_statuses_and_counters(self) -> None:
+        first, second, third = (post.pk for post in self.posts)
+        missing = third + 1
+        like_post(second, self.user.pk)
+        like_post(third, self.user.pk)
+
+        response = self.client.post(
+            self.url,
+            {"like": [first, second, missing], "unlike": [third]},
+            content_type="application/json",
+            **get_auth(self.user),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "like": {
+                    str(first): "liked",
+                    str(second): "already_liked",
+                    str(missing): "not_found",
+                },
+                "unlike": {str(third): "unliked"},
+            },
+        )
+        self.assertEqual(
+            dict(Post.objects.values_list("pk", "likes_count")),
+            {first: 1, second: 1, third: 0},
+        )
+        self.assertEqual(get_rollup_count(), 2)
+
+    def test_insert_returns_only_new_likes(self) -> None:
+        first, second, third = (post.pk for post in self.posts)
+        like_post(second, self.user.pk)
+
+        self.assertEqual(
+            _insert_likes([first, second], self.user.pk, date.today()),
+            [first],
+        )
+        self.assertEqual(
+            set(_delete_likes([first, second, third], self.user.pk)),
+            {first, second},
+        )
+
+
+class ConditionalRequestTests(TestCase):
+    """ETag and Last-Modified validators of a Post"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+        self.url = reverse(
+            "posts:post-detail-update-delete",
+            kwargs={"pk": self.post.pk},
+        )
+
+    def test_new_post_is_not_modified_since_created(self) -> None:
+        self.assertEqual(self.post.created_at, self.post.updated_at)
+
+    def test_matching_etag_is_not_modified(self) -> None:
+        response = self.client.get(self.url, **get_auth(self.user))
+        not_modified = self.client.get(
+            self.url,
+            HTTP_IF_NONE_MATCH=response["ETag"],
+            **get_auth(self.user),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_update_with_outdated_etag_fails(self) -> None:
+        etag = self.client.get(self.url, **get_auth(self.user))["ETag"]
+        like_post(self.post.pk, self.user.pk)
+
+        outdated = self.client.patch(
+            self.url,
+            {"title": "Outdated"},
+            content_type="application/json",
+            HTTP_IF_MATCH=etag,
+            **get_auth(self.user),
+        )
+        etag = self.client.get(self.url, **get_auth(self.user))["ETag"]
+        current = self.client.patch(
+            self.url,
+            {"title": "Current"},
+            content_type="application/json",
+            HTTP_IF_MATCH=etag,
+            **get_auth(self.user),
+        )
+
+        self.assertEqual(outdated.status_code, 412)
+        self.assertEqual(current.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "Current")
+
+
+@override_settings(
+    POSTS_RESPONSE_CACHE={"REBUILD_WAIT": 1, "STATS_FLUSH_INTERVAL": 3600}
+)
+class ResponseCacheTests(TestCase):
+    """Versioned response cache of anonymous reads"""
+
+    def setUp(self) -> None:
+        stats_buffer.flush()
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+        self.url = reverse(
+            "posts:post-detail-update-delete",
+            kwargs={"pk": self.post.pk},
+        )
+
+    def test_like_outdates_the_cached_detail(self) -> None:
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            like_post(self.post.pk, self.user.pk)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["likes"], 1)
+
+    def test_authenticated_reads_are_not_cached(self) -> None:
+        response = self.client.get(self.url, **get_auth(self.user))
+
+        self.assertNotIn("X-Cache", response)
+
+    def test_stats_are_written_in_batches(self) -> None:
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        self.assertIsNone(cache.get(f"{STATS_KEY_PREFIX}:MISS"))
+        self.assertEqual(
+            get_stats(),
+            {"hit": 1, "stale": 0, "miss": 1, "hit_rate": 0.5},
+        )
+
+    def test_cold_miss_waits_for_the_entry_being_built(self) -> None:
+        cache.set_many({"entry:lock": True, "entry": "built"})
+
+        self.assertEqual(
+            ResponseCacheMixin.wait_for_entry("entry", "entry:lock", 1),
+            "built",
+        )
+
+        cache.delete("entry")
+
+        self.assertIsNone(
+            ResponseCacheMixin.wait_for_entry("entry", "entry:lock", 0.1)
+        )
+
+        cache.delete("entry:lock")
+        self.assertIsNone(
+            ResponseCacheMixin.wait_for_entry("entry", "entry:lock", 60)
+        )
+
+
+class ExportTests(TestCase):
+    """Both export formats write the same datetimes"""
+
+    def test_formats_share_datetimes(self) -> None:
+        post = Post.objects.create(
+            author=create_user(),
+            title="Title",
+            text="Text",
+        )
+        ndjson = b"".join(export("posts")).decode()
+        rows = list(csv.DictReader(
+            b"".join(export("posts", output_format="csv")).decode()
+            .splitlines()
+        ))
+
+        self.assertEqual(
+            json.loads(ndjson)["created_at"],
+            post.created_at.isoformat(),
+        )
+        self.assertEqual(rows[0]["created_at"], post.created_at.isoformat())
+
+
+class HomeTimelineTests(TestCase):
+    """New Posts are fanned out to the followers"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = create_user("author@test.local")
+        self.follower = create_user("follower@test.local")
+        self.url = reverse("posts:home-timeline")
+        response = self.client.post(
+            reverse(
+                "posts:follow-author",
+                kwargs={"author_id": self.author.pk},
+            ),
+            **get_auth(self.follower),
+        )
+
+        self.assertEqual(response.status_code, 201)
+
+    def create_post(self) -> int:
+        response = self.client.post(
+            reverse("posts:post-list-create"),
+            {"title": "Title", "text": "Text"},
+            **get_auth(self.author),
+        )
+
+        return response.json()["id"]
+
+    def get_timeline_ids(self) -> List[int]:
+        response = self.client.get(self.url, **get_auth(self.follower))
+
+        return [post["id"] for post in response.json()["results"]]
+
+    def test_new_post_is_written_to_follower_timelines(self) -> None:
+        post_id = self.create_post()
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                owner=self.follower,
+                post_id=post_id,
+            ).exists()
+        )
+        self.assertEqual(self.get_timeline_ids(), [post_id])
+
+        self.client.delete(
+            reverse(
+                "posts:unfollow-author",
+                kwargs={"author_id": self.author.pk},
+            ),
+            **get_auth(self.follower),
+        )
+
+        self.assertEqual(self.get_timeline_ids(), [])
+
+    @override_settings(HOME_TIMELINE={"FANOUT_MAX_FOLLOWERS": 1})
+    def test_popular_author_is_merged_at_read(self) -> None:
+        post_id = self.create_post()
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(owner=self.follower).exists()
+        )
+        self.assertEqual(self.get_timeline_ids(), [post_id])
+
+    @override_settings(HOME_TIMELINE={"FANOUT_MAX_FOLLOWERS": 2})
+    def test_merged_posts_outlive_the_follower_count(self) -> None:
+        other = create_user("other@test.local")
+        follow_author(self.author.pk, other.pk)
+        merged_id = self.create_post()
+        unfollow_author(self.author.pk, other.pk)
+        fanned_out_id = self.create_post()
+
+        self.assertEqual(self.get_timeline_ids(), [fanned_out_id, merged_id])
+
+        # Newly following back, the fanned out Posts are backfilled.
+        follow_author(self.author.pk, other.pk)
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(owner=other)
+                .values_list("post_id", flat=True)
+            ),
+            [fanned_out_id],
+        )
+        self.assertEqual(
+            [
+                post["id"] for post in self.client.get(
+                    self.url,
+                    **get_auth(other),
+                ).json()["results"]
+            ],
+            [fanned_out_id, merged_id],
+        )
+
+
+class SearchTests(TestCase):
+    """Ranked full-text search over Posts"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        user = create_user()
+        self.in_text, self.in_title, self.unrelated = (
+            Post.objects.create(author=user, title=title, text=text).pk
+            for title, text in (
+                ("Weekend", "A walk along the river"),
+                ("River walk", "Photos of the weekend"),
+                ("Unrelated", "Nothing to see"),
+            )
+        )
+        self.url = reverse("posts:post-search")
+
+    def search(self, query: str) -> List[int]:
+        response = self.client.get(self.url, {"q": query})
+
+        self.assertEqual(response.status_code, 200)
+
+        return [post["id"] for post in response.json()["results"]]
+
+    def test_title_matches_rank_first(self) -> None:
+        self.assertEqual(self.search("river"), [self.in_title, self.in_text])
+
+    def test_edited_post_is_found_by_its_new_words(self) -> None:
+        Post.objects.filter(pk=self.in_text).update(text="A quiet lake")
+
+        self.assertEqual(self.search("lake"), [self.in_text])
+        self.assertEqual(self.search("river"), [self.in_title])
+
+    def test_hostile_queries_are_safe(self) -> None:
+        for query in (
+            'river" OR "walk',
+            "NEAR(river walk)",
+            "river*",
+            "'; DROP TABLE posts_post; --",
+            "title:river",
+        ):
+            with self.subTest(query=query):
+                self.assertNotIn(self.unrelated, self.search(query))
+
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_query_is_required(self) -> None:
+        response = self.client.get(self.url, {"q": " "})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TrendingScoreTests(TestCase):
+    """Incremental trending scores follow unlikes too"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+
+    def compute(self, *args: str) -> None:
+        call_command("compute_trending_scores", *args, stdout=StringIO())
+
+    def test_unliked_post_loses_its_score(self) -> None:
+        like_post(self.post.pk, self.user.pk)
+        self.compute("--full")
+
+        self.assertTrue(PostScore.objects.filter(post=self.post).exists())
+
+        unlike_post(self.post.pk, self.user.pk)
+        self.compute()
+
+        self.assertFalse(PostScore.objects.filter(post=self.post).exists())
+
+    @override_settings(TRENDING_WINDOW_DAYS=7)
+    def test_likes_leaving_the_window_stop_counting(self) -> None:
+        today = date.today()
+        other = create_user("other@test.local")
+
+        for user, days_ago in ((self.user, 6), (other, 2)):
+            like_post(self.post.pk, user.pk)
+            Like.objects.filter(post=self.post, liked_by=user).update(
+                liked_date=today - timedelta(days=days_ago)
+            )
+
+        update_post_scores([self.post.pk], today)
+        tomorrow = today + timedelta(days=1)
+
+        self.assertEqual(get_changed_post_ids(tomorrow), [self.post.pk])
+
+        update_post_scores([self.post.pk], tomorrow)
+        score = PostScore.objects.get(post=self.post)
+
+        self.assertEqual(
+            score.score,
+            compute_score([(today - timedelta(days=2), 1)]),
+        )
+        self.assertEqual(score.first_liked_date, today - timedelta(days=2))
+        self.assertEqual(get_changed_post_ids(tomorrow), [])
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Async likes are written from worker threads"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user,
+            title="Title",
+            text="Text",
+        )
+        self.client = AsyncClient()
+        # Headers of AsyncClient() itself are ignored by Django 4.2.6.
+        self.headers = {
+            "Authorization": f"Bearer {AccessToken.for_user(self.user)}"
+        }
+
+    async def test_like_and_unlike(self) -> None:
+        like_url = reverse(
+            "posts:async-like-post",
+            kwargs={"post_id": self.post.pk},
+        )
+        unlike_url = reverse(
+            "posts:async-unlike-post",
+            kwargs={"post_id": self.post.pk},
+        )
+
+        liked = await self.client.post(like_url, headers=self.headers)
+        liked_again = await self.client.post(like_url, headers=self.headers)
+        await self.post.arefresh_from_db()
+        likes_count = self.post.likes_count
+        unliked = await self.client.delete(unlike_url, headers=self.headers)
+
+        self.assertEqual(liked.status_code, 201)
+        self.assertEqual(liked_again.status_code, 400)
+        self.assertEqual(likes_count, 1)
+        self.assertEqual(unliked.status_code, 200)
+        await self.post.arefresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+
+class QueryPlanTests(TestCase):
+    """The endpoint statements are served by indexes"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.command = QueryPlanCommand(stdout=StringIO())
+        self.command.verbosity = 0
+
+    def test_endpoint_plans_pass(self) -> None:
+        seeded = seed_dataset(20, 200, 1000, 5)
+        call_command("compute_trending_scores", stdout=StringIO())
+
+        with override_settings(LOAD_SHEDDING={"ENABLED": False}):
+            statements = self.command.record_statements(seeded, {"days": 5})
+
+        self.assertEqual(self.command.check_plans(statements, 1000.0), [])
+
+    def test_table_scan_fails(self) -> None:
+        statement = (
+            "unindexed",
+            'SELECT "id" FROM "posts_post" WHERE "text" = %s',
+            ["Text"],
+        )
+
+        self.assertEqual(
+            len(self.command.check_plans([statement], 1000.0)),
+            1,
+        )
+
+
+class QueryInstrumentationTests(TestCase):
+    """Per-request SQL counts, Server-Timing and the over-budget log"""
+
+    config = {
+        "ENABLED": True,
+        "QUERY_COUNT_BUDGET": 20,
+        "LATENCY_BUDGET_MS": 60_000,
+        "SLOWEST_QUERIES": 3,
+    }
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        Post.objects.create(author=self.user, title="Title", text="Text")
+        self.url = reverse("posts:post-list-create")
+
+    def get_with_queries(self) -> Tuple[HttpResponse, int]:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+
+        return response, len(queries)
+
+    def test_server_timing_counts_the_queries(self) -> None:
+        with override_settings(REQUEST_INSTRUMENTATION=self.config):
+            response, count = self.get_with_queries()
+
+        self.assertGreater(count, 0)
+        self.assertRegex(
+            response["Server-Timing"],
+            rf'^db;desc="{count} queries";dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    def test_requests_over_budget_are_logged(self) -> None:
+        config = {**self.config, "QUERY_COUNT_BUDGET": 0}
+
+        with override_settings(REQUEST_INSTRUMENTATION=config):
+            with self.assertLogs("core.custom_middleware", "WARNING") as logs:
+                _, count = self.get_with_queries()
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(
+            f"Request over budget: GET {self.url} 200",
+            logs.output[0],
+        )
+        self.assertIn(f"{count} queries", logs.output[0])
+        self.assertIn("ms] SELECT", logs.output[0])
+
+    def test_requests_within_budget_are_not_logged(self) -> None:
+        with override_settings(REQUEST_INSTRUMENTATION=self.config):
+            with self.assertNoLogs("core.custom_middleware", "WARNING"):
+                self.get_with_queries()
+
+    def test_disabled_middleware_is_not_used(self) -> None:
+        config = {**self.config, "ENABLED": False}
+
+        with override_settings(REQUEST_INSTRUMENTATION=config):
+            with self.assertRaises(MiddlewareNotUsed):
+                QueryInstrumentationMiddleware(HttpResponse)
+
+            response, _ = self.get_with_queries()
+
+        self.assertNotIn("Server-Timing", response)
+
+
+class MetricsViewTests(TestCase):
+    """The Prometheus endpoint is served to the token holders only"""
+
+    def setUp(self) -> None:
+        self.url = reverse("metrics")
+
+    @override_settings(METRICS={"TOKEN": "scraper-token"})
+    def test_token_holders_get_all_threads(self) -> None:
+        def handle_request() -> None:
+            metrics.registry.add(
+                "http_requests_shed_total",
+                ("finished-thread", "low"),
+                1,
+            )
+
+        thread = threading.Thread(target=handle_request)
+        thread.start()
+        thread.join()
+
+        response = self.client.get(
+            self.url,
+            HTTP_AUTHORIZATION="Bearer scraper-token",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn("# TYPE http_requests_total counter\n", body)
+        self.assertIn(
+            'http_requests_shed_total{view="finished-thread",'
+            'priority="low"} 1\n',
+            body,
+        )
+
+    def test_other_clients_are_forbidden(self) -> None:
+        user = create_user(is_staff=True)
+
+        for token, extra in (
+            ("scraper-token", {}),
+            ("scraper-token", {"HTTP_AUTHORIZATION": "Bearer other"}),
+            ("scraper-token", get_auth(user)),
+            (None, {"HTTP_AUTHORIZATION": "Bearer None"}),
+            ("", {"HTTP_AUTHORIZATION": "Bearer "}),
+        ):
+            with self.subTest(token=token, extra=extra):
+                with override_settings(METRICS={"TOKEN": token}):
+                    response = self.client.get(self.url, **extra)
+
+                self.assertEqual(response.status_code, 403)
+
+
+class MetricsRegistryTests(TestCase):
+    def test_shards_of_finished_threads_are_folded(self) -> None:
+        registry = metrics.MetricsRegistry()
+
+        def handle_request() -> None:
+            registry.add("http_requests_shed_total", ("view", "low"), 1)
+
+        for _ in range(10):
+            thread = threading.Thread(target=handle_request)
+            thread.start()
+            thread.join()
+
+        handle_request()
+
+        self.assertEqual(len(registry._shards), 1)
+        self.assertEqual(
+            registry.snapshot()["http_requests_shed_total", ("view", "low")],
+            11,
+        )
+
+
+@override_settings(DATABASE_ROUTING={"REPLICAS": ["replica"]})
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Reads of safe requests go to the replicas"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.router = db_router.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request: Any) -> str:
+        with db_router.route_request(request):
+            return self.router.db_for_read(Post)
+
+    def test_reads_outside_requests_go_to_primary(self) -> None:
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_writes_go_to_primary(self) -> None:
+        with db_router.route_request(self.factory.get("/")):
+            self.assertEqual(self.router.db_for_write(Post), "default")
+
+    def test_safe_reads_go_to_replica(self) -> None:
+        self.assertEqual(self.read_alias(self.factory.get("/")), "replica")
+        self.assertEqual(self.read_alias(self.factory.post("/")), "default")
+
+    def test_reads_after_a_write_stay_on_primary(self) -> None:
+        with db_router.route_request(self.factory.get("/")):
+            self.assertEqual(self.router.db_for_read(Post), "replica")
+
+            self.router.db_for_write(Post)
+
+            self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_primary_reads_block(self) -> None:
+        with db_router.route_request(self.factory.get("/")):
+            with db_router.primary_reads():
+                self.assertEqual(self.router.db_for_read(Post), "default")
+
+            self.assertEqual(self.router.db_for_read(Post), "replica")
+
+    def test_writer_is_pinned_to_primary(self) -> None:
+        user = User(pk=1)
+        write = self.factory.post("/")
+        write.user = user
+        db_router.pin_writer(write, HttpResponse(status=201))
+        read = self.factory.get("/")
+        read.user = user
+        other_read = self.factory.get("/")
+        other_read.user = User(pk=2)
+
+        self.assertEqual(self.read_alias(read), "default")
+        self.assertEqual(self.read_alias(other_read), "replica")
@@ -0,0 +1,147 @@
+from typing import List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Q
+
+from posts.models import Follow, Post, TimelineEntry
+
+
+DEFAULTS = {
+    "FANOUT_MAX_FOLLOWERS": 10000,
+    "FANOUT_BATCH_SIZE": 1000,
+    "BACKFILL_LENGTH": 50,
+    "MAX_LENGTH": 800,
+}
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "HOME_TIMELINE", {})}
+
+
+def is_merged_at_read(followers_count: int) -> bool:
+    """Whether Posts of an author with so many followers skip the fan-out"""
+
+    return followers_count >= get_config()["FANOUT_MAX_FOLLOWERS"]
+
+
+def fan_out_post(post: Post) -> int:
+    """
+    Write a new Post into the home timeline of its author and, unless
+    the author has too many followers and the Post is marked to be
+    merged at read time instead, of every follower. Returns the number
+    of timelines written.
+    """
+
+    # The author of the request may be a cached User with a stale count.
+    followers_count = (
+        get_user_model().objects.filter(pk=post.author_id)
+        .values_list("followers_count", flat=True)
+        .get()
+    )
+    owner_ids = [post.author_id]
+
+    # Decided once per Post, so it stays visible to the followers when
+    # the author crosses the threshold later.
+    if is_merged_at_read(followers_count):
+        post.merged_at_read = True
+        Post.objects.filter(pk=post.pk).update(merged_at_read=True)
+    else:
+        owner_ids.extend(
+            Follow.objects.filter(followee_id=post.author_id)
+            .values_list("follower_id", flat=True)
+        )
+
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=owner_id,
+                post=post,
+                created_at=post.created_at,
+            )
+            for owner_id in owner_ids
+        ],
+        batch_size=get_config()["FANOUT_BATCH_SIZE"],
+        ignore_conflicts=True,
+    )
+
+    return len(owner_ids)
+
+
+def backfill_timeline(owner_id: int, author_id: int) -> None:
+    """
+    Write the newest fanned out Posts of a newly followed author into a
+    timeline, the ones merged at read show up without.
+    """
+
+    posts = (
+        Post.objects.filter(author_id=author_id, merged_at_read=False)
+        .order_by("-created_at", "-id")
+        .values_list("pk", "created_at")[:get_config()["BACKFILL_LENGTH"]]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=owner_id,
+                post_id=post_id,
+                created_at=created_at,
+            )
+            for post_id, created_at in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_author_posts(owner_id: int, author_id: int) -> None:
+    """Drop the Posts of an unfollowed author from a timeline"""
+
+    TimelineEntry.objects.filter(
+        owner_id=owner_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def get_merged_followee_ids(user_id: int) -> List[int]:
+    """Followed authors with Posts merged into the timeline at read"""
+
+    return list(
+        Follow.objects.filter(
+            Exists(
+                Post.objects.filter(
+                    author_id=OuterRef("followee_id"),
+                    merged_at_read=True,
+                )
+            ),
+            follower_id=user_id,
+        ).values_list("followee_id", flat=True)
+    )
+
+
+def get_overfull_owner_ids(max_length: int) -> List[int]:
+    return list(
+        TimelineEntry.objects.order_by()
+        .values_list("owner_id", flat=True)
+        .annotate(entries=Count("pk"))
+        .filter(entries__gt=max_length)
+    )
+
+
+def trim_timeline(owner_id: int, max_length: int) -> int:
+    """Drop the entries of a timeline past its max_length newest ones"""
+
+    entries = TimelineEntry.objects.filter(owner_id=owner_id)
+    first_dropped = list(
+        entries.order_by("-created_at", "-post_id")
+        .values_list("created_at", "post_id")[max_length:max_length + 1]
+    )
+
+    if not first_dropped:
+        return 0
+
+    created_at, post_id = first_dropped[0]
+    deleted, _ = entries.filter(
+        Q(created_at__lt=created_at)
+        | Q(created_at=created_at, post_id__lte=post_id)
+    ).delete()
+
+    return deleted
@@ -0,0 +1,138 @@
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from posts.models import Like, PostScore
+
+
+# Fixed reference day the decayed weights of likes are measured from
+TRENDING_EPOCH = date(2020, 1, 1)
+
+
+def get_window_start(today: date) -> date:
+    return today - timedelta(days=settings.TRENDING_WINDOW_DAYS - 1)
+
+
+def get_decay_exponent(day: date) -> float:
+    """log2 of the weight a like made on the given day has"""
+
+    return (day - TRENDING_EPOCH).days / settings.TRENDING_HALF_LIFE_DAYS
+
+
+def get_current_score(score: float, today: Optional[date] = None) -> float:
+    """Stored score as the number of equally weighted likes made today"""
+
+    return 2 ** (score - get_decay_exponent(today or date.today()))
+
+
+def compute_score(likes_per_day: Iterable[Tuple[date, int]]) -> float:
+    """log2 of the sum of decayed like weights, computed without overflow"""
+
+    exponents = [
+        (get_decay_exponent(day), likes) for day, likes in likes_per_day
+    ]
+    highest = max(exponent for exponent, _ in exponents)
+
+    return highest + math.log2(
+        sum(likes * 2 ** (exponent - highest) for exponent, likes in exponents)
+    )
+
+
+def get_changed_post_ids(
+        today: date,
+        full: bool = False,
+) -> List[int]:
+    """
+    Posts liked since the day of the last computation together with the
+    scored Posts updated since then, as an unlike only bumps updated_at,
+    and the ones whose first counted like left the window, or all the
+    liked and scored Posts for a full computation.
+    """
+
+    window_start = since = get_window_start(today)
+    scores = PostScore.objects.all()
+
+    if not full:
+        last_computed_at = PostScore.objects.aggregate(
+            last_computed_at=Max("computed_at")
+        )["last_computed_at"]
+
+        if last_computed_at is not None:
+            since = max(since, timezone.localdate(last_computed_at))
+            scores = scores.filter(
+                Q(post__updated_at__gte=last_computed_at)
+                | Q(first_liked_date__lt=window_start)
+            )
+
+    liked_post_ids = set(
+        Like.objects.filter(liked_date__gte=since)
+        .order_by()
+        .values_list("post_id", flat=True)
+        .distinct()
+    )
+
+    return sorted(
+        liked_post_ids.union(scores.values_list("post_id", flat=True))
+    )
+
+
+@transaction.atomic
+def update_post_scores(post_ids: List[int], today: date) -> int:
+    """
+    Recompute the scores of the given Posts from their likes within the
+    window, Posts without such likes lose their score.
+    """
+
+    likes_per_post: Dict[int, List[Tuple[date, int]]] = defaultdict(list)
+
+    for post_id, liked_date, likes in (
+        Like.objects.filter(
+            post_id__in=post_ids,
+            liked_date__gte=get_window_start(today),
+        )
+        .order_by()
+        .values_list("post_id", "liked_date")
+        .annotate(likes=Count("id"))
+    ):
+        likes_per_post[post_id].append((liked_date, likes))
+
+    PostScore.objects.filter(post_id__in=post_ids).exclude(
+        post_id__in=list(likes_per_post)
+    ).delete()
+    PostScore.objects.bulk_create(
+        [
+            PostScore(
+                post_id=post_id,
+                score=compute_score(likes_per_day),
+                first_liked_date=min(day for day, _ in likes_per_day),
+                last_liked_date=max(day for day, _ in likes_per_day),
+            )
+            for post_id, likes_per_day in likes_per_post.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=[
+            "score",
+            "first_liked_date",
+            "last_liked_date",
+            "computed_at",
+        ],
+    )
+
+    return len(likes_per_post)
+
+
+def prune_post_scores(today: date) -> int:
+    """Drop the scores of Posts not liked within the window anymore"""
+
+    deleted, _ = PostScore.objects.filter(
+        last_liked_date__lt=get_window_start(today)
+    ).delete()
+
+    return deleted
@@ -1,10 +1,26 @@
 from django.urls import path
+from .async_views import (
+    AsyncPostDetailView,
+    AsyncPostLikeView,
+    AsyncPostListView,
+    AsyncPostUnlikeView,
+    async_health_check,
+)
 from .views import (
     PostCreateListView,
     PostRetrieveUpdateDestroyView,
     health_check,
     PostLikeView,
     PostUnlikeView,
+    PostLikeBatchView,
+    PostLikersView,
+    PostCacheStatsView,
+    PostSearchView,
+    DataExportView,
+    FollowAuthorView,
+    HomeTimelineView,
+    TrendingPostsView,
+    UnfollowAuthorView,
 )
 
 app_name = "posts"
@@ -16,11 +32,61 @@ urlpatterns = [
         PostRetrieveUpdateDestroyView.as_view(),
         name="post-detail-update-delete",
     ),
+    path("trending/", TrendingPostsView.as_view(), name="post-trending"),
+    path("search/", PostSearchView.as_view(), name="post-search"),
+    path("timeline/", HomeTimelineView.as_view(), name="home-timeline"),
+    path(
+        "authors/<int:author_id>/follow/",
+        FollowAuthorView.as_view(),
+        name="follow-author",
+    ),
+    path(
+        "authors/<int:author_id>/unfollow/",
+        UnfollowAuthorView.as_view(),
+        name="unfollow-author",
+    ),
     path("<int:post_id>/like/", PostLikeView.as_view(), name="like-post"),
     path(
         "<int:post_id>/unlike/",
         PostUnlikeView.as_view(),
         name="unlike-post",
     ),
+    path(
+        "<int:post_id>/likers/",
+        PostLikersView.as_view(),
+        name="post-likers",
+    ),
+    path("likes/batch/", PostLikeBatchView.as_view(), name="like-batch"),
+    path(
+        "cache-stats/",
+        PostCacheStatsView.as_view(),
+        name="post-cache-stats",
+    ),
+    path(
+        "export/<str:dataset>/",
+        DataExportView.as_view(),
+        name="data-export",
+    ),
     path("health/", health_check, name="api-health-check"),
+    path("async/", AsyncPostListView.as_view(), name="async-post-list"),
+    path(
+        "async/<int:pk>/",
+        AsyncPostDetailView.as_view(),
+        name="async-post-detail",
+    ),
+    path(
+        "async/<int:post_id>/like/",
+        AsyncPostLikeView.as_view(),
+        name="async-like-post",
+    ),
+    path(
+        "async/<int:post_id>/unlike/",
+        AsyncPostUnlikeView.as_view(),
+        name="async-unlike-post",
+    ),
+    path(
+        "async/health/",
+        async_health_check,
+        name="async-api-health-check",
+    ),
 ]
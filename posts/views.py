@@ -1,8 +1,17 @@
 from datetime import datetime
-from typing import Any
-
-from django.db.models import Count
-from django.http import HttpResponse, HttpRequest
+from functools import partial
+from typing import Any, List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpRequest,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import (
     extend_schema,
@@ -14,14 +23,68 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.generics import CreateAPIView, DestroyAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from posts.models import Post, Like
-from posts.serializers import PostSerializer, LikeSerializer
-from posts.permissions import IsPostAuthorOrReadOnly
+from core import metrics
+from posts.analytics import (
+    GRANULARITIES,
+    count_buckets,
+    get_like_analytics,
+)
+from posts.cache import (
+    AUTHORS_VERSION_KEY,
+    LIST_VERSION_KEY,
+    METRIC_FAMILIES,
+    ResponseCacheMixin,
+    get_metric_samples,
+    get_post_version_key,
+    get_stats,
+)
+from posts.conditional import (
+    check_preconditions,
+    get_not_modified_response,
+    get_post_etag,
+    get_post_list_etag,
+    get_timestamp,
+    set_validators,
+)
+from posts.exports import (
+    CONTENT_TYPES,
+    DATASETS,
+    export,
+    get_export_content_type,
+    get_export_filename,
+)
+from posts.models import Post, PostScore, Like, TimelineEntry
+from posts.pagination import (
+    LikerPagination,
+    PostCursorPagination,
+    SearchPagination,
+    TimelinePagination,
+)
+from posts.serializers import (
+    LikeBatchSerializer,
+    LikeSerializer,
+    LikerSerializer,
+    PostSerializer,
+    TrendingPostSerializer,
+    get_post_values,
+    serialize_post_values,
+)
+from posts.permissions import HasMetricsToken, IsPostAuthorOrReadOnly
+from posts.search import search_posts
+from posts.services import (
+    batch_like_posts,
+    follow_author,
+    get_liked_post_ids,
+    like_post,
+    unfollow_author,
+    unlike_post,
+)
+from posts.timeline import fan_out_post, get_merged_followee_ids
 
 
 # Only for documentation endpoints details
@@ -30,15 +93,68 @@ from posts.permissions import IsPostAuthorOrReadOnly
         description="Endpoint for Post creating by User."
     ),
     get=extend_schema(
-        description="Endpoint for listing all the Posts."
+        description=(
+            "Endpoint for listing all the Posts. Paginated with opaque "
+            "'cursor' links, legacy 'limit'/'offset' parameters "
+            "are still supported."
+        )
     ),
 )
-class PostCreateListView(generics.ListCreateAPIView):
+class PostCreateListView(ResponseCacheMixin, generics.ListCreateAPIView):
     queryset = Post.objects.select_related("author")
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+
+    def get_cache_version_keys(self) -> List[str]:
+        return [LIST_VERSION_KEY, AUTHORS_VERSION_KEY]
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.get_cached_response(
+            request,
+            partial(self.get_list_response, request),
+        )
+
+    def get_list_response(self, request: Request) -> HttpResponse:
+        """
+        List the page, answering 304 before the serialization when the
+        ETag of the fetched rows matches the one the client holds. Pages
+        have no Last-Modified, removing a Post from a page would not
+        change the dates of the remaining ones.
+        """
+
+        values = settings.POSTS_VALUES_SERIALIZATION
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            get_post_values(queryset) if values else queryset
+        )
+        etag = get_post_list_etag(
+            request.accepted_renderer.format,
+            self.paginator.get_page_links(),
+            page,
+            request.user.pk,
+        )
+        not_modified = get_not_modified_response(request, etag)
+
+        if not_modified is not None:
+            return not_modified
+
+        if values:
+            data = serialize_post_values(
+                page,
+                get_liked_post_ids(
+                    request.user.pk,
+                    [row["id"] for row in page],
+                ),
+            )
+        else:
+            data = self.get_serializer(page, many=True).data
+
+        return set_validators(self.get_paginated_response(data), etag)
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            fan_out_post(post)
 
 
 # Only for documentation endpoints details
@@ -65,11 +181,324 @@ class PostCreateListView(generics.ListCreateAPIView):
         )
     )
 )
-class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class PostRetrieveUpdateDestroyView(
+    ResponseCacheMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     queryset = Post.objects.select_related("author")
     serializer_class = PostSerializer
     permission_classes = (IsPostAuthorOrReadOnly,)
 
+    def get_cache_version_keys(self) -> List[str]:
+        return [get_post_version_key(self.kwargs["pk"]), AUTHORS_VERSION_KEY]
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+
+        if self.request.method in ("PUT", "PATCH"):
+            return queryset.select_for_update(of=("self",))
+
+        return queryset
+
+    def get_object(self) -> Post:
+        post = super().get_object()
+
+        if self.request.method in ("PUT", "PATCH"):
+            check_preconditions(
+                self.request,
+                self.get_etag(post),
+                get_timestamp(post.updated_at),
+            )
+
+        return post
+
+    def get_etag(self, post: Any) -> str:
+        return get_post_etag(
+            self.request.accepted_renderer.format,
+            post,
+            self.request.user.pk,
+        )
+
+    def retrieve(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> Response:
+        return self.get_cached_response(
+            request,
+            partial(self.get_detail_response, request),
+        )
+
+    def get_detail_response(self, request: Request) -> HttpResponse:
+        values = settings.POSTS_VALUES_SERIALIZATION
+
+        if values:
+            post = get_object_or_404(
+                get_post_values(self.get_queryset()),
+                pk=self.kwargs["pk"],
+            )
+            self.check_object_permissions(request, post)
+            last_modified = get_timestamp(post["updated_at"])
+        else:
+            post = self.get_object()
+            last_modified = get_timestamp(post.updated_at)
+
+        etag = self.get_etag(post)
+        not_modified = get_not_modified_response(
+            request,
+            etag,
+            last_modified,
+        )
+
+        if not_modified is not None:
+            return not_modified
+
+        if values:
+            data = serialize_post_values(
+                [post],
+                get_liked_post_ids(request.user.pk, [post["id"]]),
+            )[0]
+        else:
+            data = self.get_serializer(post).data
+
+        return set_validators(Response(data), etag, last_modified)
+
+    def update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        partial_update = kwargs.pop("partial", False)
+
+        # The Post stays locked from the If-Match check until it is saved.
+        with transaction.atomic():
+            post = self.get_object()
+            serializer = self.get_serializer(
+                post,
+                data=request.data,
+                partial=partial_update,
+            )
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+
+        return set_validators(
+            Response(serializer.data),
+            self.get_etag(post),
+            get_timestamp(post.updated_at),
+        )
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint for listing the Posts with the highest time-decayed "
+        "like scores, refreshed by the compute_trending_scores command."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="limit",
+            description="Number of Posts to return (at most 100).",
+            required=False,
+            type=int,
+        ),
+    ],
+)
+class TrendingPostsView(generics.ListAPIView):
+    serializer_class = TrendingPostSerializer
+    pagination_class = None
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self) -> QuerySet:
+        try:
+            limit = int(self.request.query_params["limit"])
+        except (KeyError, ValueError):
+            limit = self.default_limit
+
+        limit = max(1, min(limit, self.max_limit))
+
+        return PostScore.objects.select_related("post__author").order_by(
+            "-score"
+        )[:limit]
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint for full-text search over the titles and texts of the "
+        "Posts, best matches first. Paginated with opaque 'cursor' links."
+    ),
+    parameters=[
+        OpenApiParameter(
+            name="q",
+            description="Words to search for (ex. 'django rest').",
+            required=True,
+            type=str,
+        ),
+    ],
+)
+class PostSearchView(generics.ListAPIView):
+    serializer_class = PostSerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self) -> QuerySet:
+        return search_posts(
+            self.request.query_params["q"]
+        ).select_related("author")
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if not request.query_params.get("q", "").strip():
+            return Response(
+                {"error": "The 'q' parameter is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return super().list(request, *args, **kwargs)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint for listing the Users who liked a Post, newest likes "
+        "first. Paginated with opaque 'cursor' links."
+    ),
+)
+class PostLikersView(generics.ListAPIView):
+    serializer_class = LikerSerializer
+    pagination_class = LikerPagination
+
+    def get_queryset(self) -> QuerySet:
+        return (
+            Like.objects.filter(post_id=self.kwargs["post_id"])
+            .select_related("liked_by")
+            .only(
+                "liked_date",
+                "liked_by__email",
+                "liked_by__pseudonym",
+            )
+        )
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        page = self.paginate_queryset(self.get_queryset())
+
+        if not page:
+            # Nothing liked, find out whether the Post exists at all.
+            get_object_or_404(
+                Post.objects.only("pk"),
+                pk=self.kwargs["post_id"],
+            )
+
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint for the home timeline of the current User: own Posts "
+        "and Posts of the followed authors, newest first. Paginated "
+        "with opaque 'cursor' links."
+    ),
+)
+class HomeTimelineView(generics.ListAPIView):
+    serializer_class = PostSerializer
+    pagination_class = TimelinePagination
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self) -> QuerySet:
+        return TimelineEntry.objects.filter(
+            owner=self.request.user
+        ).select_related("post__author")
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        followee_ids = get_merged_followee_ids(request.user.pk)
+        merged_posts = None
+
+        if followee_ids:
+            merged_posts = Post.objects.filter(
+                author_id__in=followee_ids,
+                merged_at_read=True,
+            ).select_related("author")
+
+        page = self.paginator.paginate_timeline(
+            self.get_queryset(),
+            merged_posts,
+            request,
+        )
+        serializer = self.get_serializer(
+            [entry.post for entry in page],
+            many=True,
+        )
+
+        return self.get_paginated_response(serializer.data)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    request=None,
+    responses={
+        201: OpenApiResponse(description="Author followed"),
+        400: OpenApiResponse(description="Author already followed"),
+    },
+)
+class FollowAuthorView(APIView):
+    """
+    View for following an author by User id,
+    accessible only for authenticated users.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        author_id = self.kwargs["author_id"]
+
+        if author_id == request.user.pk:
+            return Response(
+                {"message": "You can not follow yourself."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if follow_author(author_id, request.user.pk):
+            return Response(
+                {"message": "Followed successfully"},
+                status=status.HTTP_201_CREATED,
+            )
+
+        # Nothing was inserted, find out whether the author exists at all.
+        get_object_or_404(get_user_model().objects.only("pk"), pk=author_id)
+
+        return Response(
+            {"message": "You already follow this author."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    responses={
+        200: OpenApiResponse(description="Author unfollowed"),
+    },
+)
+class UnfollowAuthorView(APIView):
+    """
+    View for unfollowing an author by User id
+    if this author is followed by the user.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def delete(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> Response:
+        if not unfollow_author(self.kwargs["author_id"], request.user.pk):
+            raise Http404
+
+        return Response(
+            {"message": "Unfollowed successfully"},
+            status=status.HTTP_200_OK,
+        )
+
 
 class PostLikeView(CreateAPIView):
     """
@@ -80,30 +509,22 @@ class PostLikeView(CreateAPIView):
     queryset = Like.objects.select_related("post", "liked_by")
     serializer_class = LikeSerializer
 
-    def _get_post(self) -> Post:
-        return get_object_or_404(Post, pk=self.kwargs["post_id"])
-
     def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        post = self._get_post()
+        post_id = self.kwargs["post_id"]
 
-        if Like.objects.filter(post=post, liked_by=request.user).exists():
+        if like_post(post_id, request.user.pk):
             return Response(
-                {"message": "You've already liked this post before."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"message": "Liked successfully"},
+                status=status.HTTP_201_CREATED,
             )
-        return super().post(request, *args, **kwargs)
-
-    def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        response = super().create(request, *args, **kwargs)
 
-        if response.status_code == status.HTTP_201_CREATED:
-            response.data = {"message": "Liked successfully"}
+        # Nothing was inserted, find out whether the Post exists at all.
+        get_object_or_404(Post.objects.only("pk"), pk=post_id)
 
-        return response
-
-    def perform_create(self, serializer: LikeSerializer) -> None:
-        post = self._get_post()
-        serializer.save(post=post, liked_by=self.request.user)
+        return Response(
+            {"message": "You've already liked this post before."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
 
 class PostUnlikeView(DestroyAPIView):
@@ -117,12 +538,9 @@ class PostUnlikeView(DestroyAPIView):
     lookup_url_kwarg = "post_id"
     lookup_field = "post"
 
-    def get_object(self) -> Like:
-        post = get_object_or_404(Post, pk=self.kwargs["post_id"])
-        return get_object_or_404(Like, post=post, liked_by=self.request.user)
-
     def destroy(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        super().destroy(request, *args, **kwargs)
+        if not unlike_post(self.kwargs["post_id"], request.user.pk):
+            raise Http404
 
         return Response(
             {"message": "Unliked successfully"},
@@ -130,6 +548,139 @@ class PostUnlikeView(DestroyAPIView):
         )
 
 
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint for liking and unliking many Posts by ids at once. "
+        "Returns the status of every requested id."
+    ),
+    responses={
+        200: OpenApiResponse(
+            description="Maps of post ids to like and unlike statuses"
+        ),
+    },
+)
+class PostLikeBatchView(generics.GenericAPIView):
+    """
+    View for liking and unliking a batch of Posts in one request,
+    accessible only for authenticated users.
+    """
+
+    serializer_class = LikeBatchSerializer
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        like_statuses, unlike_statuses = batch_like_posts(
+            request.user.pk,
+            serializer.validated_data["like"],
+            serializer.validated_data["unlike"],
+        )
+
+        return Response(
+            {"like": like_statuses, "unlike": unlike_statuses},
+            status=status.HTTP_200_OK,
+        )
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    responses={
+        200: OpenApiResponse(
+            description="Hit, stale hit and miss counts of the post cache"
+        ),
+    },
+)
+class PostCacheStatsView(APIView):
+    """View for the response cache statistics, accessible only for admins"""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return Response(get_stats(), status=status.HTTP_200_OK)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name="output",
+            description="Format of the export, 'ndjson' (default) or 'csv'.",
+            required=False,
+            type=str,
+            enum=list(CONTENT_TYPES),
+        ),
+        OpenApiParameter(
+            name="since",
+            description=(
+                "ISO date or datetime for incremental pulls, only Posts "
+                "updated and likes made since then are exported."
+            ),
+            required=False,
+            type=str,
+        ),
+        OpenApiParameter(
+            name="gzip",
+            description="Parameter for gzip compressing the export.",
+            required=False,
+            type=bool,
+        ),
+    ],
+    responses={
+        200: OpenApiResponse(description="Streamed rows of the dataset"),
+    },
+)
+class DataExportView(APIView):
+    """
+    View streaming a whole dataset as NDJSON or CSV,
+    accessible only for admins.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(
+            self,
+            request: Request,
+            dataset: str,
+            *args: Any,
+            **kwargs: Any,
+    ) -> HttpResponse:
+        if dataset not in DATASETS:
+            raise Http404
+
+        output_format = request.query_params.get("output", "ndjson")
+        compress = request.query_params.get("gzip", "").lower() == "true"
+
+        if output_format not in CONTENT_TYPES:
+            return Response(
+                {"error": "The 'output' must be 'ndjson' or 'csv'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            chunks = export(
+                dataset,
+                output_format,
+                request.query_params.get("since"),
+                compress,
+            )
+        except ValueError as error:
+            return Response(
+                {"error": str(error)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            chunks,
+            content_type=get_export_content_type(output_format, compress),
+        )
+        filename = get_export_filename(dataset, output_format, compress)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+        return response
+
+
 # Only for documentation endpoint details
 @extend_schema(
     parameters=[
@@ -151,21 +702,44 @@ class PostUnlikeView(DestroyAPIView):
             required=True,
             type=str,
         ),
+        OpenApiParameter(
+            name="granularity",
+            description="Size of the buckets likes are counted in.",
+            required=False,
+            type=str,
+            enum=list(GRANULARITIES),
+        ),
+        OpenApiParameter(
+            name="post_id",
+            description="Parameter for counting likes of one Post only.",
+            required=False,
+            type=int,
+        ),
+        OpenApiParameter(
+            name="author_id",
+            description="Parameter for counting likes of one author only.",
+            required=False,
+            type=int,
+        ),
     ],
     responses={
-        200: OpenApiResponse(description="List of like annotated per day"),
+        200: OpenApiResponse(
+            description="List of likes annotated per day, week or month"
+        ),
     }
 )
 class LikeAnalyticsView(APIView):
-    """View for providing like analytics annotated by days"""
+    """View for providing like analytics annotated by days, weeks or months"""
 
     permission_classes = (IsAuthenticated,)
 
     def get(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
-            Retrieve the number of likes aggregated by day according to
-            provided date range. Requires 'date_from' and 'date_to' as
-            query parameters in the format YYYY-MM-DD.
+            Retrieve the number of likes aggregated by day, week or month
+            according to provided date range, empty buckets included.
+            Requires 'date_from' and 'date_to' as query parameters in the
+            format YYYY-MM-DD, likes can be limited to one Post or author
+            with 'post_id' or 'author_id'.
         """
 
         date_from = self.request.query_params.get("date_from")
@@ -198,19 +772,95 @@ class LikeAnalyticsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        aggregated_likes = Like.objects.filter(
-            liked_date__range=[date_from, date_to]
-        ).values("liked_date").annotate(
-            likes_count=Count("id")
-        ).order_by("liked_date")
+        granularity = self.request.query_params.get("granularity", "day")
+
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"error": "The 'granularity' must be day, week or month."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if not aggregated_likes:
+        if count_buckets(date_from, date_to, granularity) > (
+            settings.LIKE_ANALYTICS_MAX_BUCKETS
+        ):
+            return Response(
+                {
+                    "error": "The time range is too long for the "
+                             f"'{granularity}' granularity."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        filters = {}
+
+        for name in ("post_id", "author_id"):
+            value = self.request.query_params.get(name)
+
+            if value is None:
+                continue
+
+            if not value.isdigit():
+                return Response(
+                    {"error": f"The '{name}' must be a positive integer."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            filters[name] = int(value)
+
+        aggregated_likes = get_like_analytics(
+            date_from,
+            date_to,
+            granularity,
+            **filters,
+        )
+
+        if not any(bucket["likes_count"] for bucket in aggregated_likes):
             return Response(
                 {"message": "There are no likes in the provided time range."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        return Response(list(aggregated_likes), status=status.HTTP_200_OK)
+        return Response(aggregated_likes, status=status.HTTP_200_OK)
+
+
+# Only for documentation endpoint details
+@extend_schema(
+    description=(
+        "Endpoint with request, latency, database and cache metrics of "
+        "all the workers in the Prometheus text format. Requires the "
+        "METRICS_TOKEN as a bearer token."
+    ),
+    responses={
+        200: OpenApiResponse(description="Prometheus text exposition"),
+        403: OpenApiResponse(description="Missing or invalid token"),
+    },
+)
+class MetricsView(APIView):
+    """
+    View for scraping the metrics, allowed to the scrapers sending
+    the METRICS["TOKEN"] bearer token only.
+    """
+
+    # The bearer token is not a JWT, so no user is authenticated.
+    authentication_classes = ()
+    permission_classes = (HasMetricsToken,)
+
+    def get(
+            self,
+            request: Request,
+            *args: Any,
+            **kwargs: Any,
+    ) -> HttpResponse:
+        samples = metrics.registry.collect()
+        samples.update(get_metric_samples())
+
+        return HttpResponse(
+            metrics.render(
+                samples,
+                (*metrics.FAMILIES, *METRIC_FAMILIES),
+            ),
+            content_type=metrics.CONTENT_TYPE,
+        )
 
 
 @api_view(["GET"])
@@ -0,0 +1,113 @@
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from users.cache import get_user_cache_key
+from users.models import User
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement of JWTAuthentication resolving the User from a
+    short-TTL cache keyed by the user id claim of the token, so
+    authenticated requests need no user query in the common case.
+    The token claims are still checked against the cached User.
+
+    aauthenticate() is the same for async views, loading the User with
+    the async ORM and cache API.
+    """
+
+    def get_user(self, validated_token: Token) -> User:
+        cache_key = get_user_cache_key(self.get_user_id(validated_token))
+        user = cache.get(cache_key)
+
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(cache_key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+            return user
+
+        self.check_user(user, validated_token)
+
+        return user
+
+    async def aauthenticate(
+            self,
+            request: Request,
+    ) -> Optional[Tuple[User, Token]]:
+        header = self.get_header(request)
+
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token: Token) -> User:
+        user_id = self.get_user_id(validated_token)
+        cache_key = get_user_cache_key(user_id)
+        user = cached_user = await cache.aget(cache_key)
+
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(
+                    _("User not found"),
+                    code="user_not_found",
+                )
+
+        self.check_user(user, validated_token)
+
+        if cached_user is None:
+            await cache.aset(
+                cache_key,
+                user,
+                settings.AUTH_USER_CACHE_TIMEOUT,
+            )
+
+        return user
+
+    @staticmethod
+    def get_user_id(validated_token: Token) -> Any:
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+    @staticmethod
+    def check_user(user: User, validated_token: Token) -> None:
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"),
+                code="user_inactive",
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
@@ -0,0 +1,24 @@
+from typing import Any, Iterable
+
+from django.core.cache import cache
+
+
+USER_CACHE_KEY_PREFIX = "jwt-auth-user"
+
+# User fields not read through the cached authenticated User, changing
+# only them keeps its cache entry.
+UNCACHED_FIELDS = frozenset(
+    {"last_login_at", "last_request_at", "followers_count"}
+)
+
+
+def get_user_cache_key(user_id: Any) -> str:
+    return f"{USER_CACHE_KEY_PREFIX}:{user_id}"
+
+
+def invalidate_cached_user(user_id: Any) -> None:
+    cache.delete(get_user_cache_key(user_id))
+
+
+def invalidate_cached_users(user_ids: Iterable[Any]) -> None:
+    cache.delete_many([get_user_cache_key(user_id) for user_id in user_ids])
@@ -11,8 +11,27 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
+from users.cache import UNCACHED_FIELDS, invalidate_cached_users
 
-class UserManager(BaseUserManager):
+
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs: Any) -> int:
+        """
+        Update the Users and drop their cached authenticated Users, as
+        update() sends no post_save signal.
+        """
+
+        if kwargs.keys() <= UNCACHED_FIELDS:
+            return super().update(**kwargs)
+
+        user_ids = list(self.values_list("pk", flat=True))
+        updated = super().update(**kwargs)
+        invalidate_cached_users(user_ids)
+
+        return updated
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Define a model manager for User model with no username field."""
 
     use_in_migrations = True
@@ -80,6 +99,8 @@ class User(AbstractUser):
     pseudonym = models.CharField(max_length=255, blank=True)
     last_login_at = models.DateTimeField(null=True, blank=True)
     last_request_at = models.DateTimeField(default=timezone.now)
+    # Denormalized number of Follow rows pointing to the User
+    followers_count = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
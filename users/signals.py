@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.cache import UNCACHED_FIELDS, invalidate_cached_user
+from users.models import User
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_on_save(
+        sender: type,
+        instance: User,
+        update_fields: Optional[frozenset] = None,
+        **kwargs: Any,
+) -> None:
+    if update_fields and update_fields <= UNCACHED_FIELDS:
+        return
+
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_delete(
+        sender: type,
+        instance: User,
+        **kwargs: Any,
+) -> None:
+    invalidate_cached_user(instance.pk)
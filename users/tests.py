@@ -1,3 +1,82 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.last_request import LastRequestBuffer
+from core.testing import create_user, get_auth
+from users.authentication import CachedJWTAuthentication
+from users.cache import get_user_cache_key
+from users.models import User
+
+
+class CachedAuthenticationTests(TestCase):
+    """The cached authenticated User follows its changes"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user()
+        self.url = reverse("users:manage_user_details")
+
+    def test_cached_user_needs_no_query(self) -> None:
+        self.client.get(self.url, **get_auth(self.user))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, **get_auth(self.user))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_queryset_update_invalidates_cached_user(self) -> None:
+        self.client.get(self.url, **get_auth(self.user))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get(self.url, **get_auth(self.user))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_activity_update_keeps_cached_user(self) -> None:
+        self.client.get(self.url, **get_auth(self.user))
+
+        with self.assertNumQueries(1):
+            User.objects.filter(pk=self.user.pk).update(last_login_at=None)
+
+        self.assertIsNotNone(cache.get(get_user_cache_key(self.user.pk)))
+
+    def test_async_authentication_uses_the_cache(self) -> None:
+        authentication = CachedJWTAuthentication()
+        token = AccessToken.for_user(self.user)
+
+        user = async_to_sync(authentication.aget_user)(token)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(cache.get(get_user_cache_key(self.user.pk)), user)
+
+
+class LastRequestBufferTests(TestCase):
+    """Flushed request times never move backwards"""
+
+    def test_flush_keeps_later_request_time(self) -> None:
+        now = timezone.now()
+        later, earlier = create_user(), create_user("earlier@test.local")
+        User.objects.filter(pk=later.pk).update(last_request_at=now)
+        User.objects.filter(pk=earlier.pk).update(
+            last_request_at=now - timedelta(hours=1)
+        )
+        buffer = LastRequestBuffer()
+        buffer._pending = {
+            later.pk: now - timedelta(minutes=5),
+            earlier.pk: now - timedelta(minutes=5),
+        }
 
-# Create your tests here.
+        self.assertEqual(buffer.flush(), 2)
+        later.refresh_from_db()
+        earlier.refresh_from_db()
+        self.assertEqual(later.last_request_at, now)
+        self.assertEqual(
+            earlier.last_request_at,
+            now - timedelta(minutes=5),
+        )
@@ -7,6 +7,7 @@ from rest_framework import generics, exceptions
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from core.last_request import last_request_buffer
 from users.models import User
 from users.serializers import (
     CustomTokenObtainPairSerializer,
@@ -64,6 +65,14 @@ class UserLastActivityView(generics.RetrieveAPIView):
         user = get_object_or_404(User, id=user_id)
 
         if self.request.user == user or self.request.user.is_superuser:
+            pending_request_at = last_request_buffer.get(user.pk)
+
+            if pending_request_at:
+                user.last_request_at = max(
+                    user.last_request_at,
+                    pending_request_at,
+                )
+
             return user
 
         raise exceptions.PermissionDenied(